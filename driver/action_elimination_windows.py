@@ -0,0 +1,203 @@
+"""Run action elimination on windows of a long plan.
+
+For plans with thousands of steps, the action elimination task for the
+whole plan is often too hard. With --action-elimination-window-size N,
+the compilation (see create_window_tasks() in action_elim.py) splits the
+plan into windows of N steps and creates one small task per window. The
+initial state of a window is the state that the original plan reaches
+before the window, and its goal fixes all variables that later steps or
+the goal read, so the reduced windows can be concatenated into a valid
+plan. The window tasks are solved by up to --action-elimination-jobs
+searches in parallel. Each search uses the configuration chosen by the
+size of its window task and is bounded by the cost of the window's steps.
+Windows whose search fails or finds no cheaper plan keep their original
+steps.
+
+Redundant actions whose effects are only needed across a window border
+cannot be found in a single pass. Therefore, a second pass runs on the
+result of the first one with window borders shifted by half a window
+(see WINDOW_OFFSETS), so that every pair of neighbouring steps shares a
+window in at least one pass.
+
+The windows are solved in decreasing order of their number of steps that
+do not lie on a critical path of the deordered plan (see
+step_deordering.py), since searches that have not started when the time
+runs out keep their original steps.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import time
+
+from . import call
+from . import limits
+from . import returncodes
+from . import run_components
+
+
+WINDOWS_FILE = "action-elimination-windows.json"
+WINDOW_PLAN_FILE = "plan_with_skip_actions.window-%d"
+WINDOW_BOUND_FILE = "action-elimination.bound.window-%d"
+# Size of the first window in each pass as a fraction of the window size.
+WINDOW_OFFSETS = [1, 0.5]
+POLL_INTERVAL = 0.1
+
+
+def _try_remove(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def _get_time_limit(deadline):
+    if deadline is None:
+        return None
+    return limits.round_time_limit(deadline - time.monotonic())
+
+
+def _run_searches(searches, jobs, deadline, memory_limit):
+    """Run the (window index, command, task file) triples in *searches*
+    with at most *jobs* processes at the same time until the
+    (time.monotonic) *deadline* (None for no deadline). Return a
+    dictionary that maps window indices to exit codes (None for
+    searches that did not start)."""
+    pending = list(searches)
+    running = {}
+    exitcodes = {}
+    while pending or running:
+        while pending and len(running) < jobs:
+            index, cmd, task_file = pending.pop(0)
+            time_limit = _get_time_limit(deadline)
+            if time_limit is not None and time_limit <= 0:
+                exitcodes[index] = None
+                continue
+            running[index] = call.start_call(
+                "search", cmd, stdin=task_file,
+                time_limit=time_limit, memory_limit=memory_limit)
+        for index, process in list(running.items()):
+            if process.poll() is not None:
+                exitcodes[index] = process.returncode
+                del running[index]
+        if running:
+            time.sleep(POLL_INTERVAL)
+    return exitcodes
+
+
+def _run_pass(args, plan_file, offset, deadline, memory_limit, workspace):
+    """Run action elimination for each window of the plan in
+    *plan_file*, whose first window has *offset* steps, with the
+    intermediate files in *workspace*. Return the reduced plan as a
+    list of operator names and its cost. Raise
+    subprocess.CalledProcessError if the compilation fails."""
+    compile_cmd, _ = run_components.get_eliminate_actions_commands(
+        args, plan_file, workspace)
+    compile_cmd += [
+        "--window-size", str(args.action_elimination_window_size),
+        "--window-offset", str(offset)]
+    call.check_call(
+        "action-elimination", compile_cmd,
+        time_limit=_get_time_limit(deadline),
+        memory_limit=memory_limit)
+    windows_file_name = os.path.join(workspace, WINDOWS_FILE)
+    with open(windows_file_name) as windows_file:
+        info = json.load(windows_file)
+    os.remove(windows_file_name)
+    # The windows start from the greedy plan, so we do not need it.
+    _try_remove(os.path.join(workspace, run_components.AE_GREEDY_PLAN_FILE))
+
+    searches = []
+    for index, window in enumerate(info["windows"]):
+        if window["task"] is not None:
+            # Like the search for a single task, each window search uses
+            # the configuration chosen by the size of its task and only
+            # looks for plans that are cheaper than the window's steps.
+            search_cmd, _ = run_components.get_ae_search_command(
+                args, workspace, window["task_info"], WINDOW_PLAN_FILE % index,
+                WINDOW_BOUND_FILE % index)
+            searches.append((index, search_cmd, window["task"]))
+    # Windows with many steps off the critical path of the deordered plan
+    # are the most likely to contain redundant steps. We solve them first,
+    # so they still get a search if the time runs out.
+    searches.sort(key=lambda search: -info["windows"][search[0]]["non_critical_steps"])
+    jobs = args.action_elimination_jobs
+    exitcodes = _run_searches(
+        searches, jobs, deadline,
+        memory_limit // jobs if memory_limit is not None else None)
+
+    plan = info["plan"]
+    costs = dict(zip(plan, info["costs"]))
+    reduced_plan = []
+    for index, window in enumerate(info["windows"]):
+        start, end = window["start"], window["end"]
+        window_plan_file = os.path.join(workspace, WINDOW_PLAN_FILE % index)
+        window_plan = plan[start:end]
+        if window["task"] is None:
+            window_plan = []
+        elif exitcodes.get(index) == 0:
+            window_plan, _ = run_components._parse_plan_filter_skip_actions(
+                window_plan_file)
+        elif exitcodes.get(index) in [returncodes.SEARCH_UNSOLVABLE,
+                                      returncodes.SEARCH_UNSOLVED_INCOMPLETE]:
+            logging.info(f"AE window {index}: no cheaper plan")
+        else:
+            logging.info(f"AE window {index}: search exit code {exitcodes.get(index)}, "
+                         "keeping original steps")
+        if window["task"] is not None:
+            os.remove(window["task"])
+            _try_remove(window_plan_file)
+            _try_remove(os.path.join(workspace, WINDOW_BOUND_FILE % index))
+        logging.info(f"AE window {index} (steps {start}-{end - 1}): cost "
+                     f"{sum(costs[op] for op in plan[start:end])} -> "
+                     f"{sum(costs[op] for op in window_plan)}")
+        reduced_plan += window_plan
+    return reduced_plan, sum(costs[op] for op in reduced_plan)
+
+
+def _write_plan(plan, cost, problem_type, plan_file):
+    with open(plan_file, "w") as output_file:
+        for op in plan:
+            print(op, file=output_file)
+        print("; cost = %d (%s)" % (cost, "general cost"
+              if problem_type == "general cost" else "unit cost"), file=output_file)
+
+
+def run(args, plan_file, old_plan_cost, problem_type, output_plan_file,
+        time_limit, memory_limit, workspace):
+    """Reduce the plan in *plan_file* with windowed action elimination
+    and write the result to *output_plan_file* if it is cheaper than
+    *old_plan_cost*. Intermediate files go to *workspace*. Return the
+    exit code and whether to continue."""
+    start_time = time.monotonic()
+    deadline = start_time + time_limit if time_limit is not None else None
+    plan_cost = old_plan_cost
+    pass_plan_file = plan_file
+    for pass_index, offset in enumerate(WINDOW_OFFSETS):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        try:
+            plan, new_cost = _run_pass(
+                args, pass_plan_file,
+                max(1, int(offset * args.action_elimination_window_size)),
+                deadline, memory_limit, workspace)
+        except subprocess.CalledProcessError as err:
+            returncodes.print_stderr(
+                f"Error while eliminating actions. Exit status {err.returncode}")
+            if pass_index == 0:
+                if run_components.adopt_greedy_plan(
+                        args, workspace, old_plan_cost, output_plan_file) is None:
+                    return err.returncode, False
+                return 0, True
+            break
+        logging.info(f"AE window pass {pass_index}: cost {plan_cost} -> {new_cost} "
+                     f"after {time.monotonic() - start_time:.2f}s")
+        if new_cost < plan_cost:
+            plan_cost = new_cost
+            _write_plan(plan, plan_cost, problem_type, output_plan_file)
+            pass_plan_file = output_plan_file
+
+    logging.info("Old plan cost: %d" % old_plan_cost)
+    logging.info("New plan cost: %d" % plan_cost)
+    return 0, True
@@ -0,0 +1,155 @@
+"""Run action elimination in the background while a portfolio continues.
+
+Action elimination consists of two processes: compiling the action
+elimination task for a plan and solving it. Instead of waiting for
+them, the portfolio runner calls poll() regularly, which starts the
+next process once the previous one has terminated. We do not use
+threads because starting subprocesses with a preexec_fn (for setting
+limits) is not thread-safe.
+"""
+
+import os.path
+import time
+
+from . import call
+from . import limits
+from . import returncodes
+from . import run_components
+
+
+class ActionEliminationWorker:
+    def __init__(self, cmd_args, plan_manager, deadline, memory_limit):
+        """Run action elimination for every new plan that *plan_manager*
+        finds until the (time.monotonic) *deadline*. If action
+        elimination is still running for an older plan, only the latest
+        new plan is remembered."""
+        self._args = cmd_args
+        self._plan_manager = plan_manager
+        self._deadline = deadline
+        self._memory_limit = memory_limit
+        self._workspace = run_components.create_ae_workspace(cmd_args)
+        self._output_plan_file = os.path.join(self._workspace, "reduced-plan")
+        self._process = None
+        self._compiling = False
+        self._configuration_name = None
+        self._current_plan = None
+        self._current_cost = None
+        self._pending_plan = None
+        self._start_time = None
+        self._adopting = False
+        plan_manager.add_new_plan_callback(self._on_new_plan)
+
+    def _on_new_plan(self, plan_filename, cost):
+        # Plans found by action elimination itself are not reduced again.
+        if not self._adopting:
+            self._pending_plan = (plan_filename, cost)
+            self._start_next()
+
+    def _get_time_limit(self):
+        return limits.round_time_limit(self._deadline - time.monotonic())
+
+    def _start_next(self):
+        if self._process is not None or self._pending_plan is None:
+            return
+        time_limit = self._get_time_limit()
+        if time_limit <= 0:
+            return
+        self._current_plan = self._pending_plan
+        self._pending_plan = None
+        plan_filename, cost = self._current_plan
+        self._current_cost = cost
+        print("action elimination: reducing {} (cost {}) in the background".format(
+            plan_filename, cost))
+        self._start_time = time.monotonic()
+        compile_cmd, _ = run_components.get_eliminate_actions_commands(
+            self._args, plan_filename, self._workspace)
+        self._compiling = True
+        self._process = call.start_call(
+            "action-elimination", compile_cmd,
+            time_limit=time_limit, memory_limit=self._memory_limit)
+
+    def is_busy(self):
+        return self._process is not None
+
+    def poll(self):
+        """Continue the running action elimination if its current
+        process has terminated."""
+        if self._process is None or self._process.poll() is None:
+            return
+        returncode = self._process.returncode
+        self._process = None
+        if self._compiling:
+            # With --action-elimination-greedy, the compilation writes the
+            # greedily reduced plan first, even if it fails afterwards.
+            self._adopt_greedy_plan()
+        time_limit = self._get_time_limit()
+        if (not self._compiling and returncode in [
+                returncodes.SEARCH_UNSOLVABLE, returncodes.SEARCH_UNSOLVED_INCOMPLETE]):
+            # The search is bounded by the cost of the compiled plan, so
+            # an unsolvable task means that no cheaper plan exists.
+            print("action elimination: no cheaper plan than cost {} in {:.2f}s "
+                  "({} configuration)".format(
+                      self._current_cost, time.monotonic() - self._start_time,
+                      self._configuration_name))
+        elif returncode != 0:
+            print("action elimination: exit status {}{}".format(
+                returncode, "" if self._compiling else
+                " ({} configuration)".format(self._configuration_name)))
+        elif self._compiling and time_limit > 0:
+            search_cmd, self._configuration_name = (
+                run_components.get_ae_search_command(self._args, self._workspace))
+            self._process = call.start_call(
+                "search", search_cmd,
+                stdin=os.path.join(self._workspace, run_components.AE_TASK_FILE),
+                time_limit=time_limit, memory_limit=self._memory_limit)
+            self._compiling = False
+            return
+        elif not self._compiling:
+            self._adopt_result()
+        self._compiling = False
+        self._start_next()
+
+    def _adopt_greedy_plan(self):
+        new_cost = run_components.adopt_greedy_plan(
+            self._args, self._workspace, self._current_cost, self._output_plan_file)
+        if new_cost is not None and new_cost < self._current_cost:
+            print("action elimination: greedy cost {} -> {}".format(
+                self._current_cost, new_cost))
+            self._current_cost = new_cost
+            self._adopt_plan()
+
+    def _adopt_result(self):
+        old_cost = self._current_cost
+        new_cost = run_components.write_eliminated_plan(
+            self._args, old_cost, self._plan_manager.get_problem_type(),
+            self._output_plan_file, self._workspace)
+        print("action elimination: cost {} -> {} in {:.2f}s ({} configuration)".format(
+            old_cost, new_cost, time.monotonic() - self._start_time,
+            self._configuration_name))
+        if new_cost < old_cost:
+            self._current_cost = new_cost
+            self._adopt_plan()
+
+    def _adopt_plan(self):
+        # Adopting the plan shares its cost as the new bound.
+        self._adopting = True
+        self._plan_manager.adopt_plan_file(self._output_plan_file)
+        self._adopting = False
+
+    def stop(self):
+        """Kill the running action elimination, forget the pending plan
+        and remove the workspace."""
+        self._pending_plan = None
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+        run_components.remove_ae_workspace(self._workspace)
+
+    def finish(self, poll_interval):
+        """Wait until the running and pending action eliminations are
+        done and remove the workspace."""
+        while self.is_busy():
+            time.sleep(poll_interval)
+            self.poll()
+        run_components.remove_ae_workspace(self._workspace)
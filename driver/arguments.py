@@ -4,6 +4,7 @@ import re
 import sys
 
 from . import aliases
+from . import compressed_files
 from . import returncodes
 from . import util
 
@@ -189,7 +190,7 @@ def _check_mutex_args(parser, args, required=False):
 
 
 def _looks_like_search_input(filename):
-    with open(filename) as input_file:
+    with compressed_files.open_text(filename) as input_file:
         first_line = next(input_file, "").rstrip()
     return first_line == "begin_version"
 
@@ -285,6 +286,20 @@ def _set_translator_output_options(parser, args):
     args.translate_options += ["--sas-file", args.search_input]
 
 
+def _can_pipe_translator_output(args):
+    """Return True if the search can read the translator output from a
+    pipe, i.e., if nothing else needs the translator output file."""
+    return (os.name == "posix" and
+            args.components[:2] == ["translate", "search"] and
+            not args.keep_sas_file and
+            not args.portfolio and
+            not args.transform_task and
+            not args.portfolio_eliminate_actions and
+            "--help" not in args.translate_options and
+            "-h" not in args.translate_options and
+            "--help" not in args.search_options)
+
+
 def _get_time_limit_in_seconds(limit, parser):
     match = re.match(r"^(\d+)(s|m|h)?$", limit, flags=re.I)
     if not match:
@@ -373,7 +388,9 @@ def parse_args():
         help="run search component")
     components.add_argument(
         "--eliminate-actions", action="store_true",
-        help="run action elimination after search")
+        help="run action elimination after search (without "
+        "--action-elimination-planner-config, the planner configuration is "
+        "chosen by the size of the action elimination task)")
 
     limits = parser.add_argument_group(
         title="time and memory limits", description=LIMITS_HELP)
@@ -406,7 +423,14 @@ def parse_args():
         help='comma-separated list of key-value option pairs for task transformation (e.g. h2_time_limit,10)')
     driver_other.add_argument(
         "--validate", action="store_true",
-        help='validate plans (implied by --debug); needs "validate" (VAL) on PATH')
+        help='validate plans (implied by --debug); needs "validate" (VAL) on PATH '
+        'for PDDL input. Plans for SAS+ input are validated in Python')
+    driver_other.add_argument(
+        "--cgroup-memory-limits", action="store_true",
+        help="enforce the memory limits of components with sub-cgroups of the "
+        "cgroup v2 of the driver instead of RLIMIT_AS. The cgroup must be "
+        "delegated to the user and the driver must be its only process; the "
+        "driver moves itself into a leaf cgroup and undoes this on exit")
     driver_other.add_argument(
         "--log-level", choices=["debug", "info", "warning"],
         default="info",
@@ -425,6 +449,13 @@ def parse_args():
         help="keep translator output file (implied by --sas-file, default: "
             "delete file if translator and search component are active)")
 
+    driver_other.add_argument(
+        "--pipe-translator-output", action="store_true",
+        help="run translator and search at the same time and pass the "
+            "translator output through a pipe instead of a file if nothing "
+            "else needs the file. Both components then share the overall "
+            "memory limit and their output interleaves")
+
     driver_other.add_argument(
         "--portfolio", metavar="FILE",
         help="run a portfolio specified in FILE")
@@ -437,6 +468,51 @@ def parse_args():
     driver_other.add_argument(
         "--portfolio-eliminate-actions", action="store_true",
         help="run action elimination after each new found plan in portfolio")
+    driver_other.add_argument(
+        "--portfolio-async-eliminate-actions", action="store_true",
+        help="like --portfolio-eliminate-actions, but run action elimination "
+            "in the background while the next configurations run (implies "
+            "--portfolio-eliminate-actions)")
+    driver_other.add_argument(
+        "--portfolio-jobs", metavar="N", default=1, type=int,
+        help="number of portfolio configurations to run in parallel. Each "
+            "configuration gets an equal share of the memory limit and the "
+            "search time limit is treated as wall-clock time (default: 1)")
+    driver_other.add_argument(
+        "--portfolio-search-server", action="store_true",
+        help="read the task once in a persistent search process and fork "
+            "each portfolio configuration from it (not supported on Windows). "
+            "The search time limit is treated as wall-clock time")
+    driver_other.add_argument(
+        "--portfolio-history", metavar="FILE",
+        help="record the outcome of each portfolio configuration in FILE "
+            "and distribute the portfolio time according to the outcomes "
+            "recorded for similar tasks")
+
+    driver_other.add_argument(
+        "--action-elimination-greedy", action="store_true",
+        help="reduce plans with greedy action elimination before compiling "
+            "the action elimination task. If little time is left for action "
+            "elimination, only run the greedy pass")
+    driver_other.add_argument(
+        "--action-elimination-fixpoint", action="store_true",
+        help="repeat action elimination on the reduced plan until it no "
+            "longer improves or the time runs out")
+    driver_other.add_argument(
+        "--action-elimination-window-size", metavar="N", default=None, type=int,
+        help="split plans into windows of N steps for action elimination "
+            "and reduce each window separately (not supported with "
+            "--portfolio-async-eliminate-actions)")
+    driver_other.add_argument(
+        "--action-elimination-multi-plan-budget", metavar="STEPS", default=None, type=int,
+        help="compile one action elimination task for the last plan and "
+            "as many earlier plans as fit into STEPS plan steps in total, "
+            "so that the reduced plan can use the cheapest parts of all "
+            "of them")
+    driver_other.add_argument(
+        "--action-elimination-jobs", metavar="N", default=1, type=int,
+        help="number of action elimination windows to solve in parallel. "
+            "Each search gets an equal share of the memory limit (default: 1)")
 
     driver_other.add_argument(
         "--cleanup", action="store_true",
@@ -500,10 +576,66 @@ def parse_args():
     if args.portfolio_eliminate_actions and not args.portfolio:
         print_usage_and_exit_with_driver_input_error(
             parser, "--portfolio-eliminate-actions may only be used for portfolios.")
+    if args.portfolio_async_eliminate_actions:
+        if not args.portfolio:
+            print_usage_and_exit_with_driver_input_error(
+                parser, "--portfolio-async-eliminate-actions may only be used for portfolios.")
+        args.portfolio_eliminate_actions = True
+    if args.portfolio_jobs != 1 and not args.portfolio:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--portfolio-jobs may only be used for portfolios.")
+    if args.portfolio_jobs < 1:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--portfolio-jobs must be positive.")
+    if args.portfolio_search_server and not args.portfolio:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--portfolio-search-server may only be used for portfolios.")
+    if args.portfolio_history and not args.portfolio:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--portfolio-history may only be used for portfolios.")
+
+    if args.action_elimination_window_size is not None:
+        if args.action_elimination_window_size < 1:
+            print_usage_and_exit_with_driver_input_error(
+                parser, "--action-elimination-window-size must be positive.")
+        if args.portfolio_async_eliminate_actions:
+            print_usage_and_exit_with_driver_input_error(
+                parser, "cannot combine --action-elimination-window-size with "
+                "--portfolio-async-eliminate-actions")
+        if args.action_elimination_fixpoint:
+            print_usage_and_exit_with_driver_input_error(
+                parser, "cannot combine --action-elimination-window-size with "
+                "--action-elimination-fixpoint")
+    if (args.action_elimination_fixpoint and
+            args.portfolio_async_eliminate_actions):
+        print_usage_and_exit_with_driver_input_error(
+            parser, "cannot combine --action-elimination-fixpoint with "
+            "--portfolio-async-eliminate-actions")
+    if args.action_elimination_multi_plan_budget is not None:
+        if args.action_elimination_multi_plan_budget < 1:
+            print_usage_and_exit_with_driver_input_error(
+                parser, "--action-elimination-multi-plan-budget must be positive.")
+        for name, is_specified in [
+                ("--action-elimination-window-size",
+                 args.action_elimination_window_size is not None),
+                ("--action-elimination-fixpoint", args.action_elimination_fixpoint),
+                ("--portfolio-async-eliminate-actions",
+                 args.portfolio_async_eliminate_actions)]:
+            if is_specified:
+                print_usage_and_exit_with_driver_input_error(
+                    parser, "cannot combine --action-elimination-multi-plan-budget "
+                    "with %s" % name)
+    if args.action_elimination_jobs < 1:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--action-elimination-jobs must be positive.")
 
+    pipe_translator_output = args.pipe_translator_output
+    args.pipe_translator_output = False
     if not args.version and not args.show_aliases and not args.cleanup:
         _set_components_and_inputs(parser, args)
         if "translate" not in args.components or "search" not in args.components:
             args.keep_sas_file = True
+        args.pipe_translator_output = (
+            pipe_translator_output and _can_pipe_translator_output(args))
 
     return args
@@ -1,19 +1,37 @@
 """Make subprocess calls with time and memory limits."""
 
+from . import cgroups
+from . import compressed_files
 from . import limits
 from . import returncodes
 
 import logging
 import os
 import shlex
+import signal
 import subprocess
 import sys
+import time
+
+
+# Pass as stdin to start_call() to write to the process through a pipe.
+PIPE = subprocess.PIPE
+
+# Exit codes for components killed because they exceeded the memory
+# limit of their cgroup. All other components report the search code.
+OUT_OF_MEMORY_EXITCODES = {
+    "translator": returncodes.TRANSLATE_OUT_OF_MEMORY,
+}
 
 
 def print_call_settings(nick, cmd, stdin, time_limit, memory_limit):
-    if stdin is not None:
-        stdin = shlex.quote(stdin)
-    logging.info("{} stdin: {}".format(nick, stdin))
+    if stdin == PIPE:
+        logging.info("{} stdin: pipe".format(nick))
+        stdin = None
+    else:
+        if stdin is not None:
+            stdin = shlex.quote(stdin)
+        logging.info("{} stdin: {}".format(nick, stdin))
     limits.print_limits(nick, time_limit, memory_limit)
 
     escaped_cmd = [shlex.quote(x) for x in cmd]
@@ -22,7 +40,7 @@ def print_call_settings(nick, cmd, stdin, time_limit, memory_limit):
     logging.info("{} command line string: {}".format(nick, " ".join(escaped_cmd)))
 
 
-def _get_preexec_function(time_limit, memory_limit):
+def _get_preexec_function(time_limit, memory_limit, cgroup_dir=None):
     def set_limits():
         def _try_or_exit(function, description):
             def fail(exception, exitcode):
@@ -38,7 +56,10 @@ def _get_preexec_function(time_limit, memory_limit):
                 fail(err, returncodes.DRIVER_INPUT_ERROR)
 
         _try_or_exit(lambda: limits.set_time_limit(time_limit), "Setting time limit")
-        _try_or_exit(lambda: limits.set_memory_limit(memory_limit), "Setting memory limit")
+        if cgroup_dir is None:
+            _try_or_exit(lambda: limits.set_memory_limit(memory_limit), "Setting memory limit")
+        else:
+            _try_or_exit(lambda: cgroups.enter_cgroup(cgroup_dir), "Entering cgroup")
 
     if time_limit is None and memory_limit is None:
         return None
@@ -46,25 +67,151 @@ def _get_preexec_function(time_limit, memory_limit):
         return set_limits
 
 
+def _convert_max_rss_to_bytes(max_rss):
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class Process(subprocess.Popen):
+    """Popen object that reaps the process with os.wait4() to report the
+    peak memory usage of the process. If the process runs in a cgroup
+    that limits its memory (see cgroups.py), we remove the cgroup after
+    the process terminated and translate a kill by the kernel because the
+    cgroup ran out of memory into the out-of-memory exit code of the
+    component. If the process reads from a *decompression* process, we
+    also wait for it and turn a failed decompression into an input
+    error."""
+    def __init__(self, nick, cmd, cgroup_dir=None, decompression=None, **kwargs):
+        self.nick = nick
+        self.cgroup_dir = cgroup_dir
+        self.decompression = decompression
+        self.rusage = None
+        super().__init__(cmd, **kwargs)
+
+    def poll(self):
+        if self.returncode is None:
+            self._reap(os.WNOHANG)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if timeout is None:
+            while self.returncode is None:
+                self._reap(0)
+        else:
+            deadline = time.monotonic() + timeout
+            while self.poll() is None:
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                time.sleep(min(0.05, remaining_time))
+        return self.returncode
+
+    def _reap(self, options):
+        try:
+            pid, status, rusage = os.wait4(self.pid, options)
+        except ChildProcessError:
+            # Like Popen, we cannot tell the exit status of a process
+            # that someone else reaped.
+            pid, status, rusage = self.pid, 0, None
+        if pid == 0:
+            return
+        self.returncode = os.waitstatus_to_exitcode(status)
+        self.rusage = rusage
+        self._report_memory()
+        self._check_decompression()
+
+    def _check_decompression(self):
+        if self.decompression is None:
+            return
+        # The decompression terminates once it wrote everything or the
+        # process closed the pipe, which it did by terminating.
+        returncode = self.decompression.wait()
+        self.decompression = None
+        if returncode not in [0, -signal.SIGPIPE]:
+            returncodes.print_stderr(
+                "Decompressing the input of {} failed with exit code {}".format(
+                    self.nick, returncode))
+            if self.returncode == 0:
+                self.returncode = returncodes.DRIVER_INPUT_ERROR
+
+    def _report_memory(self):
+        if self.rusage is not None:
+            peak_memory = _convert_max_rss_to_bytes(self.rusage.ru_maxrss)
+            logging.info("{} peak memory: {} KB".format(
+                self.nick, peak_memory // 1024))
+        if self.cgroup_dir is None:
+            return
+        cgroup_peak_memory, oom_kill = cgroups.get_component_memory_stats(
+            self.cgroup_dir)
+        cgroups.remove_component_cgroup(self.cgroup_dir)
+        if cgroup_peak_memory is not None:
+            logging.info("{} cgroup peak memory: {} KB".format(
+                self.nick, cgroup_peak_memory // 1024))
+        if oom_kill and self.returncode == -signal.SIGKILL:
+            logging.info("{} exceeded the memory limit of its cgroup".format(self.nick))
+            self.returncode = OUT_OF_MEMORY_EXITCODES.get(
+                self.nick, returncodes.SEARCH_OUT_OF_MEMORY)
+
+
+def _start_process(nick, cmd, stdin, time_limit, memory_limit, **kwargs):
+    """Start *cmd* with the given limits, reading from *stdin*, which
+    is PIPE, a file name or None. Compressed files are decompressed into
+    a pipe by a separate process, which terminates by itself after
+    writing everything or when *cmd* closes the pipe. The returned
+    Process waits for it."""
+    cgroup_dir = cgroups.create_component_cgroup(nick, memory_limit)
+    kwargs["preexec_fn"] = _get_preexec_function(time_limit, memory_limit, cgroup_dir)
+    sys.stdout.flush()
+    try:
+        if stdin and stdin != PIPE:
+            if compressed_files.is_compressed(stdin):
+                decompression = compressed_files.start_decompression(stdin)
+                try:
+                    return Process(nick, cmd, cgroup_dir, decompression=decompression,
+                                   stdin=decompression.stdout, **kwargs)
+                except BaseException:
+                    decompression.kill()
+                    decompression.wait()
+                    raise
+                finally:
+                    decompression.stdout.close()
+            else:
+                with open(stdin) as stdin_file:
+                    return Process(nick, cmd, cgroup_dir, stdin=stdin_file, **kwargs)
+        return Process(nick, cmd, cgroup_dir, stdin=stdin, **kwargs)
+    except BaseException:
+        if cgroup_dir is not None:
+            cgroups.remove_component_cgroup(cgroup_dir)
+        raise
+
+
 def check_call(nick, cmd, stdin=None, time_limit=None, memory_limit=None):
     print_call_settings(nick, cmd, stdin, time_limit, memory_limit)
 
-    kwargs = {"preexec_fn": _get_preexec_function(time_limit, memory_limit)}
+    with _start_process(nick, cmd, stdin, time_limit, memory_limit) as process:
+        returncode = process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
 
-    sys.stdout.flush()
-    if stdin:
-        with open(stdin) as stdin_file:
-            return subprocess.check_call(cmd, stdin=stdin_file, **kwargs)
-    else:
-        return subprocess.check_call(cmd, **kwargs)
 
+def start_call(nick, cmd, stdin=None, time_limit=None, memory_limit=None,
+               pass_fds=()):
+    """Start *cmd* like check_call(), but return the Process object
+    without waiting for the process to terminate. If *stdin* is PIPE,
+    the caller can write to the process via the stdin attribute of
+    the Process object."""
+    print_call_settings(nick, cmd, stdin, time_limit, memory_limit)
 
-def get_error_output_and_returncode(nick, cmd, time_limit=None, memory_limit=None):
-    print_call_settings(nick, cmd, None, time_limit, memory_limit)
+    return _start_process(nick, cmd, stdin, time_limit, memory_limit,
+                          pass_fds=pass_fds)
 
-    preexec_fn = _get_preexec_function(time_limit, memory_limit)
 
-    sys.stdout.flush()
-    p = subprocess.Popen(cmd, preexec_fn=preexec_fn, stderr=subprocess.PIPE)
+def get_error_output_and_returncode(nick, cmd, time_limit=None, memory_limit=None,
+                                    pass_fds=()):
+    print_call_settings(nick, cmd, None, time_limit, memory_limit)
+
+    p = _start_process(nick, cmd, None, time_limit, memory_limit,
+                       stderr=subprocess.PIPE, pass_fds=pass_fds)
     (stdout, stderr) = p.communicate()
     return stderr, p.returncode
@@ -0,0 +1,204 @@
+"""Enforce the memory limits of planner components with cgroup v2.
+
+Setting RLIMIT_AS (see limits.set_memory_limit()) limits the virtual
+address space, which over-counts memory that a process reserves but
+never uses. When the planner runs in a cgroup with a memory limit,
+exceeding that limit kills all processes in the cgroup, including the
+driver.
+
+With --cgroup-memory-limits, if the driver runs in a cgroup v2
+hierarchy that is delegated to the user, setup() moves the driver into
+its own leaf cgroup and enables the memory controller for the
+sub-cgroups. Each component with a memory limit then runs in a sibling
+cgroup with this limit as memory.max. Such limits count resident memory
+only, and when a component exceeds its limit, the kernel kills only the
+component. Since cgroups with enabled controllers may not contain
+processes, this only works if the driver is the only process in its
+cgroup, e.g., when it is started with
+"systemd-run --user --scope -p Delegate=yes". When the driver exits, it
+undoes these changes. In this case, the memory limit of the cgroup also
+counts as an overall limit from which we subtract the memory of the
+driver (see limits.get_memory_limit()). Without --cgroup-memory-limits
+or without delegation, we fall back to RLIMIT_AS and ignore the memory
+limit of the cgroup, since RLIMIT_AS over-counts the memory that the
+cgroup limits.
+"""
+
+import atexit
+import os
+import sys
+
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+DRIVER_CGROUP = "fast-downward-driver"
+
+_component_parent_dir = None
+_cgroup_root = CGROUP_ROOT
+_enabled_memory_controller = False
+_next_component_id = 0
+
+
+def _read(path):
+    with open(path) as cgroup_file:
+        return cgroup_file.read()
+
+
+def _write(path, value):
+    with open(path, "w") as cgroup_file:
+        cgroup_file.write(value)
+
+
+def get_cgroup_dir(root=CGROUP_ROOT):
+    """Return the directory of the cgroup v2 of the driver or None if
+    there is no cgroup v2 hierarchy at *root*."""
+    if (not sys.platform.startswith("linux") or
+            not os.path.exists(os.path.join(root, "cgroup.controllers"))):
+        return None
+    try:
+        lines = _read("/proc/self/cgroup").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        if line.startswith("0::"):
+            return os.path.join(root, line[3:].strip().lstrip("/"))
+    return None
+
+
+def get_memory_limit(cgroup_dir, root=CGROUP_ROOT):
+    """Return the tightest memory.max of *cgroup_dir* and its ancestors
+    in bytes or None if none of them limits memory."""
+    limits = []
+    cgroup_dir = os.path.abspath(cgroup_dir)
+    root = os.path.abspath(root)
+    while cgroup_dir.startswith(root):
+        try:
+            value = _read(os.path.join(cgroup_dir, "memory.max")).strip()
+        except OSError:
+            value = "max"
+        if value != "max":
+            limits.append(int(value))
+        if cgroup_dir == root:
+            break
+        cgroup_dir = os.path.dirname(cgroup_dir)
+    return min(limits) if limits else None
+
+
+def get_enforced_memory_limit():
+    """Return the memory limit of the cgroup of the driver in bytes if
+    setup() succeeded and the cgroup limits memory, otherwise None."""
+    if _component_parent_dir is None:
+        return None
+    return get_memory_limit(_component_parent_dir, _cgroup_root)
+
+
+def setup(root=CGROUP_ROOT):
+    """Prepare running components in their own cgroups if the cgroup
+    of the driver is delegated to us. Return True on success."""
+    global _component_parent_dir, _cgroup_root, _enabled_memory_controller
+    cgroup_dir = get_cgroup_dir(root)
+    # We do not reorganize the root cgroup of the system.
+    if cgroup_dir is None or os.path.abspath(cgroup_dir) == os.path.abspath(root):
+        print("Cannot use cgroups for memory limits (no delegated cgroup v2). "
+              "Using RLIMIT_AS.")
+        return False
+    driver_dir = os.path.join(cgroup_dir, DRIVER_CGROUP)
+    try:
+        if "memory" not in _read(os.path.join(cgroup_dir, "cgroup.controllers")).split():
+            raise OSError("memory controller not available")
+        # Processes may only live in leaf cgroups once the memory
+        # controller is enabled for sub-cgroups. We only move the
+        # driver, so this fails if other processes share its cgroup.
+        os.makedirs(driver_dir, exist_ok=True)
+        _write(os.path.join(driver_dir, "cgroup.procs"), str(os.getpid()))
+        subtree_control = os.path.join(cgroup_dir, "cgroup.subtree_control")
+        if "memory" not in _read(subtree_control).split():
+            _write(subtree_control, "+memory")
+            _enabled_memory_controller = True
+    except OSError as err:
+        print("Cannot use cgroups for memory limits ({}). Using RLIMIT_AS.".format(err))
+        _restore(cgroup_dir)
+        return False
+    _component_parent_dir = cgroup_dir
+    _cgroup_root = root
+    atexit.register(teardown)
+    print("Enforcing component memory limits with cgroups in {}".format(cgroup_dir))
+    return True
+
+
+def _restore(cgroup_dir):
+    global _enabled_memory_controller
+    try:
+        if _enabled_memory_controller:
+            _write(os.path.join(cgroup_dir, "cgroup.subtree_control"), "-memory")
+            _enabled_memory_controller = False
+        driver_dir = os.path.join(cgroup_dir, DRIVER_CGROUP)
+        if os.path.exists(driver_dir):
+            if str(os.getpid()) in _read(os.path.join(driver_dir, "cgroup.procs")).split():
+                _write(os.path.join(cgroup_dir, "cgroup.procs"), str(os.getpid()))
+            os.rmdir(driver_dir)
+    except OSError as err:
+        print("Cannot restore cgroup {} ({}).".format(cgroup_dir, err))
+
+
+def teardown():
+    """Move the driver back to its original cgroup and undo the changes
+    of setup()."""
+    global _component_parent_dir
+    if _component_parent_dir is not None:
+        _restore(_component_parent_dir)
+        _component_parent_dir = None
+
+
+def create_component_cgroup(nick, memory_limit):
+    """Return a new cgroup directory whose memory is limited to
+    *memory_limit* bytes or None if we cannot use cgroups."""
+    global _next_component_id
+    if _component_parent_dir is None or memory_limit is None:
+        return None
+    cgroup_dir = os.path.join(
+        _component_parent_dir,
+        "fast-downward-{}-{}".format(nick, _next_component_id))
+    _next_component_id += 1
+    try:
+        os.mkdir(cgroup_dir)
+        _write(os.path.join(cgroup_dir, "memory.max"), str(memory_limit))
+        swap_file = os.path.join(cgroup_dir, "memory.swap.max")
+        if os.path.exists(swap_file):
+            _write(swap_file, "0")
+    except OSError as err:
+        print("Cannot create cgroup {} ({}). Using RLIMIT_AS.".format(cgroup_dir, err))
+        remove_component_cgroup(cgroup_dir)
+        return None
+    return cgroup_dir
+
+
+def enter_cgroup(cgroup_dir):
+    """Move the calling process into *cgroup_dir*."""
+    _write(os.path.join(cgroup_dir, "cgroup.procs"), str(os.getpid()))
+
+
+def get_component_memory_stats(cgroup_dir):
+    """Return the peak memory usage of the cgroup in bytes (None if the
+    kernel does not record it) and whether the kernel killed a process
+    because the cgroup ran out of memory."""
+    peak = None
+    oom_kill = False
+    try:
+        peak = int(_read(os.path.join(cgroup_dir, "memory.peak")))
+    except (OSError, ValueError):
+        pass
+    try:
+        for line in _read(os.path.join(cgroup_dir, "memory.events")).splitlines():
+            key, value = line.split()
+            if key == "oom_kill":
+                oom_kill = int(value) > 0
+    except (OSError, ValueError):
+        pass
+    return peak, oom_kill
+
+
+def remove_component_cgroup(cgroup_dir):
+    try:
+        os.rmdir(cgroup_dir)
+    except OSError:
+        pass
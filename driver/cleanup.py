@@ -1,5 +1,10 @@
+import glob
 from itertools import count
 import os
+import shutil
+
+from .plan_manager import get_bound_file
+from .run_components import AE_WORKSPACE_SUFFIX
 
 def _try_remove(f):
     try:
@@ -11,7 +16,12 @@ def _try_remove(f):
 def cleanup_temporary_files(args):
     _try_remove(args.sas_file)
     _try_remove(args.plan_file)
+    _try_remove(get_bound_file(args.plan_file))
 
     for i in count(1):
         if not _try_remove("%s.%s" % (args.plan_file, i)):
             break
+
+    # Workspaces of action elimination runs that were aborted.
+    for workspace in glob.glob(glob.escape(args.plan_file) + AE_WORKSPACE_SUFFIX + "*"):
+        shutil.rmtree(workspace, ignore_errors=True)
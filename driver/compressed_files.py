@@ -0,0 +1,80 @@
+"""Support for SAS files compressed with gzip (".gz") or Zstandard (".zst").
+
+The search component only reads uncompressed tasks from stdin, so we
+decompress compressed tasks into a pipe with a separate process. We
+prefer the gzip and zstd executables and fall back to Python.
+"""
+
+import gzip
+import shutil
+import subprocess
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from . import returncodes
+
+
+def get_compression(filename):
+    """Return ".gz" or ".zst" if *filename* is compressed and None
+    otherwise."""
+    for extension in [".gz", ".zst"]:
+        if filename.endswith(extension):
+            return extension
+    return None
+
+
+def is_compressed(filename):
+    return get_compression(filename) is not None
+
+
+def open_text(filename):
+    """Open *filename* for reading text, decompressing it if needed."""
+    compression = get_compression(filename)
+    if compression == ".gz":
+        return gzip.open(filename, "rt")
+    elif compression == ".zst":
+        if zstandard is None:
+            returncodes.exit_with_driver_input_error(
+                "Reading {} requires the zstd executable or the zstandard "
+                "package.".format(filename))
+        return zstandard.open(filename, "rt")
+    else:
+        return open(filename)
+
+
+def get_decompress_command(filename):
+    """Return a command that writes the decompressed *filename* to stdout."""
+    compression = get_compression(filename)
+    assert compression is not None, filename
+    executable = {".gz": "gzip", ".zst": "zstd"}[compression]
+    if shutil.which(executable):
+        return [executable, "-dc", filename]
+    if compression == ".zst" and zstandard is None:
+        returncodes.exit_with_driver_input_error(
+            "Reading {} requires the zstd executable or the zstandard "
+            "package.".format(filename))
+    module = {".gz": "gzip", ".zst": "zstandard"}[compression]
+    # Like the executables, stop silently when the reader closes the pipe.
+    script = (
+        "import os, shutil, sys, {module}\n"
+        "try:\n"
+        "    with {module}.open(sys.argv[1], 'rb') as f:\n"
+        "        shutil.copyfileobj(f, sys.stdout.buffer, 1 << 20)\n"
+        "    sys.stdout.buffer.flush()\n"
+        "except BrokenPipeError:\n"
+        "    os._exit(0)\n").format(
+            module=module)
+    return [sys.executable, "-c", script, filename]
+
+
+def start_decompression(filename):
+    """Start decompressing *filename* and return the Popen object. Its
+    stdout attribute is the read end of a pipe with the uncompressed
+    content. The caller must wait for the process and check its exit
+    status (see call.Process)."""
+    return subprocess.Popen(
+        get_decompress_command(filename), stdout=subprocess.PIPE)
@@ -1,10 +1,12 @@
 import logging
+import os
 try:
     import resource
 except ImportError:
     resource = None
 import sys
 
+from . import cgroups
 from . import returncodes
 from . import util
 
@@ -48,6 +50,21 @@ def set_time_limit(time_limit):
         resource.setrlimit(resource.RLIMIT_CPU, (time_limit, time_limit))
 
 
+def update_time_limit(pid, time_limit):
+    """Allow the running process *pid* to use at most *time_limit* more
+    seconds of CPU time. Return False if this is not supported."""
+    if not hasattr(resource, "prlimit") or not sys.platform.startswith("linux"):
+        return False
+    # utime and stime are the 14th and 15th field of /proc/<pid>/stat.
+    # The second field (comm) is in parentheses and may contain spaces.
+    with open("/proc/%d/stat" % pid) as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    used_time = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    limit = round_time_limit(used_time + time_limit)
+    resource.prlimit(pid, resource.RLIMIT_CPU, (limit, limit + 1))
+    return True
+
+
 def set_memory_limit(memory):
     """*memory* must be given in bytes or None."""
     if memory is None:
@@ -61,10 +78,44 @@ def convert_to_mb(num_bytes):
     return num_bytes / (1024 * 1024)
 
 
+def get_driver_memory():
+    """
+    Return the resident memory of the driver process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return 0
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
 def get_memory_limit(component_limit, overall_limit):
     """
     Return the minimum of the component and overall limits or None if neither is set.
+
+    If components run in cgroups (see cgroups.setup()), the memory limit of
+    the cgroup of the driver counts as an overall limit. Since the driver
+    keeps running while a component runs, the memory that the driver uses
+    is subtracted from the overall limit.
     """
+    cgroup_limit = cgroups.get_enforced_memory_limit()
+    if cgroup_limit is not None and (
+            overall_limit is None or cgroup_limit < overall_limit):
+        overall_limit = cgroup_limit
+    if overall_limit is not None:
+        driver_memory = get_driver_memory()
+        if overall_limit <= driver_memory:
+            returncodes.exit_with_driver_critical_error(
+                "The driver uses {:.0f} MB, which leaves no memory of the "
+                "overall memory limit of {:.0f} MB for the components.".format(
+                    convert_to_mb(driver_memory), convert_to_mb(overall_limit)))
+        overall_limit -= driver_memory
     limits = [limit for limit in [component_limit, overall_limit] if limit is not None]
     return min(limits) if limits else None
 
@@ -4,6 +4,7 @@ import sys
 
 from . import aliases
 from . import arguments
+from . import cgroups
 from . import cleanup
 from . import limits
 from . import run_components
@@ -31,11 +32,24 @@ def main():
         sys.exit()
 
     limits.print_limits("planner", args.overall_time_limit, args.overall_memory_limit)
+    if args.cgroup_memory_limits:
+        cgroups.setup()
     print()
 
     exitcode = None
-    for component in args.components:
-        if component == "translate":
+    components = args.components
+    if args.pipe_translator_output:
+        # The search reads the translator output from a pipe, so both
+        # components run at the same time.
+        components = ["translate+search"] + components[2:]
+    for component in components:
+        if component == "translate+search":
+            translate_result, search_result = run_components.run_translate_and_search(args)
+            (exitcode, continue_execution) = translate_result
+            if search_result is not None:
+                print("translate exit code: {exitcode}".format(**locals()))
+                (exitcode, continue_execution) = search_result
+        elif component == "translate":
             (exitcode, continue_execution) = run_components.run_translate(args)
             if continue_execution and args.transform_task:
                 print()
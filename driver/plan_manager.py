@@ -2,19 +2,37 @@ import itertools
 import os
 import os.path
 import re
+import time
 
+from . import plan_watcher
 from . import returncodes
 
 
 _PLAN_INFO_REGEX = re.compile(r"; cost = (\d+) \((unit cost|general cost)\)\n")
 
+# The plan info line is short, so we only need to read the end of a plan.
+_TAIL_SIZE = 256
+
 
 def _read_last_line(filename):
-    line = None
-    with open(filename) as input_file:
-        for line in input_file:
-            pass
-    return line
+    """Return the last line of *filename* with its line break or None if
+    the file is empty. We read the file backwards in blocks of _TAIL_SIZE
+    bytes until we find the line break before the last line."""
+    tail = b""
+    with open(filename, "rb") as input_file:
+        position = input_file.seek(0, os.SEEK_END)
+        while position > 0:
+            start = max(0, position - _TAIL_SIZE)
+            input_file.seek(start)
+            tail = input_file.read(position - start) + tail
+            position = start
+            if tail.rfind(b"\n", 0, len(tail) - 1) != -1:
+                break
+    if not tail:
+        return None
+    # Keep the line break of the last line, but split off earlier lines.
+    # A plan that is still being written may end within a character.
+    return tail[tail.rfind(b"\n", 0, len(tail) - 1) + 1:].decode(errors="replace")
 
 
 def _parse_plan(plan_filename):
@@ -30,9 +48,22 @@ def _parse_plan(plan_filename):
         return None, None
 
 
+def get_bound_file(plan_prefix):
+    return "%s.bound" % plan_prefix
+
+
 class PlanManager:
-    def __init__(self, plan_prefix, portfolio_bound=None, single_plan=False):
+    def __init__(self, plan_prefix, portfolio_bound=None, single_plan=False,
+                 share_bound=False):
+        """If *share_bound* is true, we write the cost of the best plan
+        into the bound file whenever we find a new plan, so that
+        searches started with --internal-bound-file can use it."""
         self._plan_prefix = plan_prefix
+        self._bound_file = get_bound_file(plan_prefix) if share_bound else None
+        self._new_plan_callbacks = []
+        if share_bound:
+            self.add_new_plan_callback(self._write_bound_file)
+        self._watcher = None
         self._plan_costs = []
         self._problem_type = None
         if portfolio_bound is None:
@@ -43,6 +74,44 @@ class PlanManager:
     def get_plan_prefix(self):
         return self._plan_prefix
 
+    def get_bound_file(self):
+        """Return the bound file or None if the bound is not shared."""
+        return self._bound_file
+
+    def add_new_plan_callback(self, callback):
+        """Call callback(plan_filename, cost) whenever a new plan is
+        found. Callbacks are run in the order they were added."""
+        self._new_plan_callbacks.append(callback)
+
+    def wait_for_plan_files(self, timeout):
+        """Wait until a file is written in the plan directory or
+        *timeout* seconds have passed. Return False if we know that
+        no file has been written."""
+        if self._watcher is None:
+            plan_dir = os.path.dirname(os.path.abspath(self._plan_prefix))
+            self._watcher = plan_watcher.create_watcher(plan_dir)
+            # Files might have been written before we started watching.
+            return True
+        return self._watcher.wait(timeout)
+
+    def wait_for_new_plans(self, timeout):
+        """Like wait_for_plan_files(), but also read new complete plans."""
+        if self.wait_for_plan_files(timeout):
+            self.process_new_plans(final=False)
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+    def _write_bound_file(self, plan_filename, cost):
+        # Replace the file atomically, so searches never read partial contents.
+        tmp_file = self._bound_file + ".tmp"
+        with open(tmp_file, "w") as bound_file:
+            bound_file.write("%d %f\n" % (cost, time.time()))
+        os.replace(tmp_file, self._bound_file)
+        print("plan manager: shared bound %d" % cost)
+
     def get_plan_counter(self):
         return len(self._plan_costs)
 
@@ -67,11 +136,13 @@ class PlanManager:
             returncodes.exit_with_driver_critical_error("no plans found yet: cost type not set")
         return self._problem_type
 
-    def process_new_plans(self):
+    def process_new_plans(self, final=True):
         """Update information about plans after a planner run.
 
         Read newly generated plans and store the relevant information.
-        If the last plan file is incomplete, delete it.
+        If the last plan file is incomplete, delete it if *final* is
+        true. Otherwise, the planner might still be writing it and we
+        read it again the next time.
         """
 
         had_incomplete_plan = False
@@ -84,6 +155,8 @@ class PlanManager:
             if had_incomplete_plan:
                 bogus_plan("plan found after incomplete plan")
             cost, problem_type = _parse_plan(plan_filename)
+            if cost is None and not final:
+                break
             if cost is None:
                 had_incomplete_plan = True
                 print("%s is incomplete. Deleted the file." % plan_filename)
@@ -100,6 +173,48 @@ class PlanManager:
                     if cost >= self._plan_costs[-1]:
                         bogus_plan("plan quality has not improved")
                 self._plan_costs.append(cost)
+                for callback in self._new_plan_callbacks:
+                    callback(plan_filename, cost)
+
+    def adopt_plans(self, plan_prefix, first_number=1, final=False):
+        """Move plans written with a different *plan_prefix* into the
+        numbering of this plan manager.
+
+        This is used for searches that run in parallel, which cannot
+        share a plan prefix. Plans are read starting with plan number
+        *first_number*. Plans that do not improve on the best plan
+        found so far are deleted. An incomplete plan ends the scan and
+        is only deleted if *final* is true, i.e., if the search that
+        writes the plans has terminated. Return the number of the first
+        plan that has not been adopted.
+        """
+        for number in itertools.count(first_number):
+            plan_filename = "%s.%d" % (plan_prefix, number)
+            if not os.path.exists(plan_filename):
+                return number
+            cost, _ = _parse_plan(plan_filename)
+            if cost is None:
+                if final:
+                    print("%s is incomplete. Deleted the file." % plan_filename)
+                    os.remove(plan_filename)
+                return number
+            self._adopt_plan_file(plan_filename, cost)
+
+    def adopt_plan_file(self, plan_filename):
+        """Move the complete plan *plan_filename* into the numbering of
+        this plan manager if it improves on the best plan found so far
+        and delete it otherwise."""
+        cost, _ = _parse_plan(plan_filename)
+        assert cost is not None, "incomplete plan: %s" % plan_filename
+        self._adopt_plan_file(plan_filename, cost)
+
+    def _adopt_plan_file(self, plan_filename, cost):
+        if self._plan_costs and cost >= self._plan_costs[-1]:
+            print("plan manager: discarded plan with cost %d" % cost)
+            os.remove(plan_filename)
+        else:
+            os.replace(plan_filename, self._get_plan_file(self.get_plan_counter() + 1))
+            self.process_new_plans()
 
     def get_existing_plans(self):
         """Yield all plans that match the given plan prefix."""
@@ -117,6 +232,11 @@ class PlanManager:
         """Delete all plans that match the given plan prefix."""
         for plan in self.get_existing_plans():
             os.remove(plan)
+        self.delete_bound_file()
+
+    def delete_bound_file(self):
+        if self._bound_file is not None and os.path.exists(self._bound_file):
+            os.remove(self._bound_file)
 
     def _get_plan_file(self, number):
         return "%s.%d" % (self._plan_prefix, number)
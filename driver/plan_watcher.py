@@ -0,0 +1,72 @@
+"""Wait for plan files written by running searches.
+
+On Linux, we use inotify to wake up as soon as a search closes a plan
+file. On other platforms or if inotify is unavailable (e.g., because
+the limit of inotify instances is reached), we fall back to polling.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+
+# Constants from <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+class PollingWatcher:
+    def wait(self, timeout):
+        """Wait for at most *timeout* seconds. Return True if a file
+        might have been written in the meantime."""
+        time.sleep(timeout)
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        watch = libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if watch < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, os.strerror(errno))
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        # We only care whether something happened, so we discard the events.
+        try:
+            while os.read(self._fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self._fd)
+
+
+def create_watcher(directory):
+    """Return a watcher for files written in *directory*."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (AttributeError, OSError) as err:
+            print("Cannot watch {} with inotify ({}). Using polling.".format(
+                directory, err))
+    return PollingWatcher()
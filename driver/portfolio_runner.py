@@ -1,28 +1,59 @@
 """ Module for running planner portfolios.
 
 Memory limits: We apply the same memory limit that is given to the
-plan script to each planner call. Note that this setup does not work if
-the sum of the memory usage of the Python process and the planner calls
-is limited. In this case the Python process might get killed although
+plan script to each planner call. If the sum of the memory usage of the
+Python process and the planner calls is limited, e.g., by the cgroup of
+the planner, exceeding the limit might kill the Python process although
 we would like to kill only the single planner call and continue with
-the remaining configurations. If we ever want to support this scenario
-we will have to reduce the memory limit of the planner calls by the
-amount of memory that the Python process needs. On maia for example
-this amounts to 128MB of reserved virtual memory. We can make Python
-reserve less space by lowering the soft limit for virtual memory before
-the process is started.
+the remaining configurations. Therefore, limits.get_memory_limit()
+subtracts the memory of the Python process from the overall limit, and
+if we may create cgroups, each planner call runs in its own cgroup (see
+cgroups.py).
+
+Parallel portfolios: With --portfolio-jobs N, up to N configurations run
+at the same time. Each of them gets 1/N of the memory limit and the
+search time limit is treated as a wall-clock limit for the whole
+portfolio. Since parallel searches cannot share a plan prefix, each
+search writes its plans with its own prefix and we move improving plans
+into the regular plan numbering as soon as they are complete. This way,
+configurations that start later use the best plan cost found so far as
+their bound. Configurations that are already running read the best plan
+cost from a bound file that the plan manager updates (see
+--internal-bound-file in the search component).
+
+Run history: With --portfolio-history FILE, we record the outcome of
+each configuration run in FILE and scale the relative times of the
+configurations by how well they did on similar tasks. Configurations
+that ran out of memory early on smaller tasks are skipped or replaced
+by the variants in the optional LOW_MEMORY_VARIANTS attribute of the
+portfolio (see run_history).
+
+Action elimination: With --portfolio-async-eliminate-actions (or in
+parallel portfolios with --portfolio-eliminate-actions), action
+elimination runs in the background for each new plan while the
+portfolio continues. Reduced plans are adopted like plans of parallel
+configurations, so their cost is shared as well.
+
+Search server: With --portfolio-search-server, a persistent search
+process reads the task once and forks each configuration from it (see
+search_server). Like parallel portfolios, such portfolios are scheduled
+by wall-clock time.
 """
 
 __all__ = ["run"]
 
-import subprocess
+import os
 import sys
+import time
 
+from . import action_elimination_worker
 from . import call
 from . import limits
 from . import returncodes
-from . import util
 from . import run_components
+from . import run_history
+from . import search_server
+from . import util
 
 
 DEFAULT_TIMEOUT = 1800
@@ -63,17 +94,26 @@ def adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager):
             break
 
 
-def run_search(executable, args, sas_file, plan_manager, time, memory):
-    complete_args = [executable] + args + [
-        "--internal-plan-file", plan_manager.get_plan_prefix()]
-    print("args: %s" % complete_args)
+def has_cost_bound(plan_manager):
+    return plan_manager.get_next_portfolio_cost_bound() != "infinity"
 
-    try:
-        exitcode = call.check_call(
-            "search", complete_args, stdin=sas_file,
-            time_limit=time, memory_limit=memory)
-    except subprocess.CalledProcessError as err:
-        exitcode = err.returncode
+
+def record_run(history, args, exitcode, run_time, time_limit, plan_manager,
+               bounded):
+    if history is not None:
+        history.record(
+            args, exitcode, run_time, time_limit,
+            plan_manager.get_next_portfolio_cost_bound(), bounded)
+
+
+def run_search(executable, args, sas_file, plan_manager, time, memory):
+    process = start_search(
+        executable, args, sas_file, plan_manager.get_plan_prefix(), time, memory)
+    # Read plans as soon as they are written, so that new plan callbacks
+    # run while the search is still running.
+    while process.poll() is None:
+        plan_manager.wait_for_new_plans(POLL_INTERVAL)
+    exitcode = process.returncode
     print("exitcode: %d" % exitcode)
     print()
     return exitcode
@@ -91,24 +131,30 @@ def compute_run_time(timeout, configs, pos):
 
 
 def run_sat_config(configs, pos, search_cost_type, heuristic_cost_type,
-                   executable, sas_file, plan_manager, timeout, memory):
+                   executable, sas_file, plan_manager, timeout, memory,
+                   history=None):
     run_time = compute_run_time(timeout, configs, pos)
     if run_time <= 0:
         return None
     _, args_template = configs[pos]
     args = list(args_template)
+    bounded = has_cost_bound(plan_manager)
     adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager)
     if not plan_manager.abort_portfolio_after_first_plan():
         args.extend([
             "--internal-previous-portfolio-plans",
             str(plan_manager.get_plan_counter())])
+    start_time = util.get_elapsed_time()
     result = run_search(executable, args, sas_file, plan_manager, run_time, memory)
     plan_manager.process_new_plans()
+    record_run(history, args_template, result,
+               util.get_elapsed_time() - start_time, run_time, plan_manager,
+               bounded)
     return result
 
 
 def run_sat(configs, executable, sas_file, plan_manager, final_config,
-            final_config_builder, timeout, memory, cmd_args):
+            final_config_builder, timeout, memory, cmd_args, history=None):
     # If the configuration contains S_COST_TYPE or H_COST_TRANSFORM and the task
     # has non-unit costs, we start by treating all costs as one. When we find
     # a solution, we rerun the successful config with real costs.
@@ -122,7 +168,7 @@ def run_sat(configs, executable, sas_file, plan_manager, final_config,
             start_time = util.get_elapsed_time()
             exitcode = run_sat_config(
                 configs, pos, search_cost_type, heuristic_cost_type,
-                executable, sas_file, plan_manager, timeout, memory)
+                executable, sas_file, plan_manager, timeout, memory, history)
             end_time = util.get_elapsed_time()
             if exitcode is None:
                 continue
@@ -150,7 +196,8 @@ def run_sat(configs, executable, sas_file, plan_manager, final_config,
                     heuristic_cost_type = "plusone"
                     exitcode = run_sat_config(
                         configs, pos, search_cost_type, heuristic_cost_type,
-                        executable, sas_file, plan_manager, timeout, memory)
+                        executable, sas_file, plan_manager, timeout, memory,
+                        history)
                     if exitcode is None:
                         return
 
@@ -173,24 +220,304 @@ def run_sat(configs, executable, sas_file, plan_manager, final_config,
         exitcode = run_sat_config(
             [(1, final_config)], 0, search_cost_type,
             heuristic_cost_type, executable, sas_file, plan_manager,
-            timeout, memory)
+            timeout, memory, history)
         if exitcode is not None:
             yield exitcode
 
 
-def run_opt(configs, executable, sas_file, plan_manager, timeout, memory):
+def run_opt(configs, executable, sas_file, plan_manager, timeout, memory,
+            history=None):
     for pos, (relative_time, args) in enumerate(configs):
         run_time = compute_run_time(timeout, configs, pos)
         if run_time <= 0:
             return
+        start_time = util.get_elapsed_time()
         exitcode = run_search(executable, args, sas_file, plan_manager,
                               run_time, memory)
+        record_run(history, args, exitcode,
+                   util.get_elapsed_time() - start_time, run_time,
+                   plan_manager, bounded=False)
         yield exitcode
 
         if exitcode in [returncodes.SUCCESS, returncodes.SEARCH_UNSOLVABLE]:
             break
 
 
+# Seconds between checks for new plans and terminated jobs.
+POLL_INTERVAL = 0.1
+
+
+class PortfolioJob:
+    """A portfolio configuration that runs in parallel to others."""
+    def __init__(self, pos, args, process, plan_prefix, run_time,
+                 bounded=False):
+        """*bounded* tells whether the job started with the cost of an
+        earlier plan as bound."""
+        self.pos = pos
+        self.args = args
+        self.process = process
+        self.plan_prefix = plan_prefix
+        self.run_time = run_time
+        self.bounded = bounded
+        self.start_time = time.monotonic()
+        self.next_plan_number = 1
+
+    def get_wall_clock_time(self):
+        return time.monotonic() - self.start_time
+
+
+def get_deadline(time_limit):
+    return time.monotonic() + time_limit
+
+
+def compute_parallel_run_time(deadline, configs, pos, jobs):
+    """Like compute_run_time(), but the remaining relative time is
+    distributed over *jobs* parallel slots of wall-clock time."""
+    remaining_time = deadline - time.monotonic()
+    print("remaining time: {}".format(remaining_time))
+    relative_time = configs[pos][0]
+    remaining_relative_time = sum(config[0] for config in configs[pos:])
+    absolute_time_limit = limits.round_time_limit(min(
+        remaining_time,
+        jobs * remaining_time * relative_time / remaining_relative_time))
+    print("config {}: relative time {}, remaining time {}, absolute time {}".format(
+          pos, relative_time, remaining_relative_time, absolute_time_limit))
+    return absolute_time_limit
+
+
+def start_search(executable, args, sas_file, plan_prefix, time, memory):
+    """Start the search and return its process. *executable* is the
+    path of the search binary or a running SearchServer."""
+    if isinstance(executable, search_server.SearchServer):
+        complete_args = args + ["--internal-plan-file", plan_prefix]
+        print("server args: %s" % complete_args)
+        return executable.start(complete_args, time, memory)
+    complete_args = [executable] + args + ["--internal-plan-file", plan_prefix]
+    print("args: %s" % complete_args)
+    return call.start_call(
+        "search", complete_args, stdin=sas_file,
+        time_limit=time, memory_limit=memory)
+
+
+def get_job_plan_prefix(plan_manager, pos):
+    return "%s.job%d" % (plan_manager.get_plan_prefix(), pos)
+
+
+def wait_for_job(running, plan_manager=None, ae_worker=None):
+    """Wait until one of the *running* jobs terminates, remove it from
+    the list and return it. If a plan manager is given, adopt the
+    complete plans of all jobs while waiting. If an action elimination
+    worker is given, keep it going while waiting."""
+    plans_changed = True
+    while True:
+        if ae_worker is not None:
+            ae_worker.poll()
+        for job in running:
+            if plan_manager is not None and plans_changed:
+                job.next_plan_number = plan_manager.adopt_plans(
+                    job.plan_prefix, job.next_plan_number)
+            if job.process.poll() is not None:
+                running.remove(job)
+                if plan_manager is not None:
+                    job.next_plan_number = plan_manager.adopt_plans(
+                        job.plan_prefix, job.next_plan_number, final=True)
+                print("config {} exitcode: {}".format(
+                    job.pos, job.process.returncode))
+                print()
+                return job
+        if plan_manager is not None:
+            plans_changed = plan_manager.wait_for_plan_files(POLL_INTERVAL)
+        else:
+            time.sleep(POLL_INTERVAL)
+
+
+def terminate_jobs(running, plan_manager=None):
+    """Stop all *running* jobs. If a plan manager is given, adopt the
+    plans the jobs found before they were stopped."""
+    for job in running:
+        job.process.terminate()
+    for job in running:
+        job.process.wait()
+        print("terminated config {}".format(job.pos))
+        if plan_manager is not None:
+            plan_manager.adopt_plans(
+                job.plan_prefix, job.next_plan_number, final=True)
+    del running[:]
+
+
+def start_sat_job(configs, pos, search_cost_type, heuristic_cost_type,
+                  executable, sas_file, plan_manager, deadline, jobs, memory):
+    run_time = compute_parallel_run_time(deadline, configs, pos, jobs)
+    if run_time <= 0:
+        return None
+    _, args_template = configs[pos]
+    args = list(args_template)
+    bounded = has_cost_bound(plan_manager)
+    adapt_args(args, search_cost_type, heuristic_cost_type, plan_manager)
+    # All plans of a job are numbered from 1 because the job has its
+    # own plan prefix.
+    args.extend(["--internal-previous-portfolio-plans", "0"])
+    if plan_manager.get_bound_file():
+        # Let the job tighten its bound when other jobs find cheaper plans.
+        args.extend(["--internal-bound-file", plan_manager.get_bound_file()])
+    plan_prefix = get_job_plan_prefix(plan_manager, pos)
+    process = start_search(
+        executable, args, sas_file, plan_prefix, run_time, memory)
+    return PortfolioJob(
+        pos, args_template, process, plan_prefix, run_time, bounded)
+
+
+def record_job(history, job, plan_manager):
+    record_run(history, job.args, job.process.returncode,
+               job.get_wall_clock_time(), job.run_time, plan_manager,
+               job.bounded)
+
+
+def get_memory_shares(jobs, optimal, cmd_args):
+    """Return the number of equal shares into which parallel portfolios
+    divide the memory limit: one per job and one for action elimination
+    in satisficing portfolios."""
+    if not optimal and cmd_args.portfolio_eliminate_actions:
+        return jobs + 1
+    return jobs
+
+
+def run_sat_parallel(configs, executable, sas_file, plan_manager, final_config,
+                     final_config_builder, deadline, memory, cmd_args, jobs,
+                     history=None):
+    """Run the satisficing portfolio with up to *jobs* configs at a
+    time. In contrast to run_sat(), we do not repeat a successful
+    config with real costs, but start all configs that begin after
+    the first plan has been found with real costs.
+
+    Action elimination runs in the background for every new plan and
+    gets the same memory share as each job."""
+    ae_worker = None
+    shares = get_memory_shares(jobs, False, cmd_args)
+    if cmd_args.portfolio_eliminate_actions:
+        ae_memory = memory // shares if memory is not None else None
+        ae_worker = action_elimination_worker.ActionEliminationWorker(
+            cmd_args, plan_manager, deadline, ae_memory)
+    job_memory = memory // shares if memory is not None else None
+    final_config_memory = (memory - (memory // shares) * (shares - jobs)
+                           if memory is not None else None)
+    try:
+        yield from _run_sat_parallel(
+            configs, executable, sas_file, plan_manager, final_config,
+            final_config_builder, deadline, job_memory, final_config_memory,
+            jobs, ae_worker, history)
+    except BaseException:
+        # This includes GeneratorExit if the portfolio stops early.
+        if ae_worker is not None:
+            ae_worker.stop()
+        raise
+    if ae_worker is not None:
+        ae_worker.finish(POLL_INTERVAL)
+
+
+def _run_sat_parallel(configs, executable, sas_file, plan_manager, final_config,
+                      final_config_builder, deadline, job_memory,
+                      final_config_memory, jobs, ae_worker, history):
+    heuristic_cost_type = "one"
+    search_cost_type = "one"
+    running = []
+    # A static FINAL_CONFIG runs after the first round, a built one
+    # replaces the rest of the portfolio right away.
+    built_final_config = False
+    while configs:
+        configs_next_round = []
+        pending = list(range(len(configs)))
+        while pending or running:
+            while pending and len(running) < jobs and not built_final_config:
+                job = start_sat_job(
+                    configs, pending.pop(0), search_cost_type,
+                    heuristic_cost_type, executable, sas_file, plan_manager,
+                    deadline, jobs, job_memory)
+                if job is not None:
+                    running.append(job)
+            if not running:
+                break
+            job = wait_for_job(running, plan_manager, ae_worker)
+            record_job(history, job, plan_manager)
+            exitcode = job.process.returncode
+
+            yield exitcode
+            if exitcode == returncodes.SEARCH_UNSOLVABLE:
+                terminate_jobs(running, plan_manager)
+                return
+
+            if exitcode == returncodes.SUCCESS:
+                if plan_manager.abort_portfolio_after_first_plan():
+                    terminate_jobs(running, plan_manager)
+                    return
+                configs_next_round.append(configs[job.pos])
+                if (search_cost_type == "one" and
+                        plan_manager.get_problem_type() == "general cost"):
+                    print("Switch to real costs for all configs started from now on.")
+                    search_cost_type = "normal"
+                    heuristic_cost_type = "plusone"
+                if final_config_builder:
+                    print("Build final config.")
+                    final_config = final_config_builder(job.args)
+                    built_final_config = True
+                    terminate_jobs(running, plan_manager)
+                    break
+
+        if final_config:
+            break
+
+        # Only run the successful configs in the next round.
+        configs = configs_next_round
+
+    if final_config:
+        print("Abort portfolio and run final config.")
+        job = start_sat_job(
+            [(1, final_config)], 0, search_cost_type, heuristic_cost_type,
+            executable, sas_file, plan_manager, deadline, 1, final_config_memory)
+        if job is not None:
+            wait_for_job([job], plan_manager, ae_worker)
+            record_job(history, job, plan_manager)
+            yield job.process.returncode
+
+
+def run_opt_parallel(configs, executable, sas_file, plan_manager, deadline,
+                     memory, jobs, history=None):
+    """Run the optimal portfolio with up to *jobs* configs at a time.
+    As soon as one config solves the task or proves it unsolvable, we
+    stop all other configs."""
+    job_memory = memory // jobs if memory is not None else None
+    pending = list(range(len(configs)))
+    running = []
+    while pending or running:
+        while pending and len(running) < jobs:
+            pos = pending.pop(0)
+            run_time = compute_parallel_run_time(deadline, configs, pos, jobs)
+            if run_time <= 0:
+                continue
+            plan_prefix = get_job_plan_prefix(plan_manager, pos)
+            process = start_search(
+                executable, list(configs[pos][1]), sas_file, plan_prefix,
+                run_time, job_memory)
+            running.append(
+                PortfolioJob(pos, configs[pos][1], process, plan_prefix, run_time))
+        if not running:
+            return
+        job = wait_for_job(running)
+        record_job(history, job, plan_manager)
+        exitcode = job.process.returncode
+        yield exitcode
+
+        if exitcode in [returncodes.SUCCESS, returncodes.SEARCH_UNSOLVABLE]:
+            terminate_jobs(running)
+            if exitcode == returncodes.SUCCESS:
+                os.replace(job.plan_prefix, plan_manager.get_plan_prefix())
+            for pos in range(len(configs)):
+                prefix = get_job_plan_prefix(plan_manager, pos)
+                if os.path.exists(prefix):
+                    os.remove(prefix)
+            return
+
+
 def can_change_cost_type(args):
     return any("S_COST_TYPE" in part or "H_COST_TRANSFORM" in part for part in args)
 
@@ -213,6 +540,15 @@ def get_portfolio_attributes(portfolio):
     return attributes
 
 
+def get_task_name(args, sas_file):
+    """Return a name that identifies the task across planner runs: the
+    PDDL problem file if we translated the task and the search input
+    otherwise."""
+    if args.translate_inputs:
+        return os.path.abspath(args.translate_inputs[-1])
+    return os.path.abspath(sas_file)
+
+
 def run(portfolio, executable, sas_file, plan_manager, time, memory, args):
     """
     Run the configs in the given portfolio file.
@@ -238,13 +574,68 @@ def run(portfolio, executable, sas_file, plan_manager, time, memory, args):
                 "Portfolios need a time limit. Please pass --search-time-limit "
                 "or --overall-time-limit to fast-downward.py.")
 
-    timeout = util.get_elapsed_time() + time
-
-    if optimal:
-        exitcodes = run_opt(
-            configs, executable, sas_file, plan_manager, timeout, memory)
-    else:
-        exitcodes = run_sat(
-            configs, executable, sas_file, plan_manager, final_config,
-            final_config_builder, timeout, memory, args)
-    return returncodes.generate_portfolio_exitcode(list(exitcodes))
+    jobs = args.portfolio_jobs
+    parallel = (jobs > 1 or args.portfolio_search_server or
+                (args.portfolio_async_eliminate_actions and not optimal))
+
+    history = None
+    if args.portfolio_history:
+        config_memory = memory
+        if parallel and memory is not None:
+            config_memory = memory // get_memory_shares(jobs, optimal, args)
+        history = run_history.RunHistory(
+            args.portfolio_history, portfolio, get_task_name(args, sas_file),
+            sas_file, config_memory)
+        configs = history.prune_configs(
+            configs, attributes.get("LOW_MEMORY_VARIANTS", {}))
+        configs = history.adapt_configs(configs)
+
+    server = None
+    # The runners are generators, so exceptions may occur while we
+    # collect their exit codes. Stop the server, the plan watcher and
+    # remove the bound file in any case. After an exception, the server
+    # would wait for the running searches, so we kill them first.
+    try:
+        if parallel:
+            modes = []
+            if jobs > 1:
+                modes.append("up to {} configs in parallel".format(jobs))
+            if args.portfolio_search_server:
+                modes.append("configs in a search server")
+            if args.portfolio_async_eliminate_actions and not optimal:
+                modes.append("action elimination in the background")
+            print("Running {}.".format(" and ".join(modes)))
+            deadline = get_deadline(time)
+            if args.portfolio_search_server:
+                server = search_server.start_server(executable, sas_file, memory)
+            search_executable = server or executable
+            if optimal:
+                exitcodes = run_opt_parallel(
+                    configs, search_executable, sas_file, plan_manager, deadline,
+                    memory, jobs, history)
+            else:
+                exitcodes = run_sat_parallel(
+                    configs, search_executable, sas_file, plan_manager,
+                    final_config, final_config_builder, deadline, memory, args,
+                    jobs, history)
+        else:
+            timeout = util.get_elapsed_time() + time
+            if optimal:
+                exitcodes = run_opt(
+                    configs, executable, sas_file, plan_manager, timeout, memory,
+                    history)
+            else:
+                exitcodes = run_sat(
+                    configs, executable, sas_file, plan_manager, final_config,
+                    final_config_builder, timeout, memory, args, history)
+        exitcodes = list(exitcodes)
+    except BaseException:
+        if server is not None:
+            server.kill_searches()
+        raise
+    finally:
+        if server is not None:
+            server.close()
+        plan_manager.stop_watching()
+        plan_manager.delete_bound_file()
+    return returncodes.generate_portfolio_exitcode(exitcodes)
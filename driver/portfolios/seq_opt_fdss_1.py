@@ -18,3 +18,13 @@ CONFIGS = [
     (569, ["--search",
            "astar(lmcut())"]),
      ]
+
+# Replacements for configs (by position in CONFIGS) that the run history
+# predicts to run out of memory (see --portfolio-history).
+LOW_MEMORY_VARIANTS = {
+    0: ["--search",
+        "astar(merge_and_shrink(merge_strategy=merge_precomputed(merge_tree=linear(variable_order=reverse_level)),"
+        "shrink_strategy=shrink_bisimulation(greedy=true),"
+        "label_reduction=exact(before_shrinking=true,before_merging=false),"
+        "max_states=50000,threshold_before_merge=1))"],
+}
@@ -7,8 +7,10 @@ import signal
 import subprocess
 import sys
 import re
+import tempfile
 import time
 
+from . import action_elimination_windows
 from . import call
 from . import limits
 from . import portfolio_runner
@@ -19,6 +21,7 @@ from .plan_manager import PlanManager
 # TODO: We might want to turn translate into a module and call it with "python3 -m translate".
 REL_TRANSLATE_PATH = os.path.join("translate", "translate.py")
 REL_ACTION_ELIMINATION_PATH = os.path.join("translate", "action_elim.py")
+REL_PLAN_SIMULATOR_PATH = os.path.join("translate", "plan_simulator.py")
 if os.name == "posix":
     REL_SEARCH_PATH = "downward"
     VALIDATE = "validate"
@@ -59,16 +62,28 @@ def run_translate(args):
         args.translate_time_limit, args.overall_time_limit)
     memory_limit = limits.get_memory_limit(
         args.translate_memory_limit, args.overall_memory_limit)
-    translate = get_executable(args.build, REL_TRANSLATE_PATH)
-    assert sys.executable, "Path to interpreter could not be found"
-    cmd = [sys.executable] + [translate] + args.translate_inputs + args.translate_options
+    cmd = _get_translate_cmd(args)
 
     stderr, returncode = call.get_error_output_and_returncode(
         "translator",
         cmd,
         time_limit=time_limit,
         memory_limit=memory_limit)
+    return _get_translate_result(stderr, returncode)
+
+
+def _get_translate_cmd(args, sas_file=None):
+    """Return the translator command. If *sas_file* is given, it
+    replaces the --sas-file argument set by the argument parser."""
+    translate = get_executable(args.build, REL_TRANSLATE_PATH)
+    assert sys.executable, "Path to interpreter could not be found"
+    options = list(args.translate_options)
+    if sas_file is not None:
+        options[options.index("--sas-file") + 1] = sas_file
+    return [sys.executable] + [translate] + args.translate_inputs + options
 
+
+def _get_translate_result(stderr, returncode):
     # We collect stderr of the translator and print it here, unless
     # the translator ran out of memory and all output in stderr is
     # related to MemoryError.
@@ -141,7 +156,9 @@ def run_search(args):
     plan_manager = PlanManager(
         args.plan_file,
         portfolio_bound=args.portfolio_bound,
-        single_plan=args.portfolio_single_plan)
+        single_plan=args.portfolio_single_plan,
+        share_bound=bool(args.portfolio) and (
+            args.portfolio_jobs > 1 or args.portfolio_async_eliminate_actions))
     plan_manager.delete_existing_plans()
 
     if args.portfolio:
@@ -164,39 +181,116 @@ def run_search(args):
                 time_limit=time_limit,
                 memory_limit=memory_limit)
         except subprocess.CalledProcessError as err:
-            # TODO: if we ever add support for SEARCH_PLAN_FOUND_AND_* directly
-            # in the planner, this assertion no longer holds. Furthermore, we
-            # would need to return (err.returncode, True) if the returncode is
-            # in [0..10].
-            # Negative exit codes are allowed for passing out signals.
-            assert err.returncode >= 10 or err.returncode < 0, "got returncode < 10: {}".format(err.returncode)
-            return (err.returncode, False)
+            return _get_search_result(err.returncode)
         else:
-            return (0, True)
+            return _get_search_result(0)
+
+
+def _get_search_result(returncode):
+    if returncode == 0:
+        return (0, True)
+    # TODO: if we ever add support for SEARCH_PLAN_FOUND_AND_* directly
+    # in the planner, this assertion no longer holds. Furthermore, we
+    # would need to return (returncode, True) if the returncode is
+    # in [0..10].
+    # Negative exit codes are allowed for passing out signals.
+    assert returncode >= 10 or returncode < 0, "got returncode < 10: {}".format(returncode)
+    return (returncode, False)
+
+
+def _get_min_limit(*values):
+    values = [value for value in values if value is not None]
+    return min(values) if values else None
+
+
+def run_translate_and_search(args):
+    """Run the translator and the search at the same time. The
+    translator writes its output into a pipe from which the search
+    reads, so the output is never written to disk.
+
+    Return the results of both components. If the translator fails,
+    the search is stopped and its result is None."""
+    logging.info("Running translator and search connected by a pipe (%s)." % args.build)
+    translate_time_limit = limits.get_time_limit(
+        args.translate_time_limit, args.overall_time_limit)
+    search_time_limit = limits.get_time_limit(
+        args.search_time_limit, args.overall_time_limit)
+    # Both components run at the same time, so each one gets half of
+    # the overall memory limit.
+    overall_memory_limit = limits.get_memory_limit(None, args.overall_memory_limit)
+    memory_share = overall_memory_limit // 2 if overall_memory_limit is not None else None
+    translate_memory_limit = _get_min_limit(args.translate_memory_limit, memory_share)
+    search_memory_limit = _get_min_limit(args.search_memory_limit, memory_share)
+    executable = get_executable(args.build, REL_SEARCH_PATH)
+    if not args.search_options:
+        returncodes.exit_with_driver_input_error(
+            "search needs --alias, --portfolio, or search options")
+    PlanManager(args.plan_file).delete_existing_plans()
+
+    search = call.start_call(
+        "search",
+        [executable] + args.search_options + ["--internal-plan-file", args.plan_file],
+        stdin=call.PIPE,
+        time_limit=search_time_limit,
+        memory_limit=search_memory_limit)
+    pipe_fd = search.stdin.fileno()
+    stderr, returncode = call.get_error_output_and_returncode(
+        "translator",
+        _get_translate_cmd(args, "/dev/fd/%d" % pipe_fd),
+        time_limit=translate_time_limit,
+        memory_limit=translate_memory_limit,
+        pass_fds=(pipe_fd,))
+    # The search reads until the translator and we closed the pipe.
+    search.stdin.close()
+    translate_result = _get_translate_result(stderr, returncode)
+    if returncode != 0:
+        search.terminate()
+        search.wait()
+        return translate_result, None
+
+    if args.overall_time_limit is not None:
+        # The search started before we knew how long the translator takes.
+        remaining_time = limits.get_time_limit(
+            args.search_time_limit, args.overall_time_limit)
+        try:
+            limits.update_time_limit(search.pid, remaining_time)
+        except (OSError, ValueError) as err:
+            logging.info("Could not update search time limit: %s" % err)
+    return translate_result, _get_search_result(search.wait())
 
 
 def run_validate(args):
     logging.info("Running validate.")
 
     num_files = len(args.filenames)
-    if num_files == 1:
-        task, = args.filenames
-        domain = util.find_domain_filename(task)
-    elif num_files == 2:
-        domain, task = args.filenames
+    if "translate" not in args.components:
+        # VAL cannot read SAS+ tasks, so we simulate the plans in Python.
+        if num_files != 1:
+            returncodes.exit_with_driver_input_error("validate needs one SAS+ input file.")
+        assert sys.executable, "Path to interpreter could not be found"
+        validate_cmd = [sys.executable, get_executable(args.build, REL_PLAN_SIMULATOR_PATH)]
+        validate_inputs = list(args.filenames)
     else:
-        returncodes.exit_with_driver_input_error("validate needs one or two PDDL input files.")
+        if num_files == 1:
+            task, = args.filenames
+            domain = util.find_domain_filename(task)
+        elif num_files == 2:
+            domain, task = args.filenames
+        else:
+            returncodes.exit_with_driver_input_error("validate needs one or two PDDL input files.")
+        validate_cmd = [VALIDATE]
+        validate_inputs = [domain, task]
 
     plan_files = list(PlanManager(args.plan_file).get_existing_plans())
     if not plan_files:
         print("Not running validate since no plans found.")
         return (0, True)
-    validate_inputs = [domain, task] + plan_files
+    validate_inputs += plan_files
 
     try:
         call.check_call(
             "validate",
-            [VALIDATE] + validate_inputs,
+            validate_cmd + validate_inputs,
             time_limit=args.validate_time_limit,
             memory_limit=args.validate_memory_limit)
     except OSError as err:
@@ -207,30 +301,211 @@ def run_validate(args):
     else:
         return (0, True)
 
-def run_eliminate_actions(args, time_limit=None):
-    def parse_plan_filter_skip_actions(planfile):
-        MACRO_OP_STRING = "-triv-nec-macro-"
-        SKIP_OP_STRING = "(skip-action plan-pos-"
-        with open(planfile) as stream:
-            lines = stream.readlines()
-        plan = []
-        for op in lines[:-1]:
-            if op.startswith("(" + MACRO_OP_STRING):
-                # Kind of messy, might refactor
-                plan += list(map(lambda x: f"({x.lstrip('(')}".strip("\n").rstrip(')') + ')', op.split(MACRO_OP_STRING)))[1:]
-            elif not op.startswith(SKIP_OP_STRING):
-                plan.append(op.strip())
-        total_cost = int(re.match(r"; cost = (\d+) \(.+ cost\)", lines[-1]).group(1))
-        return plan, total_cost
-
-    def parse_original_action_costs():
-        ORGINAL_OP_COSTS_FILE = 'original-op-costs.txt'
-        with open(ORGINAL_OP_COSTS_FILE, 'r') as op_cost_file:
-            cost_scaling_info = json.loads(op_cost_file.read())
-        return cost_scaling_info["num_zero_cost_operators"], cost_scaling_info["original_costs"]
+# Files written by the action elimination compilation and its search.
+# Each action elimination run keeps them in its own workspace directory
+# (see create_ae_workspace()), so that several planner runs can share a
+# working directory.
+AE_WORKSPACE_SUFFIX = ".ae-workspace-"
+AE_TASK_FILE = "action-elimination.sas"
+AE_UNFILTERED_PLAN_FILE = "plan_with_skip_actions"
+AE_ORIGINAL_OP_COSTS_FILE = "original-op-costs.txt"
+AE_GREEDY_PLAN_FILE = "greedy-plan"
+AE_FIXPOINT_PLAN_FILE = "fixpoint-plan"
+AE_TASK_INFO_FILE = "action-elimination-task.json"
+AE_BOUND_FILE = "action-elimination.bound"
+# With --action-elimination-greedy and less time than this (in seconds),
+# we only run greedy action elimination and skip the compilation.
+AE_GREEDY_ONLY_TIME_LIMIT = 10
+# Without --action-elimination-planner-config, action_elim.py chooses the
+# configuration for each compiled task by its size (see
+# select_planner_configuration() in action_elim.py). Without information
+# about the task, we use this configuration.
+AE_DEFAULT_CONFIGURATION = ("optimal", ["--search", "astar(hmax())"])
+
+
+def _parse_plan_filter_skip_actions(planfile):
+    MACRO_OP_STRING = "-triv-nec-macro-"
+    SKIP_OP_STRING = "(skip-action plan-pos-"
+    with open(planfile) as stream:
+        lines = stream.readlines()
+    plan = []
+    for op in lines[:-1]:
+        if op.startswith("(" + MACRO_OP_STRING):
+            # Kind of messy, might refactor
+            plan += list(map(lambda x: f"({x.lstrip('(')}".strip("\n").rstrip(')') + ')', op.split(MACRO_OP_STRING)))[1:]
+        elif not op.startswith(SKIP_OP_STRING):
+            plan.append(op.strip())
+    total_cost = int(re.match(r"; cost = (\d+) \(.+ cost\)", lines[-1]).group(1))
+    return plan, total_cost
+
+
+def _parse_original_action_costs(workspace):
+    with open(os.path.join(workspace, AE_ORIGINAL_OP_COSTS_FILE), 'r') as op_cost_file:
+        cost_scaling_info = json.loads(op_cost_file.read())
+    return cost_scaling_info["num_zero_cost_operators"], cost_scaling_info["original_costs"]
+
+
+def create_ae_workspace(args):
+    """Create and return a new directory for the intermediate files of
+    an action elimination run. It lies next to the plan files, so that
+    plans can be moved out of it cheaply, and `--cleanup` removes it
+    if the run did not."""
+    plan_dir, plan_prefix = os.path.split(os.path.abspath(args.plan_file))
+    return tempfile.mkdtemp(prefix=plan_prefix + AE_WORKSPACE_SUFFIX, dir=plan_dir)
+
+
+def remove_ae_workspace(workspace):
+    shutil.rmtree(workspace, ignore_errors=True)
+
+
+def get_eliminate_actions_commands(args, plan_file, workspace):
+    """Return the command that compiles the action elimination task
+    for *plan_file* into AE_TASK_FILE in *workspace* and the search
+    command for --fixpoint, which has no configuration unless the user
+    specified one (see get_ae_search_command() for the other cases)."""
+    assert sys.executable, "Path to interpreter could not be found"
+    action_elimination = get_executable(args.build, REL_ACTION_ELIMINATION_PATH)
+    compile_cmd = [sys.executable, action_elimination] + args.action_elimination_options + [
+        "-t", args.sas_file, "-p", plan_file, "-d", workspace]
+    if args.action_elimination_greedy:
+        compile_cmd.append("--greedy")
+    search_cmd = [get_executable(args.build, REL_SEARCH_PATH),
+                  "--internal-plan-file", os.path.join(workspace, AE_UNFILTERED_PLAN_FILE)] + (
+        args.action_elimination_planner_configuration or [])
+    return compile_cmd, search_cmd
+
+
+def write_ae_bound_file(bound_file, plan_cost):
+    """Write *plan_cost* to *bound_file*, so that a search started with
+    --internal-bound-file only looks for cheaper plans."""
+    with open(bound_file, "w") as stream:
+        stream.write("%d %f\n" % (plan_cost, time.time()))
+
+
+def get_ae_search_command(args, workspace, task_info=None,
+                          unfiltered_plan_file=AE_UNFILTERED_PLAN_FILE,
+                          bound_file=AE_BOUND_FILE):
+    """Return the command that solves an action elimination task compiled
+    into *workspace* and writes the plan to *unfiltered_plan_file* in
+    *workspace*, and the name of its configuration. *task_info* describes
+    the task (see create_action_elim_task() in action_elim.py). If it is
+    None, we read it from AE_TASK_INFO_FILE. Unless the user specified a
+    planner configuration, we use the one that action_elim.py chose by the
+    size of the task. The search only looks for plans that are cheaper
+    than the compiled plan (see *bound_file*)."""
+    if task_info is None:
+        try:
+            with open(os.path.join(workspace, AE_TASK_INFO_FILE)) as stream:
+                task_info = json.load(stream)
+        except OSError:
+            pass
+    if args.action_elimination_planner_configuration:
+        name, configuration = "manual", args.action_elimination_planner_configuration
+    elif task_info is not None:
+        name, configuration = task_info["configuration"], task_info["search_options"]
+    else:
+        name, configuration = AE_DEFAULT_CONFIGURATION
+    search_cmd = [get_executable(args.build, REL_SEARCH_PATH),
+                  "--internal-plan-file", os.path.join(workspace, unfiltered_plan_file)]
+    if task_info is not None:
+        logging.info("AE task: {operators} operators, {variables} variables, "
+                     "{plan_length} steps, {triv_nec} trivially necessary, "
+                     "plan cost {plan_cost}".format(**task_info))
+        bound_file = os.path.join(workspace, bound_file)
+        write_ae_bound_file(bound_file, task_info["plan_cost"])
+        search_cmd += ["--internal-bound-file", bound_file]
+    logging.info("AE planner configuration: %s %s" % (name, " ".join(configuration)))
+    return search_cmd + configuration, name
+
+
+def write_eliminated_plan(args, old_plan_cost, problem_type, plan_file, workspace):
+    """Map the plan for the action elimination task in *workspace* back
+    to the original task and write it to *plan_file* if it is cheaper
+    than *old_plan_cost*. Return the cost of the new plan."""
+    ae_options = args.action_elimination_options
+    unfiltered_plan_file = os.path.join(workspace, AE_UNFILTERED_PLAN_FILE)
+
+    # Remove skip actions if present in plan
+    cleaned_plan, plan_cost = _parse_plan_filter_skip_actions(unfiltered_plan_file)
+
+    # If cost scaling was done, we need to map back action costs
+    if 'MR' in ae_options and '--no-cost-scaling' not in ae_options:
+        num_zero_cost_ops, original_op_costs_map = _parse_original_action_costs(workspace)
+        if num_zero_cost_ops != 0:
+            plan_cost = sum([original_op_costs_map[op] for op in cleaned_plan])
 
+    os.remove(unfiltered_plan_file)
+    cleaned_plan.append("; cost = %d (%s)" % (plan_cost, "general cost" \
+                        if problem_type == "general cost" else "unit cost"))
+
+    logging.info("Old plan cost: %d" % old_plan_cost)
+    logging.info("New plan cost: %d" % plan_cost)
+
+    # Write cleaned plan to file
+    if old_plan_cost > plan_cost:
+        with open(plan_file, 'w') as found_plan:
+            found_plan.write("\n".join(cleaned_plan))
+            found_plan.write("\n")
+    return plan_cost
+
+
+def _get_plan_length(plan_file):
+    with open(plan_file) as stream:
+        return sum(1 for line in stream if not line.startswith(";"))
+
+
+def get_additional_plan_files(plan_manager, budget):
+    """Return earlier plans of *plan_manager* for multi-plan action
+    elimination, newest first, so that these plans and the last plan
+    have at most *budget* steps in total. Plans that do not fit are
+    skipped."""
+    counter = plan_manager.get_plan_counter()
+    steps = _get_plan_length(plan_manager._get_plan_file(counter))
+    plan_files = []
+    for number in range(counter - 1, 0, -1):
+        plan_file = plan_manager._get_plan_file(number)
+        length = _get_plan_length(plan_file)
+        if steps + length <= budget:
+            plan_files.append(plan_file)
+            steps += length
+    logging.info(f"Multi-plan action elimination: {len(plan_files) + 1} of "
+                 f"{counter} plans with {steps} steps")
+    return plan_files
+
+
+def adopt_plan(reduced_plan_file, old_plan_cost, plan_file):
+    """Move the plan that action_elim.py wrote to *reduced_plan_file* to
+    *plan_file* if it is cheaper than *old_plan_cost*. Return the lower
+    cost."""
+    _, plan_cost = _parse_plan_filter_skip_actions(reduced_plan_file)
+    logging.info("Plan cost in %s: %d" % (reduced_plan_file, plan_cost))
+    if plan_cost < old_plan_cost:
+        shutil.move(reduced_plan_file, plan_file)
+    else:
+        os.remove(reduced_plan_file)
+    return min(plan_cost, old_plan_cost)
+
+
+def adopt_greedy_plan(args, workspace, old_plan_cost, plan_file):
+    """Adopt the plan that greedy action elimination wrote to *workspace*
+    before a later step of action_elim.py failed. Return the lower cost
+    or None if there is no greedy plan."""
+    greedy_plan_file = os.path.join(workspace, AE_GREEDY_PLAN_FILE)
+    if not args.action_elimination_greedy or not os.path.exists(greedy_plan_file):
+        return None
+    return adopt_plan(greedy_plan_file, old_plan_cost, plan_file)
+
+
+def run_eliminate_actions(args, time_limit=None):
     logging.info("Eliminate actions")
+    workspace = create_ae_workspace(args)
+    try:
+        return _run_eliminate_actions(args, time_limit, workspace)
+    finally:
+        remove_ae_workspace(workspace)
 
+
+def _run_eliminate_actions(args, time_limit, workspace):
     plan_manager = PlanManager(
         args.plan_file,
         portfolio_bound=args.portfolio_bound,
@@ -246,8 +521,6 @@ def run_eliminate_actions(args, time_limit=None):
     plan_manager.process_new_plans()
     old_plan_cost = plan_manager.get_next_portfolio_cost_bound()
 
-    # Store plan file in not definitive file before filtering actions
-    unfiltered_plan_file = "plan_with_skip_actions"
     ae_plan_file = plan_manager._get_plan_file(len(plan_files) + 1)
 
     if time_limit is None:
@@ -255,16 +528,30 @@ def run_eliminate_actions(args, time_limit=None):
 
     memory_limit = limits.get_memory_limit(None, args.overall_memory_limit)
 
-    ae_options = args.action_elimination_options
-    planner_options = ["--internal-plan-file", unfiltered_plan_file] + args.action_elimination_planner_configuration
-
-    # Action elimination produced task file is always this one
-    ae_task_file = "action-elimination.sas"
-
-    assert sys.executable, "Path to interpreter could not be found"
-    action_elimination = get_executable(args.build, REL_ACTION_ELIMINATION_PATH)
     last_plan_file = plan_manager._get_plan_file(plan_manager.get_plan_counter())
-    cmd = [sys.executable, action_elimination] + ae_options + ["-t", args.sas_file, "-p", last_plan_file]
+    if args.action_elimination_window_size is not None:
+        return action_elimination_windows.run(
+            args, last_plan_file, old_plan_cost, plan_manager.get_problem_type(),
+            ae_plan_file, time_limit, memory_limit, workspace)
+    cmd, search_cmd = get_eliminate_actions_commands(args, last_plan_file, workspace)
+    if args.action_elimination_multi_plan_budget is not None:
+        additional_plan_files = get_additional_plan_files(
+            plan_manager, args.action_elimination_multi_plan_budget)
+        if additional_plan_files:
+            cmd += ["--additional-plans"] + additional_plan_files
+    greedy_only = (args.action_elimination_greedy and time_limit is not None and
+                   time_limit < AE_GREEDY_ONLY_TIME_LIMIT)
+    if greedy_only:
+        logging.info("Only running greedy action elimination for %ds." % time_limit)
+        cmd.append("--greedy-only")
+    elif args.action_elimination_fixpoint:
+        cmd.append("--fixpoint")
+        if time_limit is not None:
+            cmd += ["--fixpoint-time-limit", str(time_limit)]
+        if not args.action_elimination_planner_configuration:
+            # Choose the configuration by the size of each round's task.
+            cmd.append("--auto-search-configuration")
+        cmd += ["--search-command"] + search_cmd
     logging.info("Creating action elimination task.")
     try:
         call.check_call(
@@ -275,47 +562,50 @@ def run_eliminate_actions(args, time_limit=None):
     except subprocess.CalledProcessError as err:
         returncodes.print_stderr(
                 f"Error while eliminating actions. Exit status {err.returncode}")
-        return err.returncode, False
+        if adopt_greedy_plan(args, workspace, old_plan_cost, ae_plan_file) is None:
+            return err.returncode, False
+        return 0, True
+
+    if args.action_elimination_greedy:
+        old_plan_cost = adopt_plan(
+            os.path.join(workspace, AE_GREEDY_PLAN_FILE), old_plan_cost, ae_plan_file)
+        if greedy_only:
+            return 0, True
+    if args.action_elimination_fixpoint:
+        adopt_plan(
+            os.path.join(workspace, AE_FIXPOINT_PLAN_FILE), old_plan_cost, ae_plan_file)
+        return 0, True
 
-    executable = get_executable(args.build, REL_SEARCH_PATH)
     logging.info("Running search for action elimination task.")
+    search_cmd, configuration_name = get_ae_search_command(args, workspace)
 
+    ae_planner_call_time = time.time()
     try:
-        ae_planner_call_time = time.time()
         call.check_call(
                 "search",
-                [executable] + planner_options,
-                stdin=ae_task_file,
+                search_cmd,
+                stdin=os.path.join(workspace, AE_TASK_FILE),
                 time_limit=time_limit,
                 memory_limit=memory_limit)
         ae_planner_call_time = time.time() - ae_planner_call_time
         logging.info(f"AE planner call time: {ae_planner_call_time:3f}")
     except subprocess.CalledProcessError as err:
             assert err.returncode >= 10 or err.returncode < 0, "got returncode < 10: {}".format(err.returncode)
+            ae_planner_call_time = time.time() - ae_planner_call_time
+            logging.info(f"AE planner outcome: {configuration_name}, exit code "
+                         f"{err.returncode}, {ae_planner_call_time:.2f}s")
+            # The search is bounded by the plan cost, so an unsolvable
+            # task means that no cheaper plan exists.
+            if err.returncode in [returncodes.SEARCH_UNSOLVABLE,
+                                  returncodes.SEARCH_UNSOLVED_INCOMPLETE]:
+                logging.info("Action elimination found no cheaper plan.")
+                return (0, True)
             returncodes.print_stderr(
                 f"Error while running search for eliminating actions. Exit status {err.returncode}")
             return (err.returncode, False)
 
-    # Remove skip actions if present in plan
-    cleaned_plan, plan_cost = parse_plan_filter_skip_actions(unfiltered_plan_file)
-
-    # If cost scaling was done, we need to map back action costs
-    if 'MR' in ae_options and '--no-cost-scaling' not in ae_options:
-        num_zero_cost_ops, original_op_costs_map = parse_original_action_costs()
-        if num_zero_cost_ops != 0:
-            plan_cost = sum([original_op_costs_map[op] for op in cleaned_plan])
-
-    os.remove(unfiltered_plan_file)
-    cleaned_plan.append("; cost = %d (%s)" % (plan_cost, "general cost" \
-                        if plan_manager.get_problem_type() == "general cost" else "unit cost"))
-
-    logging.info("Old plan cost: %d" % old_plan_cost)
-    logging.info("New plan cost: %d" % plan_cost)
-
-    # Write cleaned plan to file
-    if old_plan_cost > plan_cost:
-        with open(ae_plan_file, 'w') as found_plan:
-            found_plan.write("\n".join(cleaned_plan))
-            found_plan.write("\n")
-
+    plan_cost = write_eliminated_plan(
+        args, old_plan_cost, plan_manager.get_problem_type(), ae_plan_file, workspace)
+    logging.info(f"AE planner outcome: {configuration_name}, exit code 0, "
+                 f"{ae_planner_call_time:.2f}s, cost {old_plan_cost} -> {plan_cost}")
     return 0, True
@@ -0,0 +1,298 @@
+"""Learn how to distribute the time of a portfolio from previous runs.
+
+With --portfolio-history FILE, the portfolio runner appends one JSON
+object per finished configuration run to FILE. It records the task, cheap
+task features (see get_task_features()), the configuration, its exit
+code, run time, time limit and memory limit, and the best plan cost
+after the run. Appending complete lines keeps the file usable if
+several planner runs share it.
+
+Before running a portfolio on a new task, we estimate for each
+configuration how likely it solves the task from its runs on the
+K_NEAREST_TASKS most similar recorded tasks and scale its relative time
+accordingly (see adapt_configs()). Similarity is the Euclidean distance
+between the logarithms of the task features. Without recorded runs, the
+relative times stay unchanged.
+
+Configurations that ran out of memory early on a task that is not
+larger than the new task waste their time slice. Unless they solved a
+task at least as large, we skip them or replace them with a variant
+that needs less memory (see prune_configs()). Skipping a config passes
+its time on to the remaining ones.
+
+Runs that start with a cost bound from an earlier plan say nothing about
+whether a configuration can solve a task, so we only learn from runs
+without such a bound. simulate_portfolio() replays recorded runs and is
+used by misc/replay-portfolio-history.py to evaluate the learned time
+allocation offline.
+"""
+
+import json
+import math
+import os
+
+from . import compressed_files
+from . import returncodes
+
+
+FEATURES = ["variables", "facts", "operators", "axioms", "goals"]
+K_NEAREST_TASKS = 10
+# We scale relative times by at least this factor, so that no
+# configuration is dropped completely because of a few failures.
+MIN_WEIGHT = 0.1
+# A run fails early if it ends within this fraction of its time limit.
+EARLY_FAILURE_FRACTION = 0.5
+OUT_OF_MEMORY_EXITCODES = [
+    returncodes.SEARCH_PLAN_FOUND_AND_OUT_OF_MEMORY,
+    returncodes.SEARCH_PLAN_FOUND_AND_OUT_OF_MEMORY_AND_TIME,
+    returncodes.SEARCH_OUT_OF_MEMORY,
+    returncodes.SEARCH_OUT_OF_MEMORY_AND_TIME,
+]
+
+
+def get_task_features(sas_file):
+    """Return the number of variables, facts, operators, axioms and
+    goals of the task in *sas_file* by scanning its section markers."""
+    features = dict.fromkeys(FEATURES, 0)
+    with compressed_files.open_text(sas_file) as task_file:
+        lines = iter(task_file)
+        for line in lines:
+            if line == "begin_variable\n":
+                next(lines)  # name
+                next(lines)  # axiom layer
+                features["variables"] += 1
+                features["facts"] += int(next(lines))
+            elif line == "begin_operator\n":
+                features["operators"] += 1
+            elif line == "begin_rule\n":
+                features["axioms"] += 1
+            elif line == "begin_goal\n":
+                features["goals"] = int(next(lines))
+    return features
+
+
+def get_config_key(args):
+    return " ".join(args)
+
+
+def solved(record):
+    return record["exitcode"] == returncodes.SUCCESS
+
+
+def _get_distance(features1, features2):
+    return math.sqrt(sum(
+        (math.log1p(features1[feature]) - math.log1p(features2[feature])) ** 2
+        for feature in FEATURES))
+
+
+def _is_at_least_as_large(features1, features2):
+    return all(features1[feature] >= features2[feature] for feature in FEATURES)
+
+
+def _has_at_least_as_much_memory(memory_limit1, memory_limit2):
+    # None stands for no memory limit.
+    return memory_limit1 is None or (
+        memory_limit2 is not None and memory_limit1 >= memory_limit2)
+
+
+def find_early_out_of_memory(records, args, features, memory_limit,
+                             excluded_task=None):
+    """Return a recorded run in which config *args* ran out of memory
+    early on a task that is not larger than a task with *features*
+    although it had at least *memory_limit* bytes. Return None if there
+    is no such run or if the config solved a task that is at least as
+    large with at most *memory_limit* bytes."""
+    key = get_config_key(args)
+    evidence = None
+    for record in records:
+        if record["config"] != key or record["task"] == excluded_task:
+            continue
+        record_memory_limit = record.get("memory_limit")
+        if (solved(record) and
+                _is_at_least_as_large(record["features"], features) and
+                _has_at_least_as_much_memory(memory_limit, record_memory_limit)):
+            return None
+        if (evidence is None and
+                record["exitcode"] in OUT_OF_MEMORY_EXITCODES and
+                record["time"] < EARLY_FAILURE_FRACTION * record["time_limit"] and
+                _is_at_least_as_large(features, record["features"]) and
+                _has_at_least_as_much_memory(record_memory_limit, memory_limit)):
+            evidence = record
+    return evidence
+
+
+def load_records(filename, portfolio=None):
+    """Return the records in *filename*, restricted to *portfolio* (a
+    file name without directory) if given. Malformed lines, e.g. from
+    runs that were killed while writing, are skipped."""
+    records = []
+    if not os.path.exists(filename):
+        return records
+    with open(filename) as history_file:
+        for line in history_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if portfolio is None or record.get("portfolio") == portfolio:
+                records.append(record)
+    return records
+
+
+def get_nearest_tasks(records, features, excluded_task=None):
+    """Return the names of the K_NEAREST_TASKS recorded tasks that are
+    most similar to a task with *features*."""
+    task_features = {}
+    for record in records:
+        if record["task"] != excluded_task:
+            task_features[record["task"]] = record["features"]
+    return sorted(
+        task_features,
+        key=lambda task: (_get_distance(features, task_features[task]), task)
+    )[:K_NEAREST_TASKS]
+
+
+def predict_solve_probabilities(records, configs, features, excluded_task=None):
+    """Return the estimated probability that each config solves a task
+    with *features* in the given time. We use Laplace smoothing, so
+    configs without recorded runs get 1/2."""
+    nearest_tasks = set(get_nearest_tasks(records, features, excluded_task))
+    runs = {}
+    solves = {}
+    for record in records:
+        if record["task"] in nearest_tasks and not record["bounded"]:
+            key = record["config"]
+            runs[key] = runs.get(key, 0) + 1
+            solves[key] = solves.get(key, 0) + solved(record)
+    probabilities = []
+    for _, args in configs:
+        key = get_config_key(args)
+        probabilities.append((solves.get(key, 0) + 1) / (runs.get(key, 0) + 2))
+    return probabilities
+
+
+def reweight_configs(configs, probabilities):
+    """Scale the relative time of each config by how much more likely
+    it is to solve the task than a config without recorded runs."""
+    return [
+        (relative_time * max(MIN_WEIGHT, 2 * probability), args)
+        for (relative_time, args), probability in zip(configs, probabilities)]
+
+
+def simulate_portfolio(configs, records, task, time_limit, optimal):
+    """Replay the recorded runs of *task* for a single round of a
+    sequential portfolio with the given *time_limit*. Time that a config
+    does not use is passed on to the next ones as in
+    portfolio_runner.compute_run_time(). Return the time at which the
+    task is solved (for satisficing portfolios: the first plan is found)
+    or None if it remains unsolved.
+
+    A config solves the task if a recorded unbounded run solved it
+    within its time limit. A config that failed before its recorded time
+    limit ran out (e.g., out of memory) is assumed to fail after the
+    same time again. All other configs use their full time."""
+    runs = {}
+    for record in records:
+        if record["task"] == task and not record["bounded"]:
+            runs.setdefault(record["config"], []).append(record)
+    elapsed = 0.0
+    for pos, (relative_time, args) in enumerate(configs):
+        remaining_relative_time = sum(config[0] for config in configs[pos:])
+        run_time = (time_limit - elapsed) * relative_time / remaining_relative_time
+        config_runs = runs.get(get_config_key(args), [])
+        solve_times = [record["time"] for record in config_runs if solved(record)]
+        if solve_times and min(solve_times) <= run_time:
+            return elapsed + min(solve_times)
+        failure_times = [
+            record["time"] for record in config_runs
+            if not solved(record) and record["time"] < record["time_limit"]]
+        if failure_times and min(failure_times) <= run_time:
+            if (optimal and any(record["exitcode"] == returncodes.SEARCH_UNSOLVABLE
+                                for record in config_runs)):
+                return elapsed + min(failure_times)
+            elapsed += min(failure_times)
+        else:
+            elapsed += run_time
+    return None
+
+
+class RunHistory:
+    def __init__(self, filename, portfolio, task, sas_file, memory_limit):
+        """Prepare recording runs of *portfolio* on *task*, a name that
+        identifies the task across planner runs. *memory_limit* is the
+        memory limit of each config run."""
+        self._filename = filename
+        self._portfolio = os.path.basename(portfolio)
+        self._task = task
+        self._memory_limit = memory_limit
+        self._features = get_task_features(sas_file)
+        self._records = load_records(filename, self._portfolio)
+        print("run history: {} runs of {} recorded, task features: {}".format(
+            len(self._records), self._portfolio, self._features))
+
+    def prune_configs(self, configs, low_memory_variants):
+        """Return *configs* without the configs that are likely to run out
+        of memory early. If *low_memory_variants* maps the position of
+        such a config to a variant, use the variant instead unless it is
+        likely to run out of memory as well. If all configs would be
+        skipped, we keep them all."""
+        pruned_configs = []
+        for pos, (relative_time, args) in enumerate(configs):
+            evidence = find_early_out_of_memory(
+                self._records, args, self._features, self._memory_limit)
+            if evidence is None:
+                pruned_configs.append((relative_time, args))
+                continue
+            print("run history: config {} ran out of memory after {}s on "
+                  "{} with features {}".format(
+                      pos, evidence["time"], evidence["task"],
+                      evidence["features"]))
+            variant = low_memory_variants.get(pos)
+            if variant is not None and find_early_out_of_memory(
+                    self._records, variant, self._features,
+                    self._memory_limit) is None:
+                print("run history: config {}: use low-memory variant {}".format(
+                    pos, variant))
+                pruned_configs.append((relative_time, variant))
+            else:
+                print("run history: config {}: skip and pass on its "
+                      "relative time {}".format(pos, relative_time))
+        if not pruned_configs:
+            print("run history: all configs are likely to run out of "
+                  "memory, so we run them anyway")
+            return configs
+        return pruned_configs
+
+    def adapt_configs(self, configs):
+        """Return *configs* with relative times adapted to the task. We
+        ignore the runs on the current task, so that repeated runs do
+        not just reproduce earlier decisions."""
+        if not self._records:
+            return configs
+        probabilities = predict_solve_probabilities(
+            self._records, configs, self._features, excluded_task=self._task)
+        adapted_configs = reweight_configs(configs, probabilities)
+        for pos, (probability, (old_time, _), (new_time, _)) in enumerate(
+                zip(probabilities, configs, adapted_configs)):
+            print("run history: config {}: solve probability {:.2f}, "
+                  "relative time {} -> {:.2f}".format(
+                      pos, probability, old_time, new_time))
+        return adapted_configs
+
+    def record(self, args, exitcode, run_time, time_limit, cost, bounded):
+        """Append the outcome of running the config *args*. If *bounded*
+        is true, the run used the cost of an earlier plan as bound."""
+        record = {
+            "portfolio": self._portfolio,
+            "task": self._task,
+            "features": self._features,
+            "config": get_config_key(args),
+            "exitcode": exitcode,
+            "time": round(run_time, 2),
+            "time_limit": time_limit,
+            "memory_limit": self._memory_limit,
+            "cost": cost if isinstance(cost, int) else None,
+            "bounded": bounded,
+        }
+        with open(self._filename, "a") as history_file:
+            history_file.write(json.dumps(record, sort_keys=True) + "\n")
@@ -0,0 +1,164 @@
+"""Run portfolio configurations in a persistent search process.
+
+With --portfolio-search-server, we start the search component once in
+server mode (see src/search/search_server.h). The server parses the task
+once and forks a search for every configuration, which inherits the
+parsed task copy-on-write. This saves parsing and setting up the task
+for every configuration, which takes several seconds on large tasks.
+
+ServerSearch objects represent the forked searches. They support the
+part of the subprocess.Popen interface that the portfolio runner uses,
+so they can replace regular search processes. Since the searches are no
+children of the driver, their CPU time does not show up in
+util.get_elapsed_time(), so the portfolio runner schedules them by
+wall-clock time like parallel configurations.
+"""
+
+import os
+import select
+import signal
+
+from . import call
+
+
+class ServerSearch:
+    def __init__(self, server, request_id):
+        self._server = server
+        self._request_id = request_id
+        self.pid = None
+        self.returncode = None
+
+    def poll(self):
+        self._server.read_responses(timeout=0)
+        return self.returncode
+
+    def wait(self):
+        while self.returncode is None:
+            self._server.read_responses(timeout=None)
+        return self.returncode
+
+    def _wait_for_pid(self):
+        while self.pid is None and self.returncode is None:
+            self._server.read_responses(timeout=None)
+
+    def send_signal(self, sig):
+        self._wait_for_pid()
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                # The search terminated in the meantime.
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class SearchServer:
+    def __init__(self, executable, sas_file, memory_limit):
+        """Start the search server for the task in *sas_file*. Call
+        is_ready() to check whether the server has read the task."""
+        request_read, request_write = os.pipe()
+        response_read, response_write = os.pipe()
+        self._process = call.start_call(
+            "search-server",
+            [executable, "--internal-server", str(request_read), str(response_write)],
+            stdin=sas_file, memory_limit=memory_limit,
+            pass_fds=(request_read, response_write))
+        os.close(request_read)
+        os.close(response_write)
+        self._requests = os.fdopen(request_write, "wb")
+        self._response_fd = response_read
+        self._buffer = b""
+        self._searches = {}
+        self._next_request_id = 0
+        self._ready = False
+        while not self._ready and self._process.poll() is None:
+            if not self.read_responses(timeout=None):
+                break
+
+    def is_ready(self):
+        return self._ready
+
+    def start(self, args, time_limit, memory_limit):
+        """Start a search with the given arguments and limits and return
+        its ServerSearch object."""
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        request = [b"run %d %d %d %d\n" % (
+            request_id,
+            -1 if time_limit is None else time_limit,
+            -1 if memory_limit is None else memory_limit,
+            len(args))]
+        for arg in args:
+            encoded_arg = arg.encode()
+            request.append(b"%d\n%s\n" % (len(encoded_arg), encoded_arg))
+        search = ServerSearch(self, request_id)
+        self._searches[request_id] = search
+        self._requests.write(b"".join(request))
+        self._requests.flush()
+        return search
+
+    def read_responses(self, timeout):
+        """Wait at most *timeout* seconds (forever for None) for
+        responses and process them. Return False if the server has
+        closed its end of the pipe."""
+        ready, _, _ = select.select([self._response_fd], [], [], timeout)
+        if not ready:
+            return True
+        data = os.read(self._response_fd, 4096)
+        if not data:
+            self._fail_unfinished_searches()
+            return False
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            self._process_response(line.decode().split())
+        return True
+
+    def _process_response(self, fields):
+        if fields == ["ready"]:
+            self._ready = True
+            return
+        kind, request_id, value = fields
+        search = self._searches[int(request_id)]
+        if kind == "started":
+            search.pid = int(value)
+        else:
+            assert kind == "exited", kind
+            search.returncode = int(value)
+            del self._searches[int(request_id)]
+
+    def _fail_unfinished_searches(self):
+        # The monitors report the exit of each search, so this only
+        # happens if the server or a monitor was killed.
+        for search in self._searches.values():
+            search.returncode = -signal.SIGKILL
+        self._searches.clear()
+
+    def kill_searches(self):
+        """Kill all searches that have not terminated yet."""
+        for search in list(self._searches.values()):
+            search.kill()
+
+    def close(self):
+        """Stop the server after all running searches have terminated
+        and return its exit code."""
+        self._requests.close()
+        returncode = self._process.wait()
+        os.close(self._response_fd)
+        return returncode
+
+
+def start_server(executable, sas_file, memory_limit):
+    """Return a running SearchServer or None if the server could not
+    read the task."""
+    server = SearchServer(executable, sas_file, memory_limit)
+    if server.is_ready():
+        return server
+    print("Search server failed with exit code {}. Running configs "
+          "without server.".format(server.close()))
+    return None
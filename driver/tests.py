@@ -4,16 +4,29 @@ Test module for Fast Downward driver script. Run with
     py.test driver/tests.py
 """
 
+import argparse
+import gzip
+import json
 import os
 import subprocess
 import sys
+import time
 
 import pytest
 
+from . import action_elimination_worker
 from .aliases import ALIASES, PORTFOLIOS
 from .arguments import EXAMPLES
+from . import arguments
+from . import call
+from .cleanup import cleanup_temporary_files
+from . import cgroups
 from . import limits
 from . import returncodes
+from .plan_manager import _TAIL_SIZE, PlanManager, _read_last_line
+from . import portfolio_runner
+from . import run_components
+from . import run_history
 from .util import REPO_ROOT_DIR, find_domain_filename
 
 
@@ -59,6 +72,404 @@ def test_portfolios():
         run_driver(parameters)
 
 
+@pytest.mark.parametrize("portfolio", ["seq-sat-fdss-2", "seq-opt-fdss-2"])
+def test_parallel_portfolios(portfolio):
+    parameters = ["--portfolio", PORTFOLIOS[portfolio], "--portfolio-jobs", "2",
+                  "--search-time-limit", "30m", "output.sas"]
+    run_driver(parameters)
+
+
+def test_parallel_portfolio_runs_configs_before_static_final_config(monkeypatch, tmp_path):
+    started = []
+
+    def start_sat_job(configs, pos, *args):
+        started.append(configs[pos][1])
+        process = argparse.Namespace(returncode=returncodes.SEARCH_UNSOLVED_INCOMPLETE)
+        return portfolio_runner.PortfolioJob(pos, configs[pos][1], process, None, None)
+
+    monkeypatch.setattr(portfolio_runner, "start_sat_job", start_sat_job)
+    monkeypatch.setattr(portfolio_runner, "wait_for_job", lambda running, *args: running.pop(0))
+    monkeypatch.setattr(portfolio_runner, "record_job", lambda *args: None)
+    configs = [(1, ["--search", "a"]), (1, ["--search", "b"])]
+    list(portfolio_runner._run_sat_parallel(
+        configs, None, None, PlanManager(str(tmp_path / "sas_plan")),
+        ["--search", "final"], None, None, None, None, 2, None, None))
+    assert started == [["--search", "a"], ["--search", "b"], ["--search", "final"]]
+
+
+def test_portfolio_cleanup_after_exception(monkeypatch, tmp_path, capsys):
+    calls = []
+
+    class Server:
+        def kill_searches(self):
+            calls.append("kill_searches")
+
+        def close(self):
+            calls.append("close")
+
+    def run_sat_parallel(*args):
+        raise KeyboardInterrupt
+        yield
+
+    monkeypatch.setattr(portfolio_runner.search_server, "start_server", lambda *args: Server())
+    monkeypatch.setattr(portfolio_runner, "run_sat_parallel", run_sat_parallel)
+    plan_manager = PlanManager(str(tmp_path / "sas_plan"), share_bound=True)
+    plan_manager.wait_for_plan_files(0)
+    _write_plan(str(tmp_path / "sas_plan.1"), 10)
+    plan_manager.process_new_plans()
+    assert os.path.exists(plan_manager.get_bound_file())
+    args = argparse.Namespace(
+        portfolio_jobs=1, portfolio_search_server=True,
+        portfolio_async_eliminate_actions=False, portfolio_history=None)
+    with pytest.raises(KeyboardInterrupt):
+        portfolio_runner.run(
+            PORTFOLIOS["seq-sat-fdss-2"], None, None, plan_manager, 100, None, args)
+    assert "Running configs in a search server." in capsys.readouterr().out
+    assert calls == ["kill_searches", "close"]
+    assert plan_manager._watcher is None
+    assert not os.path.exists(plan_manager.get_bound_file())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fork")
+@pytest.mark.parametrize("portfolio", ["seq-sat-fdss-2", "seq-opt-fdss-2"])
+def test_search_server_portfolios(portfolio):
+    parameters = ["--portfolio", PORTFOLIOS[portfolio], "--portfolio-search-server",
+                  "--search-time-limit", "30m", "output.sas"]
+    run_driver(parameters)
+
+
+def _write_plan(filename, cost):
+    with open(filename, "w") as plan_file:
+        plan_file.write("(a)\n; cost = {} (general cost)\n".format(cost))
+
+
+def test_adopt_plans(tmp_path):
+    plan_manager = PlanManager(str(tmp_path / "sas_plan"))
+    job_prefix = str(tmp_path / "sas_plan.job0")
+    _write_plan(job_prefix + ".1", 10)
+    _write_plan(job_prefix + ".2", 7)
+    with open(job_prefix + ".3", "w") as plan_file:
+        plan_file.write("(a)\n")
+    assert plan_manager.adopt_plans(job_prefix) == 3
+    assert plan_manager.get_next_portfolio_cost_bound() == 7
+    assert os.path.exists(job_prefix + ".3")
+
+    other_prefix = str(tmp_path / "sas_plan.job1")
+    _write_plan(other_prefix + ".1", 8)
+    _write_plan(other_prefix + ".2", 5)
+    assert plan_manager.adopt_plans(other_prefix, final=True) == 3
+    assert plan_manager.adopt_plans(job_prefix, 3, final=True) == 3
+    assert not os.path.exists(job_prefix + ".3")
+    assert plan_manager._plan_costs == [10, 7, 5]
+    assert sorted(os.listdir(tmp_path)) == ["sas_plan.1", "sas_plan.2", "sas_plan.3"]
+
+
+def test_multi_plan_action_elimination_budget(tmp_path):
+    prefix = str(tmp_path / "sas_plan")
+    for number, (length, cost) in enumerate([(3, 9), (6, 8), (2, 7), (4, 4)], start=1):
+        with open("%s.%d" % (prefix, number), "w") as plan_file:
+            plan_file.write("(a)\n" * length + "; cost = %d (general cost)\n" % cost)
+    plan_manager = PlanManager(prefix)
+    plan_manager.process_new_plans()
+    assert run_components.get_additional_plan_files(plan_manager, 9) == [
+        prefix + ".3", prefix + ".1"]
+    assert run_components.get_additional_plan_files(plan_manager, 4) == []
+
+
+def test_cleanup_action_elimination_workspaces(tmp_path):
+    args = argparse.Namespace(
+        sas_file=str(tmp_path / "output.sas"), plan_file=str(tmp_path / "sas_plan"))
+    workspaces = [run_components.create_ae_workspace(args) for _ in range(2)]
+    assert len(set(workspaces)) == 2
+    with open(os.path.join(workspaces[0], run_components.AE_TASK_FILE), "w"):
+        pass
+    cleanup_temporary_files(args)
+    assert os.listdir(tmp_path) == []
+
+
+def test_adopt_greedy_plan_if_compilation_fails(monkeypatch, tmp_path):
+    args = argparse.Namespace(
+        plan_file=str(tmp_path / "sas_plan"), portfolio_bound=None, overall_time_limit=None,
+        overall_memory_limit=None, action_elimination_window_size=None,
+        action_elimination_multi_plan_budget=None, action_elimination_greedy=True,
+        action_elimination_fixpoint=False)
+    _write_plan(args.plan_file + ".1", 10)
+    workspace = str(tmp_path / "workspace")
+    os.mkdir(workspace)
+
+    def check_call(nick, cmd, **kwargs):
+        _write_plan(os.path.join(workspace, run_components.AE_GREEDY_PLAN_FILE), 7)
+        raise subprocess.CalledProcessError(returncodes.TRANSLATE_OUT_OF_MEMORY, cmd)
+
+    monkeypatch.setattr(
+        run_components, "get_eliminate_actions_commands",
+        lambda *args: (["action-elimination"], ["search"]))
+    monkeypatch.setattr(call, "check_call", check_call)
+    assert run_components._run_eliminate_actions(args, None, workspace) == (0, True)
+    assert run_components._parse_plan_filter_skip_actions(
+        args.plan_file + ".2")[1] == 7
+
+
+def test_background_action_elimination_adopts_greedy_plan(monkeypatch, tmp_path):
+    args = argparse.Namespace(plan_file=str(tmp_path / "sas_plan"), action_elimination_greedy=True)
+    plan_manager = PlanManager(args.plan_file)
+    worker = action_elimination_worker.ActionEliminationWorker(
+        args, plan_manager, time.monotonic() + 100, None)
+    # The greedy plan is optimal, so the bounded search finds no plan.
+    processes = []
+
+    def start_call(nick, cmd, **kwargs):
+        if nick == "action-elimination":
+            _write_plan(os.path.join(worker._workspace, run_components.AE_GREEDY_PLAN_FILE), 7)
+            returncode = 0
+        else:
+            returncode = returncodes.SEARCH_UNSOLVABLE
+        processes.append(nick)
+        return argparse.Namespace(poll=lambda: returncode, returncode=returncode)
+
+    monkeypatch.setattr(
+        run_components, "get_eliminate_actions_commands",
+        lambda *args: (["action-elimination"], ["search"]))
+    monkeypatch.setattr(
+        run_components, "get_ae_search_command", lambda *args: (["search"], "test"))
+    monkeypatch.setattr(call, "start_call", start_call)
+    _write_plan(args.plan_file + ".1", 10)
+    plan_manager.process_new_plans()
+    worker.finish(0)
+    assert processes == ["action-elimination", "search"]
+    assert plan_manager.get_plan_counter() == 2
+    assert run_components._parse_plan_filter_skip_actions(
+        args.plan_file + ".2")[1] == 7
+    assert not os.path.exists(worker._workspace)
+
+
+def test_stop_background_action_elimination_on_failure(monkeypatch, tmp_path):
+    args = argparse.Namespace(
+        plan_file=str(tmp_path / "sas_plan"), action_elimination_greedy=False,
+        portfolio_eliminate_actions=True, portfolio_search_server=False)
+    plan_manager = PlanManager(args.plan_file)
+    killed = []
+
+    def start_call(nick, cmd, **kwargs):
+        return argparse.Namespace(
+            poll=lambda: None, kill=lambda: killed.append(nick), wait=lambda: -9)
+
+    def run_sat_parallel(*args):
+        _write_plan(str(tmp_path / "sas_plan.1"), 10)
+        plan_manager.process_new_plans()
+        raise KeyboardInterrupt
+        yield
+
+    monkeypatch.setattr(
+        run_components, "get_eliminate_actions_commands",
+        lambda *args: (["action-elimination"], ["search"]))
+    monkeypatch.setattr(call, "start_call", start_call)
+    monkeypatch.setattr(portfolio_runner, "_run_sat_parallel", run_sat_parallel)
+    with pytest.raises(KeyboardInterrupt):
+        list(portfolio_runner.run_sat_parallel(
+            [], None, None, plan_manager, None, None, time.monotonic() + 100,
+            None, args, 2))
+    # The running compilation is killed instead of waited for.
+    assert killed == ["action-elimination"]
+    assert [name for name in os.listdir(tmp_path)
+            if run_components.AE_WORKSPACE_SUFFIX in name] == []
+
+
+def test_read_last_line_of_plan(tmp_path):
+    plan_file = tmp_path / "sas_plan"
+    # The last line is longer than one block and a multi-byte character
+    # crosses the block border.
+    last_line = "; cost = 5 (unit cost) " + "\u00e4" * _TAIL_SIZE + "\n"
+    plan_file.write_text("(a)\n" + last_line, encoding="utf-8")
+    assert _read_last_line(str(plan_file)) == last_line
+    plan_file.write_bytes("(a)\n; \u00e4".encode()[:-1])
+    assert _read_last_line(str(plan_file)) == "; \ufffd"
+    plan_file.write_text("")
+    assert _read_last_line(str(plan_file)) is None
+
+
+def test_process_new_plans_while_running(tmp_path):
+    plan_manager = PlanManager(str(tmp_path / "sas_plan"))
+    found_plans = []
+    plan_manager.add_new_plan_callback(
+        lambda plan_filename, cost: found_plans.append(cost))
+    _write_plan(str(tmp_path / "sas_plan.1"), 10)
+    with open(str(tmp_path / "sas_plan.2"), "w") as plan_file:
+        plan_file.write("(a)\n")
+    plan_manager.wait_for_new_plans(0.01)
+    assert found_plans == [10]
+    assert os.path.exists(str(tmp_path / "sas_plan.2"))
+
+    _write_plan(str(tmp_path / "sas_plan.2"), 8)
+    plan_manager.wait_for_new_plans(1)
+    plan_manager.stop_watching()
+    assert found_plans == [10, 8]
+
+
+@pytest.mark.parametrize("options, expected", [
+    ([], False), (["--pipe-translator-output"], os.name == "posix"),
+    (["--pipe-translator-output", "--keep-sas-file"], False)])
+def test_pipe_translator_output_is_opt_in(monkeypatch, options, expected):
+    task = os.path.join(REPO_ROOT_DIR, "misc", "tests", "benchmarks", "gripper", "prob01.pddl")
+    monkeypatch.setattr(sys, "argv", ["fast-downward.py"] + options + [
+        task, "--search", "astar(blind())"])
+    assert arguments.parse_args().pipe_translator_output == expected
+
+
+def test_compressed_search_input(tmp_path):
+    sas_file = str(tmp_path / "output.sas.gz")
+    with gzip.open(sas_file, "wt") as output:
+        output.write("begin_version\n3\nend_version\n")
+    assert arguments._looks_like_search_input(sas_file)
+    output_file = str(tmp_path / "stdout")
+    call.check_call(
+        "cat", [sys.executable, "-c",
+                "import shutil, sys; shutil.copyfileobj(sys.stdin, open(sys.argv[1], 'w'))",
+                output_file],
+        stdin=sas_file)
+    with open(output_file) as output:
+        assert output.read() == "begin_version\n3\nend_version\n"
+
+
+def test_corrupt_compressed_search_input(tmp_path):
+    sas_file = tmp_path / "output.sas.gz"
+    sas_file.write_bytes(gzip.compress(b"begin_version\n3\nend_version\n")[:20])
+    with pytest.raises(subprocess.CalledProcessError) as exception_info:
+        call.check_call("cat", [sys.executable, "-c", "import sys; sys.stdin.read()"],
+                        stdin=str(sas_file))
+    assert exception_info.value.returncode == returncodes.DRIVER_INPUT_ERROR
+
+
+def _make_run_record(task, operators, config, exitcode, time):
+    features = dict.fromkeys(run_history.FEATURES, 1)
+    features["operators"] = operators
+    return {"task": task, "features": features, "config": config,
+            "exitcode": exitcode, "time": time, "time_limit": 50,
+            "bounded": False}
+
+
+def test_run_history_replay():
+    configs = [(1, ["a"]), (1, ["b"])]
+    # Config "a" times out on large tasks, "b" solves them slowly.
+    records = []
+    for task, operators in [("small", 10), ("large1", 10000), ("large2", 20000)]:
+        if operators > 100:
+            records.append(_make_run_record(
+                task, operators, "a", returncodes.SEARCH_OUT_OF_TIME, 50))
+            records.append(_make_run_record(task, operators, "b", 0, 55))
+        else:
+            records.append(_make_run_record(task, operators, "a", 0, 1))
+    assert run_history.simulate_portfolio(configs, records, "small", 100, True) == 1
+    assert run_history.simulate_portfolio(configs, records, "large1", 100, True) is None
+
+    features = records[-1]["features"]
+    probabilities = run_history.predict_solve_probabilities(
+        records, configs, features, excluded_task="large2")
+    assert probabilities == [0.5, 2 / 3]
+    learned_configs = run_history.reweight_configs(configs, probabilities)
+    assert run_history.simulate_portfolio(
+        learned_configs, records, "large1", 100, True) == pytest.approx(100 * 3 / 7 + 55)
+
+
+def test_run_history_out_of_memory(tmp_path):
+    oom = _make_run_record("large", 1000, "a", returncodes.SEARCH_OUT_OF_MEMORY, 5)
+    oom["memory_limit"] = 100
+    features = dict(oom["features"])
+    assert run_history.find_early_out_of_memory([oom], ["a"], features, 100) is oom
+    assert run_history.find_early_out_of_memory([oom], ["a"], features, 200) is None
+    features["operators"] = 10
+    assert run_history.find_early_out_of_memory([oom], ["a"], features, 100) is None
+
+    solved = _make_run_record("larger", 2000, "a", returncodes.SUCCESS, 5)
+    solved["memory_limit"] = 100
+    features["operators"] = 1500
+    assert run_history.find_early_out_of_memory([oom, solved], ["a"], features, 100) is None
+
+    sas_file = tmp_path / "output.sas"
+    sas_file.write_text("begin_variable\nvar0\n-1\n2\nend_variable\n")
+    history_file = str(tmp_path / "history")
+    with open(history_file, "w") as output:
+        oom["portfolio"] = "portfolio.py"
+        oom["features"] = dict.fromkeys(run_history.FEATURES, 0)
+        output.write(json.dumps(oom) + "\n")
+    history = run_history.RunHistory(
+        history_file, "portfolio.py", "new", str(sas_file), 100)
+    configs = [(1, ["a"]), (2, ["b"]), (3, ["a"])]
+    assert history.prune_configs(configs, {0: ["c"]}) == [(1, ["c"]), (2, ["b"])]
+
+
+def test_cgroup_memory_limit(tmp_path):
+    cgroup_dir = tmp_path / "user.slice" / "planner"
+    cgroup_dir.mkdir(parents=True)
+    (tmp_path / "user.slice" / "memory.max").write_text("2000\n")
+    (cgroup_dir / "memory.max").write_text("max\n")
+    assert cgroups.get_memory_limit(str(cgroup_dir), str(tmp_path)) == 2000
+    (cgroup_dir / "memory.max").write_text("1000\n")
+    assert cgroups.get_memory_limit(str(cgroup_dir), str(tmp_path)) == 1000
+    assert cgroups.get_memory_limit(str(tmp_path), str(tmp_path)) is None
+
+    (cgroup_dir / "memory.peak").write_text("3000\n")
+    (cgroup_dir / "memory.events").write_text("oom 1\noom_kill 1\n")
+    assert cgroups.get_component_memory_stats(str(cgroup_dir)) == (3000, True)
+
+
+def test_memory_limit_without_cgroups(monkeypatch):
+    # The limit of the cgroup only counts if components run in cgroups.
+    monkeypatch.setattr(cgroups, "get_memory_limit", lambda cgroup_dir, root: 3000)
+    monkeypatch.setattr(limits, "get_driver_memory", lambda: 1000)
+    assert limits.get_memory_limit(None, None) is None
+    assert limits.get_memory_limit(5000, 4000) == 3000
+    monkeypatch.setattr(cgroups, "_component_parent_dir", "planner")
+    assert limits.get_memory_limit(None, None) == 2000
+    assert limits.get_memory_limit(1500, 4000) == 1500
+    monkeypatch.setattr(limits, "get_driver_memory", lambda: 3000)
+    with pytest.raises(SystemExit) as excinfo:
+        limits.get_memory_limit(None, 4000)
+    assert excinfo.value.code == returncodes.DRIVER_CRITICAL_ERROR
+
+
+def test_cgroup_setup_and_teardown(monkeypatch, tmp_path):
+    # Files in a real cgroup directory are created by the kernel.
+    cgroup_dir = tmp_path / "planner"
+    cgroup_dir.mkdir()
+    (cgroup_dir / "cgroup.controllers").write_text("cpu memory\n")
+    (cgroup_dir / "cgroup.subtree_control").write_text("\n")
+    (cgroup_dir / "cgroup.procs").write_text("1\n%d\n" % os.getpid())
+    monkeypatch.setattr(cgroups, "get_cgroup_dir", lambda root: str(cgroup_dir))
+    rmdir = os.rmdir
+
+    def remove_cgroup(path):
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+        rmdir(path)
+
+    monkeypatch.setattr(cgroups.os, "rmdir", remove_cgroup)
+    monkeypatch.setattr(cgroups.atexit, "register", lambda function: None)
+
+    assert cgroups.setup(str(tmp_path))
+    driver_dir = cgroup_dir / cgroups.DRIVER_CGROUP
+    # Only the driver moves, other processes stay where they are.
+    assert (driver_dir / "cgroup.procs").read_text() == str(os.getpid())
+    assert (cgroup_dir / "cgroup.subtree_control").read_text() == "+memory"
+    (cgroup_dir / "memory.max").write_text("2000\n")
+    assert cgroups.get_enforced_memory_limit() == 2000
+
+    cgroups.teardown()
+    assert cgroups.get_enforced_memory_limit() is None
+    assert (cgroup_dir / "cgroup.subtree_control").read_text() == "-memory"
+    assert (cgroup_dir / "cgroup.procs").read_text() == str(os.getpid())
+    assert not driver_dir.exists()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no wait4 on Windows")
+def test_component_peak_memory():
+    allocation = 64 * 1024 * 1024
+    process = call.start_call(
+        "allocate", [sys.executable, "-c", "x = bytearray(%d)" % allocation])
+    assert process.wait() == 0
+    assert call._convert_max_rss_to_bytes(process.rusage.ru_maxrss) >= allocation
+
+
 @pytest.mark.skipif(not limits.can_set_time_limit(), reason="Cannot set time limits on this system")
 def test_hard_time_limit():
     def preexec_fn():
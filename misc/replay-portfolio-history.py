@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+
+"""Compare the static time allocation of a portfolio with the allocation
+learned from a run history (see --portfolio-history) by replaying the
+recorded runs.
+
+Each task is evaluated with the runs on all other tasks (leave-one-out),
+so the learned allocation never sees the outcomes it is evaluated on.
+The replay needs recorded runs of all configurations on each task, e.g.,
+from running the portfolio once with --portfolio-history on a benchmark
+set, ideally with a generous time limit.
+"""
+
+import argparse
+import os
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_BASE = os.path.dirname(DIR)
+
+sys.path.insert(0, REPO_BASE)
+from driver import aliases
+from driver import portfolio_runner
+from driver import run_history
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("history", help="run history file")
+    parser.add_argument(
+        "portfolio",
+        help="portfolio file or name of a portfolio in driver/portfolios")
+    parser.add_argument(
+        "--time-limit", type=float, default=portfolio_runner.DEFAULT_TIMEOUT,
+        help="time limit in seconds for replaying the portfolio (default: %(default)s)")
+    return parser.parse_args()
+
+
+def get_portfolio_file(portfolio):
+    if os.path.exists(portfolio):
+        return portfolio
+    return os.path.join(aliases.PORTFOLIO_DIR, portfolio)
+
+
+def format_time(solve_time):
+    return "-" if solve_time is None else "{:.2f}".format(solve_time)
+
+
+def main():
+    args = parse_args()
+    portfolio = get_portfolio_file(args.portfolio)
+    attributes = portfolio_runner.get_portfolio_attributes(portfolio)
+    configs = attributes["CONFIGS"]
+    optimal = attributes["OPTIMAL"]
+    records = run_history.load_records(args.history, os.path.basename(portfolio))
+    tasks = sorted({record["task"] for record in records})
+    if not tasks:
+        sys.exit("No runs of {} in {}".format(os.path.basename(portfolio), args.history))
+
+    results = []
+    for task in tasks:
+        features = next(
+            record["features"] for record in records if record["task"] == task)
+        probabilities = run_history.predict_solve_probabilities(
+            records, configs, features, excluded_task=task)
+        learned_configs = run_history.reweight_configs(configs, probabilities)
+        static = run_history.simulate_portfolio(
+            configs, records, task, args.time_limit, optimal)
+        learned = run_history.simulate_portfolio(
+            learned_configs, records, task, args.time_limit, optimal)
+        results.append((task, static, learned))
+        if (static is None) != (learned is None):
+            print("{}: static {}, learned {}".format(
+                task, format_time(static), format_time(learned)))
+
+    static_coverage = sum(static is not None for _, static, _ in results)
+    learned_coverage = sum(learned is not None for _, _, learned in results)
+    both_solved = [(static, learned) for _, static, learned in results
+                   if static is not None and learned is not None]
+    print("tasks: {}".format(len(tasks)))
+    print("coverage: static {}, learned {} ({:+d})".format(
+        static_coverage, learned_coverage, learned_coverage - static_coverage))
+    if both_solved:
+        print("total time on tasks solved by both: static {:.2f}s, learned {:.2f}s".format(
+            sum(static for static, _ in both_solved),
+            sum(learned for _, learned in both_solved)))
+
+
+if __name__ == "__main__":
+    main()
@@ -72,6 +72,7 @@ fast_downward_plugin(
         search_engine
         search_node_info
         search_progress
+        search_server
         search_space
         search_statistics
         state_id
@@ -44,6 +44,7 @@ static int parse_int_arg(const string &name, const string &value) {
 static shared_ptr<SearchEngine> parse_cmd_line_aux(
     const vector<string> &args, options::Registry &registry, bool dry_run) {
     string plan_filename = "sas_plan";
+    string bound_filename;
     int num_previously_generated_plans = 0;
     bool is_part_of_anytime_portfolio = false;
     options::Predefinitions predefinitions;
@@ -97,6 +98,11 @@ static shared_ptr<SearchEngine> parse_cmd_line_aux(
                 throw ArgError("missing argument after --internal-plan-file");
             ++i;
             plan_filename = args[i];
+        } else if (arg == "--internal-bound-file") {
+            if (is_last)
+                throw ArgError("missing argument after --internal-bound-file");
+            ++i;
+            bound_filename = args[i];
         } else if (arg == "--internal-previous-portfolio-plans") {
             if (is_last)
                 throw ArgError("missing argument after --internal-previous-portfolio-plans");
@@ -121,6 +127,7 @@ static shared_ptr<SearchEngine> parse_cmd_line_aux(
     if (engine) {
         PlanManager &plan_manager = engine->get_plan_manager();
         plan_manager.set_plan_filename(plan_filename);
+        plan_manager.set_bound_filename(bound_filename);
         plan_manager.set_num_previously_generated_plans(num_previously_generated_plans);
         plan_manager.set_is_part_of_anytime_portfolio(is_part_of_anytime_portfolio);
     }
@@ -171,5 +178,8 @@ string usage(const string &progname) {
            "    This planner call is part of a portfolio which already created\n"
            "    plan files FILENAME.1 up to FILENAME.COUNTER.\n"
            "    Start enumerating plan files with COUNTER+1, i.e. FILENAME.COUNTER+1\n\n"
+           "--internal-server REQUEST_FD RESPONSE_FD\n"
+           "    Read the task once and run the searches requested by the driver\n"
+           "    on REQUEST_FD (see search_server.h). Must be the only option.\n\n"
            "See https://www.fast-downward.org for details.";
 }
@@ -31,6 +31,14 @@ void PlanManager::set_plan_filename(const string &plan_filename_) {
     plan_filename = plan_filename_;
 }
 
+void PlanManager::set_bound_filename(const string &bound_filename_) {
+    bound_filename = bound_filename_;
+}
+
+const string &PlanManager::get_bound_filename() const {
+    return bound_filename;
+}
+
 void PlanManager::set_num_previously_generated_plans(int num_previously_generated_plans_) {
     num_previously_generated_plans = num_previously_generated_plans_;
 }
@@ -11,12 +11,20 @@ using Plan = std::vector<OperatorID>;
 
 class PlanManager {
     std::string plan_filename;
+    std::string bound_filename;
     int num_previously_generated_plans;
     bool is_part_of_anytime_portfolio;
 public:
     PlanManager();
 
     void set_plan_filename(const std::string &plan_filename);
+    /*
+      The driver writes the cost of the best plan found so far by any
+      search into the bound file (if given), so that running searches
+      can tighten their bound.
+    */
+    void set_bound_filename(const std::string &bound_filename);
+    const std::string &get_bound_filename() const;
     void set_num_previously_generated_plans(int num_previously_generated_plans);
     void set_is_part_of_anytime_portfolio(bool is_part_of_anytime_portfolio);
 
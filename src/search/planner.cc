@@ -1,6 +1,7 @@
 #include "command_line.h"
 #include "option_parser.h"
 #include "search_engine.h"
+#include "search_server.h"
 
 #include "options/registries.h"
 #include "tasks/root_task.h"
@@ -10,6 +11,8 @@
 #include "utils/timer.h"
 
 #include <iostream>
+#include <string>
+#include <vector>
 
 using namespace std;
 using utils::ExitCode;
@@ -22,6 +25,12 @@ int main(int argc, const char **argv) {
         utils::exit_with(ExitCode::SEARCH_INPUT_ERROR);
     }
 
+    bool server_mode = static_cast<string>(argv[1]) == "--internal-server";
+    if (server_mode && argc != 4) {
+        utils::g_log << usage(argv[0]) << endl;
+        utils::exit_with(ExitCode::SEARCH_INPUT_ERROR);
+    }
+
     bool unit_cost = false;
     if (static_cast<string>(argv[1]) != "--help") {
         utils::g_log << "reading input..." << endl;
@@ -31,6 +40,19 @@ int main(int argc, const char **argv) {
         unit_cost = task_properties::is_unit_cost(task_proxy);
     }
 
+    // The arguments of a search forked by the search server.
+    vector<string> server_args;
+    vector<const char *> server_argv;
+    if (server_mode) {
+        server_args = search_server::serve(stoi(argv[2]), stoi(argv[3]));
+        server_argv.push_back(argv[0]);
+        for (const string &arg : server_args) {
+            server_argv.push_back(arg.c_str());
+        }
+        argc = server_argv.size();
+        argv = server_argv.data();
+    }
+
     shared_ptr<SearchEngine> engine;
 
     // The command line is parsed twice: once in dry-run mode, to
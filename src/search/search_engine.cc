@@ -15,6 +15,8 @@
 #include "utils/timer.h"
 
 #include <cassert>
+#include <chrono>
+#include <fstream>
 #include <iostream>
 #include <limits>
 
@@ -23,6 +25,9 @@ using utils::ExitCode;
 
 class PruningMethod;
 
+// Seconds between two reads of the bound file.
+static const double BOUND_CHECK_INTERVAL = 0.1;
+
 successor_generator::SuccessorGenerator &get_successor_generator(
     const TaskProxy &task_proxy, utils::LogProxy &log) {
     log << "Building successor generator..." << flush;
@@ -92,9 +97,31 @@ void SearchEngine::set_plan(const Plan &p) {
     plan = p;
 }
 
+void SearchEngine::update_bound_from_file() {
+    /*
+      The bound file contains the best known plan cost and the (Unix)
+      time at which the driver wrote it. The driver replaces the file
+      atomically, so we never read partial contents.
+    */
+    ifstream bound_file(plan_manager.get_bound_filename());
+    int shared_bound;
+    double write_time;
+    if (!(bound_file >> shared_bound >> write_time) || shared_bound >= bound) {
+        return;
+    }
+    double now = chrono::duration<double>(
+        chrono::system_clock::now().time_since_epoch()).count();
+    log << "Tightened bound from " << bound << " to " << shared_bound
+        << " (latency: " << now - write_time << "s, pruned by bound so far: "
+        << statistics.get_pruned_by_bound() << ")" << endl;
+    set_bound(shared_bound);
+}
+
 void SearchEngine::search() {
     initialize();
     utils::CountdownTimer timer(max_time);
+    bool use_bound_file = !plan_manager.get_bound_filename().empty();
+    double next_bound_check = 0;
     while (status == IN_PROGRESS) {
         status = step();
         if (timer.is_expired()) {
@@ -102,6 +129,10 @@ void SearchEngine::search() {
             status = TIMEOUT;
             break;
         }
+        if (use_bound_file && timer.get_elapsed_time() >= next_bound_check) {
+            update_bound_from_file();
+            next_bound_check = timer.get_elapsed_time() + BOUND_CHECK_INTERVAL;
+        }
     }
     // TODO: Revise when and which search times are logged.
     log << "Actual search time: " << timer.get_elapsed_time() << endl;
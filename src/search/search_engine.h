@@ -60,6 +60,7 @@ protected:
     virtual void initialize() {}
     virtual SearchStatus step() = 0;
 
+    void update_bound_from_file();
     void set_plan(const Plan &plan);
     bool check_goal_and_set_plan(const State &state);
     int get_adjusted_cost(const OperatorProxy &op) const;
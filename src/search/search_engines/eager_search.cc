@@ -203,8 +203,10 @@ SearchStatus EagerSearch::step() {
 
     for (OperatorID op_id : applicable_ops) {
         OperatorProxy op = task_proxy.get_operators()[op_id];
-        if ((node->get_real_g() + op.get_cost()) >= bound)
+        if ((node->get_real_g() + op.get_cost()) >= bound) {
+            statistics.inc_pruned_by_bound();
             continue;
+        }
 
         State succ_state = state_registry.get_successor_state(s, op);
         statistics.inc_generated();
@@ -5,6 +5,7 @@
 
 #include "../utils/logging.h"
 
+#include <algorithm>
 #include <iostream>
 
 using namespace std;
@@ -30,6 +31,7 @@ shared_ptr<SearchEngine> IteratedSearch::get_search_engine(
     int engine_configs_index) {
     OptionParser parser(engine_configs[engine_configs_index], registry, predefinitions, false);
     shared_ptr<SearchEngine> engine(parser.start_parsing<shared_ptr<SearchEngine>>());
+    engine->get_plan_manager().set_bound_filename(plan_manager.get_bound_filename());
 
     ostringstream stream;
     kptree::print_tree_bracketed(engine_configs[engine_configs_index], stream);
@@ -64,6 +66,7 @@ SearchStatus IteratedSearch::step() {
         return found_solution() ? SOLVED : FAILED;
     }
     if (pass_bound) {
+        best_bound = min(best_bound, bound);
         current_search->set_bound(best_bound);
     }
     if (solution_found) {
@@ -95,6 +98,7 @@ SearchStatus IteratedSearch::step() {
     statistics.inc_generated(current_stats.get_generated());
     statistics.inc_generated_ops(current_stats.get_generated_ops());
     statistics.inc_reopened(current_stats.get_reopened());
+    statistics.inc_pruned_by_bound(current_stats.get_pruned_by_bound());
 
     return step_return_value();
 }
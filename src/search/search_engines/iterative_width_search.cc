@@ -69,6 +69,7 @@ SearchStatus IterativeWidthSearch::step() {
     for (OperatorID op_id : applicable_ops) {
         OperatorProxy op = task_proxy.get_operators()[op_id];
         if (node.get_real_g() + op.get_cost() >= bound) {
+            statistics.inc_pruned_by_bound();
             continue;
         }
 
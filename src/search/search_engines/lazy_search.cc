@@ -125,6 +125,8 @@ void LazySearch::generate_successors() {
             EvaluationContext new_eval_context(
                 current_eval_context, new_g, is_preferred, nullptr);
             open_list->insert(new_eval_context, make_pair(current_state.get_id(), op_id));
+        } else {
+            statistics.inc_pruned_by_bound();
         }
     }
 }
@@ -0,0 +1,186 @@
+#include "search_server.h"
+
+#include "utils/logging.h"
+#include "utils/system.h"
+#include "utils/timer.h"
+
+#include <algorithm>
+#include <cerrno>
+#include <cstdio>
+#include <iostream>
+#include <sstream>
+
+#if OPERATING_SYSTEM != WINDOWS
+#include <csignal>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+#endif
+
+using namespace std;
+using utils::ExitCode;
+
+namespace search_server {
+#if OPERATING_SYSTEM == WINDOWS
+vector<string> serve(int, int) {
+    cerr << "The search server is not supported on Windows." << endl;
+    utils::exit_with(ExitCode::SEARCH_UNSUPPORTED);
+}
+#else
+struct Request {
+    int id;
+    long time_limit;
+    long memory_limit;
+    vector<string> args;
+};
+
+static bool read_line(FILE *in, string &line) {
+    line.clear();
+    int c;
+    while ((c = getc(in)) != EOF && c != '\n') {
+        line += static_cast<char>(c);
+    }
+    return c != EOF;
+}
+
+static bool read_request(FILE *in, Request &request) {
+    string line;
+    if (!read_line(in, line)) {
+        return false;
+    }
+    istringstream header(line);
+    string command;
+    int num_args;
+    header >> command >> request.id >> request.time_limit
+    >> request.memory_limit >> num_args;
+    if (!header || command != "run" || num_args < 0) {
+        cerr << "Invalid request for search server: " << line << endl;
+        utils::exit_with(ExitCode::SEARCH_CRITICAL_ERROR);
+    }
+    request.args.clear();
+    for (int i = 0; i < num_args; ++i) {
+        size_t length;
+        if (!read_line(in, line) || sscanf(line.c_str(), "%zu", &length) != 1) {
+            cerr << "Invalid argument length for search server" << endl;
+            utils::exit_with(ExitCode::SEARCH_CRITICAL_ERROR);
+        }
+        string arg(length, '\0');
+        if (fread(&arg[0], 1, length, in) != length || getc(in) != '\n') {
+            cerr << "Incomplete request for search server" << endl;
+            utils::exit_with(ExitCode::SEARCH_CRITICAL_ERROR);
+        }
+        request.args.push_back(arg);
+    }
+    return true;
+}
+
+static void write_response(int fd, const string &response) {
+    /*
+      Responses are much shorter than PIPE_BUF, so the responses of
+      concurrent monitor processes do not interleave.
+    */
+    string line = response + "\n";
+    if (write(fd, line.c_str(), line.size()) != static_cast<ssize_t>(line.size())) {
+        perror("Writing search server response failed");
+    }
+}
+
+static void set_limit(int resource, rlim_t soft_limit, rlim_t hard_limit) {
+    rlimit limit;
+    getrlimit(resource, &limit);
+    // We cannot raise the inherited hard limit.
+    limit.rlim_max = min(limit.rlim_max, hard_limit);
+    limit.rlim_cur = min(limit.rlim_max, soft_limit);
+    if (setrlimit(resource, &limit) != 0) {
+        perror("Setting limit for search failed");
+        utils::exit_with(ExitCode::SEARCH_CRITICAL_ERROR);
+    }
+}
+
+static void set_limits(const Request &request) {
+    /*
+      Like the driver, we set a hard time limit one second higher than
+      the soft limit, so that the search gets the chance to exit
+      gracefully on SIGXCPU. A forked process starts with no CPU time.
+    */
+    if (request.time_limit >= 0) {
+        set_limit(RLIMIT_CPU, request.time_limit, request.time_limit + 1);
+    }
+    if (request.memory_limit >= 0) {
+        set_limit(RLIMIT_AS, request.memory_limit, request.memory_limit);
+    }
+}
+
+static int get_status(int wait_status) {
+    if (WIFEXITED(wait_status)) {
+        return WEXITSTATUS(wait_status);
+    }
+    return -WTERMSIG(wait_status);
+}
+
+/*
+  Fork the search, report its pid and wait for it. Only returns in the
+  search process.
+*/
+static void run_monitor(const Request &request, int response_fd) {
+    string id = to_string(request.id);
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("Forking search failed");
+        write_response(response_fd, "exited " + id + " " +
+                       to_string(static_cast<int>(ExitCode::SEARCH_CRITICAL_ERROR)));
+        _exit(0);
+    }
+    if (pid == 0) {
+        return;
+    }
+    write_response(response_fd, "started " + id + " " + to_string(pid));
+    int wait_status;
+    while (waitpid(pid, &wait_status, 0) < 0) {
+        if (errno != EINTR) {
+            perror("Waiting for search failed");
+            _exit(0);
+        }
+    }
+    write_response(response_fd, "exited " + id + " " + to_string(get_status(wait_status)));
+    // Skip the exit handlers, which report the peak memory of the server.
+    _exit(0);
+}
+
+vector<string> serve(int request_fd, int response_fd) {
+    FILE *requests = fdopen(request_fd, "r");
+    if (!requests) {
+        perror("Opening search server requests failed");
+        utils::exit_with(ExitCode::SEARCH_CRITICAL_ERROR);
+    }
+    // Let the system reap the monitor processes.
+    signal(SIGCHLD, SIG_IGN);
+    utils::g_log << "search server ready" << endl;
+    write_response(response_fd, "ready");
+
+    Request request;
+    while (read_request(requests, request)) {
+        cout.flush();
+        pid_t pid = fork();
+        if (pid < 0) {
+            perror("Forking search monitor failed");
+            write_response(response_fd, "exited " + to_string(request.id) + " " +
+                           to_string(static_cast<int>(ExitCode::SEARCH_CRITICAL_ERROR)));
+        } else if (pid == 0) {
+            // The monitor must be able to wait for the search.
+            signal(SIGCHLD, SIG_DFL);
+            fclose(requests);
+            run_monitor(request, response_fd);
+            // Only the forked search gets here.
+            close(response_fd);
+            set_limits(request);
+            utils::g_timer.reset();
+            return request.args;
+        }
+    }
+    utils::g_log << "search server done" << endl;
+    cout.flush();
+    _exit(0);
+}
+#endif
+}
@@ -0,0 +1,34 @@
+#ifndef SEARCH_SERVER_H
+#define SEARCH_SERVER_H
+
+#include <string>
+#include <vector>
+
+/*
+  In server mode (--internal-server REQUEST_FD RESPONSE_FD), the planner
+  reads the task once and then runs one search per request that the
+  driver writes to REQUEST_FD. Each search runs in a forked child, which
+  shares the task with the server copy-on-write, so searches neither
+  parse the task again nor affect each other.
+
+  A request consists of the line "run ID TIME_LIMIT MEMORY_LIMIT NUM_ARGS"
+  followed by NUM_ARGS arguments, each given as a line with its length
+  in bytes, the bytes themselves and a newline. Limits are given in
+  seconds and bytes, with -1 meaning no limit. For each request, a
+  monitor process forks the search, writes "started ID PID" to
+  RESPONSE_FD, waits for the search to terminate and writes
+  "exited ID STATUS", where STATUS is the exit code or the negated
+  number of the signal that killed the search. The server exits when
+  REQUEST_FD is closed.
+
+  See driver/search_server.py for the other side of the protocol.
+*/
+namespace search_server {
+/*
+  Serve requests until REQUEST_FD is closed. Only returns in the forked
+  search processes, with the arguments of their request.
+*/
+extern std::vector<std::string> serve(int request_fd, int response_fd);
+}
+
+#endif
@@ -17,6 +17,7 @@ SearchStatistics::SearchStatistics(utils::LogProxy &log)
     evaluations = 0;
     generated_states = 0;
     dead_end_states = 0;
+    pruned_by_bound = 0;
     generated_ops = 0;
 
     lastjump_expanded_states = 0;
@@ -70,6 +71,9 @@ void SearchStatistics::print_detailed_statistics() const {
     log << "Evaluations: " << evaluations << endl;
     log << "Generated " << generated_states << " state(s)." << endl;
     log << "Dead ends: " << dead_end_states << " state(s)." << endl;
+    if (pruned_by_bound > 0) {
+        log << "Pruned by bound: " << pruned_by_bound << " successor(s)." << endl;
+    }
 
     if (lastjump_f_value >= 0) {
         log << "Expanded until last jump: "
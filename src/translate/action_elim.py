@@ -17,20 +17,35 @@ Maintain order of actions and compute triv. nec actions in original plan call st
     ./action_elim.py  -t <output.sas> -p <sas_plan> -s -e -r [reduction=MR] -f [file=reformulation.sas] -d [directory=.]
 Allow reorder of actions in original plan call string:
     ./action_elim.py  -t <output.sas> -p <sas_plan> -r [reduction=MR] -f [file=reformulation.sas] -d [directory=.]
+Reduce the plan with greedy action elimination first (see greedy_action_elim.py):
+    ./action_elim.py  -t <output.sas> -p <sas_plan> --greedy [--greedy-only]
+Reduce the plan repeatedly with the given planner (see iterate_action_elimination()):
+    ./action_elim.py  -t <output.sas> -p <sas_plan> --fixpoint [--fixpoint-time-limit 60] [--auto-search-configuration] --search-command <downward> --internal-plan-file plan_with_skip_actions <search options>
+Create a single task for the input plan and further plans (see get_multi_plan_sequence()):
+    ./action_elim.py  -t <output.sas> -p <sas_plan> --additional-plans <sas_plan.1> <sas_plan.2>
+Create one task per window of 100 plan steps (see create_window_tasks()):
+    ./action_elim.py  -t <output.sas> -p <sas_plan> --window-size 100 [--window-offset 0]
 """
 
 import argparse
+import itertools
 import json
 import os.path
+import subprocess
 import sys
+import time
 from time import process_time
 from math import inf, ceil
-from copy import deepcopy
+from copy import copy, deepcopy
 
+from greedy_action_elim import greedy_action_elimination
+from step_deordering import deorder_plan
 from plan_parser import parse_plan
+from plan_simulator import InvalidPlan, PlanSimulator
 from sas_parser import parse_task
 from sas_tasks import SASTask, SASVariables, SASOperator, SASInit, SASGoal, SASAxiom, SASMutexGroup
 from simplify import TriviallySolvable, filter_unreachable_propositions
+import timers
 from variable_order import find_and_apply_variable_order
 
 
@@ -41,16 +56,42 @@ MLR = 'MLR'
 MACRO_OP_STRING = "-triv-nec-macro-"
 # Cost scalin file
 ORGINAL_OP_COSTS_FILE = 'original-op-costs.txt'
+# Files written for windowed action elimination
+WINDOW_TASK_FILE = 'action-elimination-window-%d.sas'
+WINDOWS_FILE = 'action-elimination-windows.json'
+# Plan found by greedy action elimination
+GREEDY_PLAN_FILE = 'greedy-plan'
+# Files used when iterating action elimination
+SEARCH_PLAN_FILE = 'plan_with_skip_actions'
+SEARCH_BOUND_FILE = 'action-elimination.bound'
+# Size information about the compiled task
+TASK_INFO_FILE = 'action-elimination-task.json'
+FIXPOINT_PLAN_FILE = 'fixpoint-plan'
+# Without a planner configuration given by the user, each compiled task is solved with
+# the first of these configurations whose limits (None for no limit) it respects (see
+# select_planner_configuration()). Open steps are plan steps that are not trivially
+# necessary, i.e., steps that the search may skip. {h} is lmcut() or, for tasks with
+# conditional effects or axioms, hmax().
+PLANNER_CONFIGURATIONS = [
+    # (name, max. open steps, max. operators, max. variables, search)
+    ("optimal", 200, 5000, 2000, "astar({h})"),
+    ("bounded-suboptimal", 2000, 50000, 20000, "eager_wastar([{h}], w=2)"),
+    ("greedy", None, None, None, "eager_greedy([ff()])"),
+]
+# Exit codes of the search (see driver/returncodes.py)
+SEARCH_UNSOLVABLE = 11
+SEARCH_UNSOLVED_INCOMPLETE = 12
 
 # Clean domains as proposed by Jendrik (I think)
-def create_action_elim_task(sas_task, plan, operator_name_to_index, ordered, enhanced, reduction, add_pos_to_goal, enhanced_fix_point, enhanced_unnecessary, use_macro_ops, scale_costs):
-    # Process operators. Later on, variable to maintain order of actions will be var_(n + 1) (n=num vars originally)
+def create_action_elim_task(sas_task, plan, operator_name_to_index, ordered, enhanced, reduction, add_pos_to_goal, enhanced_fix_point, enhanced_unnecessary, use_macro_ops, scale_costs, relevance_cache=None, directory='.', task_info=None, bound_plan_length=None):
+    # Process operators. Later on, variable to maintain order of actions will be the last variable
     print("Plan length:", len(plan))
     print("Unique operators in plan:", len(set(plan)))
     new_operators = get_operators_from_plan(sas_task.operators, plan, operator_name_to_index, ordered)
 
     triv_nec = [False] * len(plan)
     triv_unnec = [False] * len(plan)
+    num_triv_nec = 0
     fact_achievers = []
 
     # Use original operator costs
@@ -76,61 +117,106 @@ def create_action_elim_task(sas_task, plan, operator_name_to_index, ordered, enh
         }
 
         # Store original operator costs
-        with open(ORGINAL_OP_COSTS_FILE, 'w') as original_costs_file:
+        with open(os.path.join(directory, ORGINAL_OP_COSTS_FILE), 'w') as original_costs_file:
             original_costs_file.write(json.dumps(cost_scaling_info))
 
+    # Cost of each plan step in the new task. Macro operators cost as much as their steps.
+    new_op_costs = {op.name: op.cost if use_action_costs else 1 for op in new_operators}
+    step_costs = [new_op_costs[op] for op in plan]
+
     if ordered and enhanced:
         # Find triv. neccessary actions. Operators have same order as original plan!
-        triv_nec, fact_achievers = find_triv_nec_actions(sas_task.init, sas_task.goal, sas_task.variables, new_operators, enhanced_fix_point)
+        with timers.timing("Finding trivially necessary actions", block=True):
+            triv_nec, fact_achievers = find_triv_nec_actions(sas_task.init, sas_task.goal, sas_task.variables, new_operators, enhanced_fix_point)
+        num_triv_nec = sum(triv_nec[:len(plan)])
         if enhanced_unnecessary:
-            triv_unnec = find_triv_unnec_actions(sas_task.init, sas_task.goal, sas_task.variables, new_operators, triv_nec, fact_achievers)
+            with timers.timing("Finding trivially unnecessary actions"):
+                triv_unnec = find_triv_unnec_actions(sas_task.init, sas_task.goal, sas_task.variables, new_operators, triv_nec, fact_achievers)
 
         # Create macro operators from triv. nec. actions streaks
         if use_macro_ops:
-            new_operators = process_macro_operators(new_operators, triv_nec, triv_unnec, use_action_costs)
+            with timers.timing("Creating macro operators", block=True):
+                new_operators = process_macro_operators(new_operators, triv_nec, triv_unnec, use_action_costs)
             print(f"Number of op withtout macro-ops: {len(plan)}\nNumb of ops with macros: {len(new_operators)}")
             plan_with_macros = new_operators
 
     # Find relevant facts for action elim task
-    relevant_facts = find_relevant_facts(sas_task, new_operators, operator_name_to_index)
+    with timers.timing("Finding relevant facts"):
+        relevant_facts = find_relevant_facts(sas_task, new_operators, operator_name_to_index, relevance_cache)
 
     # Prune domains of variables to only contain relevant facts
-    new_variables, vars_vals_map = prune_irrelevant_domain_values(sas_task.variables, relevant_facts, new_operators, ordered)
-
-    # Map operators variable values to new domains
-    new_operators = process_operators(new_operators, relevant_facts, vars_vals_map, new_variables, ordered, use_action_costs, triv_nec, triv_unnec)
-
-    # Map init values to new domains
-    new_init = process_init(sas_task.init, vars_vals_map, relevant_facts, new_variables, ordered)
-
-    # Map mutexes values new domains
-    new_mutexes = process_mutex_groups(sas_task.mutexes, vars_vals_map, relevant_facts)
-
-    # Map goal values to new domains
-    new_goal_facts = [(var, vars_vals_map[var][val]) for var, val in sas_task.goal.pairs]
-    if ordered and add_pos_to_goal:
-        pos_goal_fact = (len(sas_task.variables.ranges), len(plan)) if not use_macro_ops else (len(sas_task.variables.ranges), len(plan_with_macros))
-        new_goal = SASGoal(new_goal_facts + [pos_goal_fact])
-    else:
-        new_goal = SASGoal(new_goal_facts)
+    with timers.timing("Pruning irrelevant domain values"):
+        new_variables, vars_vals_map = prune_irrelevant_domain_values(sas_task.variables, relevant_facts, new_operators, ordered)
+    print(f"Variables with relevant facts: {len(vars_vals_map)} of {len(sas_task.variables.ranges)}")
+
+    # Cost of the input plan in the new task, which is a bound for the search. For several
+    # plans, only the first bound_plan_length steps (the cheapest plan) count.
+    plan_cost = sum(step_costs[:bound_plan_length])
+
+    with timers.timing("Mapping task to new domains"):
+        # Map operators variable values to new domains
+        new_operators = process_operators(new_operators, vars_vals_map, new_variables, ordered, use_action_costs, triv_nec, triv_unnec)
+
+        # Map init values to new domains
+        new_init = process_init(sas_task.init, vars_vals_map, new_variables, ordered)
+
+        # Map mutexes values new domains
+        new_mutexes = process_mutex_groups(sas_task.mutexes, vars_vals_map)
+
+        # Map goal values to new domains
+        new_goal_facts = [map_fact(var, val, vars_vals_map, new_variables) for var, val in sas_task.goal.pairs]
+        if ordered and add_pos_to_goal:
+            # The order variable is always the last variable
+            pos_goal_fact = (len(new_variables.ranges) - 1, len(plan)) if not use_macro_ops else (len(new_variables.ranges) - 1, len(plan_with_macros))
+            new_goal = SASGoal(new_goal_facts + [pos_goal_fact])
+        else:
+            new_goal = SASGoal(new_goal_facts)
 
-    # Map axioms
-    new_axioms = process_axioms(sas_task.axioms, new_variables, vars_vals_map, relevant_facts)
+        # Map axioms
+        new_axioms = process_axioms(sas_task.axioms, new_variables, vars_vals_map)
 
-    new_task = SASTask(variables=new_variables, mutexes=new_mutexes,
-                   init=new_init, goal=new_goal, operators=new_operators, axioms=new_axioms, metric=True)
+        new_task = SASTask(variables=new_variables, mutexes=new_mutexes,
+                       init=new_init, goal=new_goal, operators=new_operators, axioms=new_axioms, metric=True)
 
-    try:
-        # Remove unreachable facts and useless variables using FD code
+    # Remove unreachable facts and useless variables using FD code.
+    # Raises TriviallySolvable if the goal holds initially.
+    with timers.timing("Filtering unreachable propositions", block=True):
         filter_unreachable_propositions(new_task)
-    except TriviallySolvable:
-        sys.exit("Action elimination task is trivially solvable. New task will not be generated.")
 
-    find_and_apply_variable_order(new_task, reorder_vars=True, filter_unimportant_vars=True)
+    with timers.timing("Reordering and filtering variables", block=True):
+        find_and_apply_variable_order(new_task, reorder_vars=True, filter_unimportant_vars=True)
+
+    # Size information for choosing a planner configuration for the new task
+    if task_info is not None:
+        task_info.update({
+            "operators": len(new_task.operators),
+            "variables": len(new_task.variables.ranges),
+            "plan_length": len(plan),
+            "triv_nec": num_triv_nec,
+            "skip_actions": sum(1 for op in new_task.operators if op.name.startswith("(skip-action ")),
+            "plan_cost": plan_cost,
+            "conditional_effects": any(cond for op in new_task.operators for _, _, _, cond in op.pre_post),
+            "axioms": bool(new_task.axioms),
+        })
+        task_info["configuration"], task_info["search_options"] = select_planner_configuration(task_info)
 
     return new_task
 
 
+# Returns the name and the search options of the configuration in PLANNER_CONFIGURATIONS
+# for the action elimination task described by task_info.
+def select_planner_configuration(task_info):
+    open_steps = task_info["plan_length"] - task_info["triv_nec"]
+    for name, max_open_steps, max_operators, max_variables, search in PLANNER_CONFIGURATIONS:
+        if all(limit is None or value <= limit for value, limit in [
+                (open_steps, max_open_steps),
+                (task_info["operators"], max_operators),
+                (task_info["variables"], max_variables)]):
+            break
+    heuristic = "hmax()" if task_info["conditional_effects"] or task_info["axioms"] else "lmcut()"
+    return name, ["--search", search.format(h=heuristic)]
+
+
 def get_operators_from_plan(operators, plan, operator_name_to_index, ordered):
     if ordered:
         # Ordered tasks create a different operator for each operator in the plan
@@ -160,25 +246,106 @@ def compute_mult_factor(new_operators):
     return ceil((num_zero_cost_ops / min_positive_cost) + eps), num_zero_cost_ops
 
 
+# Composes consecutive plan operators into a macro operator. Preconditions and effect
+# conditions of later operators are regressed through the effects of earlier ones:
+# facts set by an earlier unconditional effect or required by the macro are known, so
+# preconditions on them are dropped and conditional effects on them either become
+# unconditional or are removed. The remaining conditions refer to the state in which
+# the macro is applied. add() rejects operators whose composition cannot be expressed
+# as a single SAS+ operator, e.g. when they read a variable that an earlier
+# conditional effect may have changed.
+class MacroOperatorBuilder:
+    def __init__(self, use_op_cost):
+        self.use_op_cost = use_op_cost
+        # Values required in the state in which the macro is applied
+        self.pre = {}
+        # For each variable, the effects of the macro as (conditions, value) pairs
+        self.eff = {}
+        self.operators = []
+        self.cost = 0
+
+    # Returns the value of var after the added operators if it is known, -1 if
+    # the variable keeps its initial unknown value and None if it depends on
+    # effect conditions.
+    def _get_value(self, var, new_pre):
+        effects = self.eff.get(var)
+        if effects is not None:
+            if len(effects) == 1 and not effects[0][0]:
+                return effects[0][1]
+            return None
+        return self.pre.get(var, new_pre.get(var, -1))
+
+    # Adds op to the macro and returns True or returns False without changing the macro
+    # if the composition cannot be expressed.
+    def add(self, op):
+        new_pre = {}
+        preconditions = list(op.prevail) + [(var, pre) for var, pre, _, _ in op.pre_post if pre != -1]
+        for var, val in preconditions:
+            current_val = self._get_value(var, new_pre)
+            if current_val == -1:
+                new_pre[var] = val
+            elif current_val != val:
+                # Conditional effect might have changed var (or op is not applicable)
+                return False
+
+        new_eff = {}
+        for var, _, new_val, conditions in op.pre_post:
+            regressed_conditions = []
+            fires = True
+            for cond_var, cond_val in conditions:
+                current_val = self._get_value(cond_var, new_pre)
+                if current_val is None:
+                    return False
+                if current_val == -1:
+                    regressed_conditions.append((cond_var, cond_val))
+                elif current_val != cond_val:
+                    fires = False
+            if fires:
+                new_eff.setdefault(var, []).append((tuple(regressed_conditions), new_val))
+
+        for var, effects in new_eff.items():
+            if any(not conditions for conditions, _ in effects):
+                # An unconditional effect overwrites all earlier effects on var.
+                if len(set(val for _, val in effects)) > 1:
+                    return False
+                new_eff[var] = [((), effects[0][1])]
+            elif var in self.eff:
+                # We cannot express that the earlier effect only holds if the
+                # conditions of the new effects do not.
+                return False
+
+        self.pre.update(new_pre)
+        self.eff.update(new_eff)
+        self.operators.append(op)
+        self.cost += op.cost if self.use_op_cost else 1
+        return True
+
+    def has_conditional_effects(self):
+        return any(conditions for effects in self.eff.values() for conditions, _ in effects)
+
+    def get_operator(self):
+        if len(self.operators) == 1:
+            return self.operators[0]
+        name = "".join(f"{MACRO_OP_STRING}{op.name.lstrip('(').rstrip(')')}" for op in self.operators)
+        pre_post = []
+        for var, effects in self.eff.items():
+            for conditions, val in effects:
+                # Later operators may require the initial value of a condition variable.
+                if all(self.pre.get(cond_var, cond_val) == cond_val for cond_var, cond_val in conditions):
+                    pre_post.append((var, self.pre.get(var, -1), val,
+                                     [(cond_var, cond_val) for cond_var, cond_val in conditions
+                                      if cond_var not in self.pre]))
+        # Required values of variables without remaining effects become prevail conditions.
+        effect_vars = {var for var, _, _, _ in pre_post}
+        prevail = [(var, val) for var, val in self.pre.items() if var not in effect_vars]
+        macro = SASOperator(f"({name})", prevail, pre_post, self.cost)
+        macro.is_macro = True
+        return macro
+
+
 # Given information about triv. nec. actions, create macro operators for streaks of consecutive triv. nec. actions in plan
 # Only makes sense when maintaining order of actions in input plan
 def process_macro_operators(plan, triv_nec, triv_unnec, use_op_cost):
-    def has_eff_cond(op):
-        for var, _, _, eff_cond in op.pre_post:
-            if eff_cond:
-                return True
-        return False
-
-    # Number of operators composing current macro operator
-    op_count = 0
-
-    # Prevail and pre_post of current macro operator
-    # Should we use lists for this?
-    current_prev = {}
-    current_pre_post = {}
-    new_name = ""
-    current_cost = 0
-
     # Operators after creating the macro-operators
     new_operators = []
 
@@ -186,65 +353,50 @@ def process_macro_operators(plan, triv_nec, triv_unnec, use_op_cost):
     new_triv_nec = []
     new_triv_unnec = []
 
-    for index, op in enumerate(plan):
-        if triv_nec[index] and not has_eff_cond(plan[index]):
-            # If no streak of triv. nec. actions, do not process operator for new macro op.
-            if op_count < 1 and  (not triv_nec[index + 1] or (index < len(plan) - 1 and has_eff_cond(plan[index + 1]))):
-                op_count = 1
-                continue
-
-            # First needed precond. for a variable is the precond. for the macro op.
-            for var, val in op.prevail:
-                if var not in current_prev and var not in current_pre_post:
-                    current_prev[var] = (var, val)
-
-            # Keep last effect and first precond. for each var
-            for var, old_val, new_val, cond_effects in op.pre_post:
-                old_prev = current_prev.get(var)
-                old_pre_post = current_pre_post.get(var)
-                if old_prev is not None:
-                    # Keep original precondition and update effects
-                    current_pre_post[var] = (var, old_prev[1], new_val, cond_effects)
-                    del current_prev[var]
-                elif old_pre_post is not None:
-                    # Keep original precondition and update effects
-                    current_pre_post[var] = (var, old_pre_post[1], new_val, cond_effects)
-                else:
-                    # New precond and affects
-                    current_pre_post[var] = (var, old_val, new_val, cond_effects)
+    num_macros = 0
+    num_merged_ops = 0
+    num_conditional_macros = 0
+    num_rejected = 0
+
+    def add_macro(macro):
+        nonlocal num_macros, num_merged_ops, num_conditional_macros
+        if len(macro.operators) > 1:
+            num_macros += 1
+            num_merged_ops += len(macro.operators)
+            num_conditional_macros += macro.has_conditional_effects()
+        new_operators.append(macro.get_operator())
+        new_triv_nec.append(True)
+        new_triv_unnec.append(False)
 
-            new_name += f"{MACRO_OP_STRING}{op.name.lstrip('(').rstrip(')')}"
-            current_cost += op.cost if use_op_cost else 1
-            op_count += 1
+    macro = None
+    for index, op in enumerate(plan):
+        if triv_nec[index]:
+            if macro is not None and not macro.add(op):
+                num_rejected += 1
+                add_macro(macro)
+                macro = None
+            if macro is None:
+                macro = MacroOperatorBuilder(use_op_cost)
+                if not macro.add(op):
+                    # Conflicting effects of op itself, keep it as it is.
+                    new_operators.append(op)
+                    new_triv_nec.append(True)
+                    new_triv_unnec.append(False)
+                    macro = None
         else:
-            # If macro operator was created
-            if op_count > 1:
-                new_operators.append(SASOperator(f"({new_name})", list(current_prev.values()), list(current_pre_post.values()), current_cost))
-                new_operators[-1].is_macro = True
-                current_prev.clear()
-                current_pre_post.clear()
-                new_name = ""
-                current_cost = 0
-                new_triv_nec.append(True)
-                new_triv_unnec.append(False)
-
-            # If last act. is triv. nec. but no macro was created
-            if op_count == 1:
-                new_operators.append(plan[index - 1])
-                new_triv_nec.append(True)
-                new_triv_unnec.append(False)
-
-            op_count = 0
+            if macro is not None:
+                add_macro(macro)
+                macro = None
             # Current op. is not triv. nec. add without changing it
             new_operators.append(op)
             new_triv_nec.append(False)
             new_triv_unnec.append(triv_unnec[index])
+    if macro is not None:
+        add_macro(macro)
 
-    if current_pre_post:
-        new_operators.append(SASOperator(f"({new_name})", list(current_prev.values()), list(current_pre_post.values()), current_cost))
-        new_operators[-1].is_macro = True
-        new_triv_nec.append(True)
-        new_triv_unnec.append(False)
+    print(f"Macro operators: {num_macros} composed of {num_merged_ops} operators, "
+          f"{num_conditional_macros} with conditional effects, "
+          f"{num_rejected} streaks split because effects could not be composed")
 
     triv_nec[:] = new_triv_nec
     triv_unnec[:] = new_triv_unnec
@@ -252,73 +404,92 @@ def process_macro_operators(plan, triv_nec, triv_unnec, use_op_cost):
     return new_operators
 
 
-def find_relevant_facts(sas_task, operators, operator_name_to_index):
-    is_fact_relevant = [[False] * domain_size for domain_size in sas_task.variables.ranges]
+def get_relevant_operator_facts(op):
+    facts = list(op.prevail)
+    for var, old_val, _, conditions in op.pre_post:
+        if old_val > -1:
+            facts.append((var, old_val))
+        facts.extend(conditions)
+    return facts
+
+
+def get_relevant_axiom_facts(axioms):
+    facts = []
+    for axiom in axioms:
+        facts.extend(axiom.condition)
+        # Keep both values of the (binary) derived variable, so that it
+        # stays binary and its default value does not change.
+        var, val = axiom.effect
+        facts += [(var, val), (var, 1 - val)]
+    return facts
+
+
+# If given, cache maps operator names (and None for the axioms) to their relevant facts.
+# Repeated calls for the same task can share it.
+# Returns a dict that maps each variable with relevant facts to the set of its relevant values.
+# Only variables touched by the goal, the plan operators and the axioms are stored, so the
+# analysis does not depend on the size of the task.
+def find_relevant_facts(sas_task, operators, operator_name_to_index, cache=None):
+    if cache is None:
+        cache = {}
+    relevant_facts = {}
     # All facts in goal are needed.
     for var, val in sas_task.goal.pairs:
-        is_fact_relevant[var][val] = True
+        relevant_facts.setdefault(var, set()).add(val)
 
     # All facts in operator preconditions are needed.
     for op in operators:
-        # op = sas_task.operators[operator_name_to_index[op_name]]
-        for var, val in op.prevail:
-            is_fact_relevant[var][val] = True
-
-        for var, old_val, _, conditions in op.pre_post:
-            if old_val > -1:
-                is_fact_relevant[var][old_val] = True
-            for cond_var, cond_val in conditions:
-                is_fact_relevant[cond_var][cond_val] = True
+        facts = cache.get(op.name)
+        if facts is None:
+            facts = cache[op.name] = get_relevant_operator_facts(op)
+        for var, val in facts:
+            relevant_facts.setdefault(var, set()).add(val)
 
     # All facts in axiom conditions are relevant
-    for axiom in sas_task.axioms:
-        for var, val in axiom.condition:
-            is_fact_relevant[var][val] = True
-        if axiom.effect[1] > -1:
-            is_fact_relevant[axiom.effect[0]][axiom.effect[1]] = True
+    if None not in cache:
+        cache[None] = get_relevant_axiom_facts(sas_task.axioms)
+    for var, val in cache[None]:
+        relevant_facts.setdefault(var, set()).add(val)
 
-    return is_fact_relevant
+    return relevant_facts
 
 
-def prune_irrelevant_domain_values(variables, is_fact_relevant, plan, ordered):
-    # For each var, store value mapping to new domain
-    vars_new_vals_map = [[-1] * domain_size for domain_size in variables.ranges]
+# Variables without relevant facts are dropped: nothing reads them, so they would only be
+# removed later by find_and_apply_variable_order(). The other variables keep their order.
+# Returns the new variables and a dict that maps each kept variable to its new index and
+# to a dict from its relevant values to the new values. All irrelevant values of a
+# variable are mapped to a new value, which is always the greatest value of the new domain.
+def prune_irrelevant_domain_values(variables, relevant_facts, plan, ordered):
+    vars_vals_map = {}
     new_value_names = []
     new_axiom_layers = []
     new_ranges = []
 
-    # For each relevant fact, add to new domain
-    for var, rel_facts in enumerate(is_fact_relevant):
-        next_val = 0
-        current_val_names = []
-        for val, is_rel in enumerate(rel_facts):
-            if is_rel:
-                vars_new_vals_map[var][val] = next_val
-                current_val_names.append(variables.value_names[var][val])
-                next_val += 1
-        # Irrelevant facts will al be mapped to a new domain value
-        # This will potentially reduce the domain size of the variables
-        # This new value will always be the greater val of the domain
-        current_val_names.append('Atom irrelevant-fact()')
-        next_val += 1
-        # End code for some value not in any precond
-        new_ranges.append(next_val)
+    for var in sorted(relevant_facts):
+        rel_vals = sorted(relevant_facts[var])
+        vars_vals_map[var] = (len(new_ranges), {val: new_val for new_val, val in enumerate(rel_vals)})
+        new_ranges.append(len(rel_vals) + 1)
         new_axiom_layers.append(variables.axiom_layers[var])
-        new_value_names.append(current_val_names)
+        new_value_names.append([variables.value_names[var][val] for val in rel_vals] + ['Atom irrelevant-fact()'])
 
     # Add variable to maintain action order
     if ordered:
         new_ranges.append(len(plan) + 1)
         new_axiom_layers.append(-1)
         new_value_names.append(['Atom plan-pos-%i()' % i for i in range(len(plan) + 1)])
-        vars_new_vals_map.append([i for i in range(len(plan) + 1)])
-        is_fact_relevant.append([True] * (len(plan) + 1))
 
     return SASVariables(ranges=new_ranges, axiom_layers=new_axiom_layers, value_names=new_value_names)\
-           , vars_new_vals_map
+           , vars_vals_map
+
 
+# Maps the fact var=val to the new variables. Irrelevant values are mapped to the greatest
+# value of the new domain.
+def map_fact(var, val, vars_vals_map, variables):
+    new_var, vals_map = vars_vals_map[var]
+    return new_var, vals_map.get(val, variables.ranges[new_var] - 1)
 
-def process_operators(operators, is_fact_relevant, vars_vals_map, variables, ordered, use_costs, triv_nec, triv_unnec):
+
+def process_operators(operators, vars_vals_map, variables, ordered, use_costs, triv_nec, triv_unnec):
     processed_operators = []
     # Variable to maintain order is ALWAYS the last variable
     ordered_var = len(variables.ranges) - 1
@@ -330,13 +501,18 @@ def process_operators(operators, is_fact_relevant, vars_vals_map, variables, ord
             processed_operators.append(SASOperator(name='(skip-action plan-pos-%i)' % op_index, prevail=[], pre_post=[(ordered_var, op_index, op_index + 1, [])], cost=0))
             continue
 
-        # Might not need to check if prevail is relevant -- was set as relevant before
-        new_prev = [(var, vars_vals_map[var][val]) for var, val in op.prevail if is_fact_relevant[var][val]]
-        new_pre_post = [(var, old_val if old_val == -1 else vars_vals_map[var][old_val],
-                        vars_vals_map[var][new_val] if is_fact_relevant[var][new_val] else variables.ranges[var] - 1,
-                        [(cond_var, vars_vals_map[cond_var][cond_val] if is_fact_relevant[cond_var][cond_val] else variables.ranges[cond_var] -1)
-                        for cond_var, cond_val in cond])
-                        for var, old_val, new_val, cond in op.pre_post]
+        # Prevail conditions are always relevant
+        new_prev = [map_fact(var, val, vars_vals_map, variables) for var, val in op.prevail]
+        # Effects on dropped variables are dropped, too
+        new_pre_post = []
+        for var, old_val, new_val, cond in op.pre_post:
+            if var not in vars_vals_map:
+                continue
+            new_var, new_val = map_fact(var, new_val, vars_vals_map, variables)
+            if old_val != -1:
+                old_val = vars_vals_map[var][1][old_val]
+            new_pre_post.append((new_var, old_val, new_val, [map_fact(cond_var, cond_val, vars_vals_map, variables)
+                                                              for cond_var, cond_val in cond]))
         # Add ordered constraint pre_post
         if ordered:
             new_pre_post.append((ordered_var, op_index, op_index + 1, []))
@@ -352,45 +528,40 @@ def process_operators(operators, is_fact_relevant, vars_vals_map, variables, ord
     return processed_operators
 
 
-def process_init(init, vars_val_map, is_fact_relevant, variables, ordered):
-    new_init_values = []
-    for var, val in enumerate(init.values):
-        # If fact is relevant add to init. Else add 'some value'
-        if is_fact_relevant[var][val]:
-            new_init_values.append(vars_val_map[var][val])
-        else:
-            new_init_values.append(variables.ranges[var] - 1)
+def process_init(init, vars_vals_map, variables, ordered):
+    new_init_values = [None] * len(variables.ranges)
+    # If fact is relevant add to init. Else add 'some value'
+    for var in vars_vals_map:
+        new_var, new_val = map_fact(var, init.values[var], vars_vals_map, variables)
+        new_init_values[new_var] = new_val
 
     # Order var always last one. Initial plan position 0
     if ordered:
-        new_init_values.append(0)
+        new_init_values[-1] = 0
 
     return SASInit(values=new_init_values)
 
 
-def process_mutex_groups(mutex_groups, vars_val_map, is_fact_relevant):
+def process_mutex_groups(mutex_groups, vars_vals_map):
     new_groups = []
     for group in mutex_groups:
-        new_mutex = [(var, vars_val_map[var][val]) for var, val in group.facts if is_fact_relevant[var][val]]
+        new_mutex = [(vars_vals_map[var][0], vars_vals_map[var][1][val]) for var, val in group.facts
+                     if var in vars_vals_map and val in vars_vals_map[var][1]]
         if len(new_mutex) > 1:
             new_groups.append(SASMutexGroup(facts=new_mutex))
 
     return new_groups
 
 
-def process_axioms(axioms, variables, vars_vals_map, is_fact_relevant):
+def process_axioms(axioms, variables, vars_vals_map):
     new_axioms = []
     for axiom in axioms:
-        # All conditions of axioms are marked as relevant, we could skip this?
-        conditions = [(var, vars_vals_map[var][val] if is_fact_relevant[var][val] else variables.ranges[var] - 1) for var, val in axiom.condition]
-        effect_var = axiom.effect[0]
-        effect_pre = axiom.effect[1]
-        if effect_pre != -1:
-            # All conditions of axioms are marked as relevant, we could skip this?
-            effect_pre = vars_vals_map[effect_var][effect_pre] if is_fact_relevant[effect_var][effect_pre] else variables.ranges[effect_var] - 1
-        effect_pos = axiom.effect[2] if is_fact_relevant[effect_var][axiom.effect[2]] else variables.ranges[effect_var] - 1
-        effect = (effect_var, effect_pos)
-        new_axioms.append(SASAxiom(conditions, effect))
+        # Nothing reads dropped variables
+        if axiom.effect[0] not in vars_vals_map:
+            continue
+        # All conditions of axioms are marked as relevant
+        conditions = [map_fact(var, val, vars_vals_map, variables) for var, val in axiom.condition]
+        new_axioms.append(SASAxiom(conditions, map_fact(*axiom.effect, vars_vals_map, variables)))
 
     return new_axioms
 
@@ -556,6 +727,212 @@ def find_triv_unnec_actions(init, goal, variables, plan, triv_nec, fact_achiever
     return triv_unnec
 
 
+def get_read_variables(op):
+    read_vars = {var for var, _ in op.prevail}
+    for var, old_val, _, eff_conditions in op.pre_post:
+        if old_val != -1:
+            read_vars.add(var)
+        read_vars.update(cond_var for cond_var, _ in eff_conditions)
+    return read_vars
+
+
+# Splits a plan of the given length into consecutive windows of window_size steps.
+# With an offset, the first window only contains the first offset steps, so that
+# the window borders differ from those of a run without offset.
+def get_windows(plan_length, window_size, offset):
+    first_end = offset if 0 < offset < plan_length else window_size
+    ends = list(range(first_end, plan_length, window_size)) + [plan_length]
+    return list(zip([0] + ends[:-1], ends))
+
+
+# Creates one action elimination task for each window of the plan. The initial state
+# of a window is the state reached by the original plan prefix. Its goal fixes all
+# variables that the remaining plan or the goal read to their values after the window
+# in the original plan, so the reduced plans of all windows can be concatenated.
+# Windows whose task is trivially solvable get no task file and can be dropped. Each
+# window records the information about its compiled task (see create_action_elim_task()),
+# which includes the cost bound and the planner configuration for its search, and how
+# many of its steps are not on a critical path (see step_deordering.py).
+def create_window_tasks(sas_task, plan, operator_name_to_index, window_size, window_offset, directory, options):
+    if sas_task.axioms:
+        sys.exit("Windowed action elimination does not support tasks with axioms.")
+    operators = [sas_task.operators[operator_name_to_index[op]] for op in plan]
+    windows = get_windows(len(plan), window_size, window_offset)
+
+    # Variables read after each window end, computed backwards.
+    read_after = {}
+    read_vars = {var for var, _ in sas_task.goal.pairs}
+    window_ends = {end for _, end in windows}
+    for index in range(len(plan), -1, -1):
+        if index in window_ends:
+            read_after[index] = set(read_vars)
+        if index > 0:
+            read_vars |= get_read_variables(operators[index - 1])
+
+    trajectory = PlanSimulator(sas_task, operator_name_to_index).simulate(plan)
+    # Steps with slack do not lie on a critical path of the deordered plan.
+    # This includes steps whose effects no later step reads, so the driver
+    # solves windows with more such steps first.
+    slack = deorder_plan(sas_task, plan, operator_name_to_index).get_slack()
+    window_infos = []
+    for window_index, (start, end) in enumerate(windows):
+        window_init = list(trajectory[start])
+        state = trajectory[end]
+        if end == len(plan):
+            window_goal = sas_task.goal.pairs
+        else:
+            window_goal = [(var, state[var]) for var in sorted(read_after[end])]
+        # Shallow copy to keep the operator indices
+        window_task = copy(sas_task)
+        window_task.init = SASInit(window_init)
+        window_task.goal = SASGoal(window_goal)
+        non_critical_steps = sum(1 for step_slack in slack[start:end] if step_slack > 0)
+        print(f"Window {window_index}: plan steps {start} to {end - 1}, "
+              f"{non_critical_steps} non-critical steps")
+        task_file = None
+        task_info = {}
+        if any(window_init[var] != val for var, val in window_goal):
+            try:
+                new_task = create_action_elim_task(window_task, plan[start:end], operator_name_to_index, \
+                                                   options.subsequence, options.enhanced, options.reduction, \
+                                                   options.add_pos_to_goal, options.enhanced_fix_point, \
+                                                   options.enhanced_unnecessary, options.macro_operators, \
+                                                   options.scale_costs, directory=directory, task_info=task_info)
+            except TriviallySolvable:
+                pass
+            else:
+                task_file = os.path.join(directory, WINDOW_TASK_FILE % window_index)
+                with open(task_file, mode='w') as output_file:
+                    new_task.output(stream=output_file)
+        if task_file is None:
+            print(f"Window {window_index} can be dropped completely.")
+        window_infos.append({"start": start, "end": end, "task": task_file,
+                             "task_info": task_info or None,
+                             "non_critical_steps": non_critical_steps})
+
+    # Without metric, all operators cost 1.
+    costs = [op.cost if sas_task.metric else 1 for op in operators]
+    with open(os.path.join(directory, WINDOWS_FILE), 'w') as windows_file:
+        json.dump({"plan": plan, "costs": costs, "windows": window_infos}, windows_file)
+
+
+# Returns the concatenation of the distinct plans, cheapest first. Every subsequence of
+# a plan is a subsequence of the concatenation, so solving the ordered action elimination
+# task for the concatenation yields a plan at least as cheap as reducing each plan on its
+# own, and the reduced plan may combine steps of several plans. The concatenation is no
+# valid plan, so the triviality analysis (--enhanced) cannot be used for it.
+def get_multi_plan_sequence(plans, costs):
+    distinct_plans = []
+    for plan, cost in sorted(zip(plans, costs), key=lambda plan_and_cost: plan_and_cost[1]):
+        if plan not in distinct_plans:
+            distinct_plans.append(plan)
+    print(f"Multi-plan action elimination for {len(distinct_plans)} distinct plans "
+          f"with {sum(len(plan) for plan in distinct_plans)} steps")
+    return [op for plan in distinct_plans for op in plan]
+
+
+def write_plan(plan, cost, metric, filename):
+    # Write to a temporary file first, so that the driver never sees a
+    # partial plan if we are killed while writing.
+    with open(filename + '.tmp', 'w') as plan_file:
+        for op in plan:
+            print(op, file=plan_file)
+        print("; cost = %d (%s)" % (cost, "general cost" if metric else "unit cost"), file=plan_file)
+    os.replace(filename + '.tmp', filename)
+
+
+# Returns the plan for the original task from a plan for the action elimination task
+# (same as _parse_plan_filter_skip_actions() in driver/run_components.py).
+def parse_action_elim_plan(filename):
+    plan = []
+    with open(filename) as plan_file:
+        for line in plan_file:
+            if line.startswith(";") or line.startswith("(skip-action plan-pos-"):
+                continue
+            if line.startswith("(" + MACRO_OP_STRING):
+                plan += ["(%s)" % name for name in line.strip()[1:-1].split(MACRO_OP_STRING)[1:]]
+            else:
+                plan.append(line.strip())
+    return plan
+
+
+# Solves the action elimination task for the plan with search_cmd, which must write its
+# plan to SEARCH_PLAN_FILE in options.directory, and repeats this for the reduced plan until it no longer gets
+# shorter or cheaper or time_limit seconds (if not None) have passed. The parsed task and the relevant
+# facts of its operators are reused in all rounds. Each search is bounded by the cost of the plan in the
+# compiled task (see SEARCH_BOUND_FILE). With auto_configuration, the search options that
+# select_planner_configuration() chooses for each round's task are appended to search_cmd.
+# Returns the final plan and its cost.
+def iterate_action_elimination(sas_task, plan, operator_name_to_index, options, search_cmd, time_limit,
+                               auto_configuration=False):
+    bound_file = os.path.join(options.directory, SEARCH_BOUND_FILE)
+    # The executable comes first, the search options last.
+    search_cmd = search_cmd[:1] + ["--internal-bound-file", bound_file] + search_cmd[1:]
+    simulator = PlanSimulator(sas_task, operator_name_to_index)
+    cost = simulator.get_cost(plan)
+    relevance_cache = {}
+    start_time = time.monotonic()
+    trajectory = [cost]
+    # Each round that we do not stop after makes the plan shorter.
+    for round_index in itertools.count():
+        remaining_time = None
+        if time_limit is not None:
+            remaining_time = time_limit - (time.monotonic() - start_time)
+            if remaining_time <= 0:
+                break
+        round_start_time = time.monotonic()
+        task_info = {}
+        try:
+            new_task = create_action_elim_task(sas_task, plan, operator_name_to_index, options.subsequence, \
+                                               options.enhanced, options.reduction, options.add_pos_to_goal, \
+                                               options.enhanced_fix_point, options.enhanced_unnecessary, \
+                                               options.macro_operators, options.scale_costs, relevance_cache, \
+                                               options.directory, task_info)
+        except TriviallySolvable:
+            new_plan = []
+        else:
+            task_file = os.path.join(options.directory, options.file)
+            with open(task_file, mode='w') as output_file:
+                new_task.output(stream=output_file)
+            with open(bound_file, mode='w') as bound_stream:
+                bound_stream.write("%d %f\n" % (task_info["plan_cost"], time.time()))
+            round_search_cmd = search_cmd
+            if auto_configuration:
+                print(f"AE round {round_index}: {task_info['configuration']} configuration")
+                round_search_cmd = search_cmd + task_info["search_options"]
+            sys.stdout.flush()
+            try:
+                with open(task_file) as task_stream:
+                    returncode = subprocess.run(round_search_cmd, stdin=task_stream,
+                                                timeout=remaining_time).returncode
+            except subprocess.TimeoutExpired:
+                print(f"AE round {round_index}: out of time")
+                break
+            if returncode in [SEARCH_UNSOLVABLE, SEARCH_UNSOLVED_INCOMPLETE]:
+                # The search is bounded, so no cheaper plan exists.
+                print(f"AE round {round_index}: no cheaper plan")
+                break
+            if returncode != 0:
+                print(f"AE round {round_index}: search exit code {returncode}")
+                break
+            search_plan_file = os.path.join(options.directory, SEARCH_PLAN_FILE)
+            new_plan = parse_action_elim_plan(search_plan_file)
+            os.remove(search_plan_file)
+        try:
+            new_cost = simulator.validate(new_plan)
+        except InvalidPlan as err:
+            print(f"AE round {round_index}: reduced plan is invalid ({err})")
+            break
+        print(f"AE round {round_index}: cost {cost} -> {new_cost}, length {len(plan)} -> {len(new_plan)}, "
+              f"time {time.monotonic() - round_start_time:.3f}s")
+        if (new_cost, len(new_plan)) >= (cost, len(plan)):
+            break
+        plan, cost = new_plan, new_cost
+        trajectory.append(cost)
+    print(f"AE cost trajectory: {' -> '.join(map(str, trajectory))}")
+    return plan, cost
+
+
 def main():
     parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawTextHelpFormatter)
     required_named = parser.add_argument_group('required named arguments')
@@ -571,6 +948,15 @@ def main():
     # Remove -f option for simplicity. Might want to add this again later
     # parser.add_argument('-f', '--file', help='Output file where reformulated SAS+ will be stored',type=str,default='minimal-reduction.sas')
     parser.add_argument('-d', '--directory', help='Output directory',type=str, default='.')
+    parser.add_argument('--greedy', help=f'Reduce the plan with greedy action elimination before compiling it and write the result to {GREEDY_PLAN_FILE}', action='store_true', default=False)
+    parser.add_argument('--greedy-only', help='Only run greedy action elimination and do not create a task (implies --greedy)', action='store_true', default=False)
+    parser.add_argument('--window-size', help='Create one task per window of this many plan steps instead of a single task', type=int, default=None)
+    parser.add_argument('--window-offset', help='Number of plan steps in the first window (default: window size)', type=int, default=0)
+    parser.add_argument('--fixpoint', help=f'Solve the task with the search command and repeat this for the reduced plan until it does not improve. Write the final plan to {FIXPOINT_PLAN_FILE}', action='store_true', default=False)
+    parser.add_argument('--fixpoint-time-limit', help='Stop iterating after this many seconds', type=float, default=None)
+    parser.add_argument('--auto-search-configuration', help='Append the search options chosen by the size of each task (see select_planner_configuration()) to the search command', action='store_true', default=False)
+    parser.add_argument('--search-command', help=f'Command (and options) that reads a task from stdin and writes a plan to {SEARCH_PLAN_FILE} in the output directory (must be the last option)', nargs=argparse.REMAINDER, default=None)
+    parser.add_argument('--additional-plans', help='Further plan files. The compiled task allows reducing all plans at the same time', nargs='+', default=[])
     parser.add_argument('--no-cost-scaling', dest="scale_costs", help='Do not scale costs even if the input task contains zero-cost actions. Using this option means that plans found with MR might not be perfectly justified.', action='store_false', default=True)
     options = parser.parse_args()
     options.file = 'action-elimination.sas'
@@ -581,19 +967,75 @@ def main():
 
     parse_input_sas_time = process_time()
     task, operator_name_to_index_map = parse_task(options.task)
-    plan, plan_cost = parse_plan(options.plan)
+    plans = [parse_plan(plan_file)[0] for plan_file in [options.plan] + options.additional_plans]
     parse_input_sas_time = process_time() - parse_input_sas_time
     print(f"Parse input SAS task and plan time: {parse_input_sas_time:.3f}")
 
+    validate_time = process_time()
+    simulator = PlanSimulator(task, operator_name_to_index_map)
+    plan_costs = []
+    for plan_file, plan in zip([options.plan] + options.additional_plans, plans):
+        try:
+            plan_costs.append(simulator.validate(plan))
+        except InvalidPlan as err:
+            sys.exit(f"Input plan {plan_file} is invalid: {err}")
+    print(f"Validate input plan time: {process_time() - validate_time:.3f}")
+
+    if options.greedy or options.greedy_only:
+        greedy_time = process_time()
+        for index, plan in enumerate(plans):
+            plans[index], plan_costs[index] = greedy_action_elimination(task, plan, operator_name_to_index_map)
+        best = plan_costs.index(min(plan_costs))
+        write_plan(plans[best], plan_costs[best], task.metric, os.path.join(options.directory, GREEDY_PLAN_FILE))
+        print(f"Greedy action elimination time: {process_time() - greedy_time:.3f}")
+        if options.greedy_only:
+            return
+
+    plan = plans[0]
+    bound_plan_length = None
+    if len(plans) > 1:
+        if options.window_size is not None or options.fixpoint:
+            sys.exit("--additional-plans cannot be combined with --window-size or --fixpoint.")
+        plan = get_multi_plan_sequence(plans, plan_costs)
+        # The sequence starts with the cheapest plan, whose cost bounds the search.
+        bound_plan_length = len(plans[plan_costs.index(min(plan_costs))])
+        if options.subsequence and options.enhanced:
+            print("Triviality analysis is not supported for several plans, ignoring --enhanced.")
+            options.enhanced = False
+
     # Measure create task time
     create_task_time = process_time()
-    new_task = create_action_elim_task(task, plan, operator_name_to_index_map, options.subsequence, \
-                                       options.enhanced, options.reduction, options.add_pos_to_goal, \
-                                       options.enhanced_fix_point, options.enhanced_unnecessary, \
-                                       options.macro_operators, options.scale_costs)
+    if options.window_size is not None:
+        if options.window_size < 1:
+            sys.exit("Window size must be positive.")
+        create_window_tasks(task, plan, operator_name_to_index_map, options.window_size, \
+                            options.window_offset, options.directory, options)
+        print(f"Create AE window tasks time: {process_time() - create_task_time:.3f}")
+        return
+
+    if options.fixpoint:
+        if not options.search_command:
+            sys.exit("--fixpoint needs --search-command.")
+        plan, plan_cost = iterate_action_elimination(task, plan, operator_name_to_index_map, options, \
+                                                     options.search_command, options.fixpoint_time_limit, \
+                                                     options.auto_search_configuration)
+        write_plan(plan, plan_cost, task.metric, os.path.join(options.directory, FIXPOINT_PLAN_FILE))
+        return
+
+    task_info = {}
+    try:
+        new_task = create_action_elim_task(task, plan, operator_name_to_index_map, options.subsequence, \
+                                           options.enhanced, options.reduction, options.add_pos_to_goal, \
+                                           options.enhanced_fix_point, options.enhanced_unnecessary, \
+                                           options.macro_operators, options.scale_costs, directory=options.directory, \
+                                           task_info=task_info, bound_plan_length=bound_plan_length)
+    except TriviallySolvable:
+        sys.exit("Action elimination task is trivially solvable. New task will not be generated.")
 
     with open(os.path.join(options.directory, options.file), mode='w') as output_file:
         new_task.output(stream=output_file)
+    with open(os.path.join(options.directory, TASK_INFO_FILE), mode='w') as task_info_file:
+        json.dump(task_info, task_info_file)
 
     create_task_time = process_time() - create_task_time
     print(f"Create AE task time: {create_task_time:.3f}")
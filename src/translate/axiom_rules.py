@@ -1,6 +1,6 @@
-import options
 import pddl
 import sccs
+import stats
 import timers
 
 from collections import defaultdict
@@ -52,7 +52,40 @@ class AxiomCluster(object):
         self.layer = 0
 
 
-def handle_axioms(operators, axioms, goals, layer_strategy):
+class SubsetTrie(object):
+    """Trie over sorted literal sequences (axiom conditions).
+
+    Supports checking whether the trie contains a subset of a given
+    sorted literal sequence without comparing the sequence to all
+    stored sequences."""
+
+    # Marks that the path from the root to a node is a stored sequence.
+    END = None
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, literals):
+        node = self.root
+        for literal in literals:
+            node = node.setdefault(literal, {})
+        node[SubsetTrie.END] = True
+
+    def contains_subset_of(self, literals):
+        stack = [(self.root, 0)]
+        while stack:
+            node, pos = stack.pop()
+            if SubsetTrie.END in node:
+                return True
+            for index in range(pos, len(literals)):
+                child = node.get(literals[index])
+                if child is not None:
+                    stack.append((child, index + 1))
+        return False
+
+
+def handle_axioms(operators, axioms, goals, layer_strategy,
+                  negation_budget=None):
     clusters = compute_clusters(axioms, goals, operators)
     axiom_layers = compute_axiom_layers(clusters, layer_strategy)
 
@@ -63,7 +96,7 @@ def handle_axioms(operators, axioms, goals, layer_strategy):
     # axiom layers and derived variable default values from the output.
     # (All derived variables should be binary and default to false.)
     with timers.timing("Computing negative axioms"):
-        compute_negative_axioms(clusters)
+        compute_negative_axioms(clusters, negation_budget)
 
     axioms = get_axioms(clusters)
     if DEBUG:
@@ -138,29 +171,26 @@ def compute_simplified_axioms(axioms):
     for axiom in axioms:
         axiom.condition = sorted(set(axiom.condition))
 
-    # Remove dominated axioms.
-    axioms_to_skip = set()
-    axioms_by_literal = defaultdict(set)
-    for axiom in axioms:
-        if axiom.effect in axiom.condition:
-            axioms_to_skip.add(id(axiom))
-        else:
-            for literal in axiom.condition:
-                axioms_by_literal[literal].add(id(axiom))
-
-    for axiom in axioms:
-        if id(axiom) in axioms_to_skip:
-            continue   # Required to keep one of multiple identical axioms.
-        if not axiom.condition:  # empty condition: dominates everything
-            return [axiom]
-        literals = iter(axiom.condition)
-        dominated_axioms = axioms_by_literal[next(literals)].copy()
-        for literal in literals:
-            dominated_axioms &= axioms_by_literal[literal]
-        for dominated_axiom in dominated_axioms:
-            if dominated_axiom != id(axiom):
-                axioms_to_skip.add(dominated_axiom)
-    return [axiom for axiom in axioms if id(axiom) not in axioms_to_skip]
+    # Remove dominated axioms. An axiom is dominated by all axioms whose
+    # conditions are subsets of its condition. We bucket the axioms by
+    # condition size, so all potentially dominating axioms of an axiom
+    # are in the trie when we reach it. Since the sort is stable, we
+    # keep the first of multiple identical axioms. Axioms whose
+    # condition contains their effect are useless and never dominate
+    # other axioms.
+    candidates = sorted(
+        (axiom for axiom in axioms if axiom.effect not in axiom.condition),
+        key=lambda axiom: len(axiom.condition))
+    if candidates and not candidates[0].condition:
+        # empty condition: dominates everything
+        return [candidates[0]]
+    trie = SubsetTrie()
+    kept_axioms = set()
+    for axiom in candidates:
+        if not trie.contains_subset_of(axiom.condition):
+            trie.insert(axiom.condition)
+            kept_axioms.add(id(axiom))
+    return [axiom for axiom in axioms if id(axiom) in kept_axioms]
 
 
 def compute_clusters(axioms, goals, operators):
@@ -195,6 +225,7 @@ def compute_clusters(axioms, goals, operators):
                 cluster.axioms[variable] = compute_simplified_axioms(cluster.axioms[variable])
                 removed += old_size - len(cluster.axioms[variable])
     print("Translator axioms removed by simplifying: %d" % removed)
+    stats.set_value("translator_axioms_removed_by_simplifying", removed)
 
     # Create links between clusters (positive dependencies).
     for from_variable, depends_on in dependencies.positive_dependencies.items():
@@ -247,7 +278,19 @@ def compute_axiom_layers(clusters, strategy):
     return layers
 
 
-def compute_negative_axioms(clusters):
+def compute_negative_axioms(clusters, budget=None):
+    """Add the negated axioms for all clusters that are needed negatively.
+
+    If *budget* is not None, it limits the number of axioms that
+    negating the axioms of a single derived variable may create. If
+    the limit is exceeded, we fall back to the overapproximation that
+    the variable can be false unconditionally, as for clusters with
+    multiple variables."""
+    # Derived variables with the same definitions (up to their own
+    # name) have the same negation. Maps the tuple of conditions to the
+    # conditions of the negated axioms.
+    negation_cache = {}
+    num_fallbacks = 0
     for cluster in clusters:
         if cluster.needed_negatively:
             if len(cluster.variables) > 1:
@@ -270,11 +313,44 @@ def compute_negative_axioms(clusters):
                     cluster.axioms[variable].append(negated_axiom)
             else:
                 variable = next(iter(cluster.variables))
-                negated_axioms = negate(cluster.axioms[variable])
+                axioms = cluster.axioms[variable]
+                cache_key = tuple(sorted(
+                    tuple(axiom.condition) for axiom in axioms))
+                # Axioms that mention their own variable are negated
+                # differently (see compute_simplified_axioms).
+                use_cache = not any(
+                    literal.positive() == variable
+                    for condition in cache_key for literal in condition)
+                if use_cache and cache_key in negation_cache:
+                    negated_axioms = [
+                        pddl.PropositionalAxiom(
+                            axioms[0].name, list(condition), variable.negate())
+                        for condition in negation_cache[cache_key]]
+                else:
+                    negated_axioms = negate(axioms, budget)
+                    if negated_axioms is None:
+                        num_fallbacks += 1
+                        negated_axioms = [pddl.PropositionalAxiom(
+                            axioms[0].name, [], variable.negate())]
+                    elif use_cache:
+                        negation_cache[cache_key] = [
+                            tuple(axiom.condition) for axiom in negated_axioms]
                 cluster.axioms[variable] += negated_axioms
+    if budget is not None:
+        print("Translator axiom negations exceeding the budget: %d" %
+              num_fallbacks)
+    stats.set_value("translator_axiom_negation_fallbacks", num_fallbacks)
+
 
+def negate(axioms, budget=None):
+    """Return axioms for the negation of the derived variable defined
+    by *axioms* (which must all have the same head).
 
-def negate(axioms):
+    The negation is a conjunction of negated conditions, which we
+    multiply out into a disjunction. We simplify the intermediate
+    result after every multiplication, because extensions of
+    dominated axioms stay dominated. If *budget* is not None and the
+    number of axioms would exceed it, return None."""
     assert axioms
     result = [pddl.PropositionalAxiom(axioms[0].name, [], axioms[0].effect.negate())]
     for axiom in axioms:
@@ -289,6 +365,8 @@ def negate(axioms):
             for result_axiom in result:
                 result_axiom.condition.append(new_literal)
         else:
+            if budget is not None and len(result) * len(condition) > budget:
+                return None
             new_result = []
             for literal in condition:
                 literal = literal.negate()
@@ -296,7 +374,7 @@ def negate(axioms):
                     new_axiom = result_axiom.clone()
                     new_axiom.condition.append(literal)
                     new_result.append(new_axiom)
-            result = new_result
+            result = compute_simplified_axioms(new_result)
     result = compute_simplified_axioms(result)
     return result
 
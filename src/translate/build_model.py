@@ -5,6 +5,7 @@ import sys
 import itertools
 
 import pddl
+import stats
 import timers
 from functools import reduce
 
@@ -305,6 +306,7 @@ def compute_model(prog):
         queue = Queue(fact_atoms)
 
     print("Generated %d rules." % len(rules))
+    stats.set_value("translator_model_rules", len(rules))
     with timers.timing("Computing model"):
         relevant_atoms = 0
         auxiliary_atoms = 0
@@ -323,6 +325,10 @@ def compute_model(prog):
     print("%d auxiliary atoms" % auxiliary_atoms)
     print("%d final queue length" % len(queue.queue))
     print("%d total queue pushes" % queue.num_pushes)
+    stats.set_value("translator_relevant_atoms", relevant_atoms)
+    stats.set_value("translator_auxiliary_atoms", auxiliary_atoms)
+    stats.set_value("translator_final_queue_length", len(queue.queue))
+    stats.set_value("translator_total_queue_pushes", queue.num_pushes)
     return queue.queue
 
 if __name__ == "__main__":
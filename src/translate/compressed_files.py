@@ -0,0 +1,32 @@
+"""Open SAS files that are compressed with gzip (".gz") or
+Zstandard (".zst") like uncompressed files.
+
+Zstandard support requires the zstandard package.
+"""
+
+import gzip
+import sys
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# gzip's default level 9 is much slower than 6 and saves little space.
+GZIP_COMPRESSION_LEVEL = 6
+
+
+def open_file(filename, mode="r", buffering=-1):
+    """Like open() in text mode, but (de)compress files whose name
+    ends in ".gz" or ".zst"."""
+    assert mode in ["r", "w"], mode
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", compresslevel=GZIP_COMPRESSION_LEVEL)
+    elif filename.endswith(".zst"):
+        if zstandard is None:
+            sys.exit("Error: Reading and writing .zst files requires "
+                     "the zstandard package.")
+        return zstandard.open(filename, mode + "t")
+    else:
+        return open(filename, mode, buffering=buffering)
@@ -1,6 +1,7 @@
 import invariant_finder
 import options
 import pddl
+import stats
 import timers
 
 
@@ -75,6 +76,7 @@ def choose_groups(groups, reachable_facts):
         uncovered_facts.difference_update(group)
         result.append(group)
     print(len(uncovered_facts), "uncovered facts")
+    stats.set_value("translator_uncovered_facts", len(uncovered_facts))
     result += [[fact] for fact in uncovered_facts]
     return result
 
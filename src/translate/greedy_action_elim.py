@@ -0,0 +1,74 @@
+"""
+Greedy action elimination for SAS+ plans.
+
+For each plan step i, we remove step i and every later step that is no
+longer applicable without it. If the remaining plan still reaches the
+goal, the removed steps are redundant and we drop them right away. We
+repeat passes over the plan until a pass removes nothing. Each pass
+simulates the plan once per step, so the elimination runs in polynomial
+time without calling a planner. Its result is a subsequence of the plan
+that the optimal action elimination compilation can reduce further.
+
+Unlike greedy action elimination in the stricter sense (GAE), which
+removes only the most expensive redundant set in each pass, we remove
+each redundant set as soon as we find it. GAE needs one pass per removed
+set, which is too slow for long plans in Python.
+
+States and operators are represented as in plan_simulator.py.
+"""
+
+from plan_simulator import CompiledOperator, create_state
+
+
+def _get_redundant_steps(operators, plan, start, state, goal):
+    """Return the steps that become inapplicable when removing step
+    *start* from *plan*, including *start*, or None if the remaining plan
+    does not reach *goal*. *state* is the state before step *start*."""
+    removed = [start]
+    state = state[:]
+    for step in range(start + 1, len(plan)):
+        op = operators[plan[step]]
+        if op.is_applicable(state):
+            op.apply(state)
+        else:
+            removed.append(step)
+    if all(state[var] == val for var, val in goal):
+        return removed
+    return None
+
+
+def greedy_action_elimination(sas_task, plan, operator_name_to_index):
+    """Return the subsequence of *plan* (a list of operator names) that
+    GAE finds and its cost. Plans for tasks with axioms are returned
+    unchanged."""
+    operators = {}
+    for name in plan:
+        if name not in operators:
+            operators[name] = CompiledOperator(
+                sas_task.operators[operator_name_to_index[name]], sas_task.metric)
+    if sas_task.axioms:
+        print("Greedy action elimination does not support axioms.")
+        return plan, sum(operators[name].cost for name in plan)
+    init = create_state(sas_task.init.values, sas_task.variables.ranges)
+    goal = sas_task.goal.pairs
+
+    passes = 0
+    changed = True
+    while changed:
+        changed = False
+        passes += 1
+        state = init[:]
+        start = 0
+        while start < len(plan):
+            removed = _get_redundant_steps(operators, plan, start, state, goal)
+            if removed is None:
+                operators[plan[start]].apply(state)
+                start += 1
+            else:
+                # Try the step that follows the removed one next.
+                removed_steps = set(removed)
+                plan = [name for step, name in enumerate(plan) if step not in removed_steps]
+                changed = True
+    cost = sum(operators[name].cost for name in plan)
+    print(f"Greedy action elimination: {passes} passes, plan length {len(plan)}, cost {cost}")
+    return plan, cost
@@ -8,6 +8,7 @@ import time
 import invariants
 import options
 import pddl
+import stats
 import timers
 
 class BalanceChecker:
@@ -87,6 +88,7 @@ def find_invariants(task, reachable_action_params):
     limit = options.invariant_generation_max_candidates
     candidates = deque(itertools.islice(get_initial_invariants(task), 0, limit))
     print(len(candidates), "initial candidates")
+    stats.set_value("translator_initial_invariant_candidates", len(candidates))
     seen_candidates = set(candidates)
 
     balance_checker = BalanceChecker(task, reachable_action_params)
@@ -101,6 +103,7 @@ def find_invariants(task, reachable_action_params):
         candidate = candidates.popleft()
         if time.process_time() - start_time > options.invariant_generation_max_time:
             print("Time limit reached, aborting invariant generation")
+            stats.set_value("translator_invariant_generation_timeout", True)
             return
         if candidate.check_balance(balance_checker, enqueue_func):
             yield candidate
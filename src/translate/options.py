@@ -40,6 +40,11 @@ def parse_args():
         "--keep-unreachable-facts",
         dest="filter_unreachable_facts", action="store_false",
         help="keep facts that can't be reached from the initial state")
+    argparser.add_argument(
+        "--iterated-simplification", action="store_true",
+        help="alternate between removing unreachable facts and removing "
+        "inapplicable operators and effects until a fixpoint is reached "
+        "(ignored with --keep-unreachable-facts)")
     argparser.add_argument(
         "--skip-variable-reordering",
         dest="reorder_variables", action="store_false",
@@ -49,6 +54,10 @@ def parse_args():
         "--keep-unimportant-variables",
         dest="filter_unimportant_vars", action="store_false",
         help="keep variables that do not influence the goal in the causal graph")
+    argparser.add_argument(
+        "--statistics-file", metavar="FILE",
+        help="write counts, timings and task sizes of all translator "
+        "phases as a JSON document to FILE")
     argparser.add_argument(
         "--dump-task", action="store_true",
         help="dump human-readable SAS+ representation of the task")
@@ -63,6 +72,12 @@ def parse_args():
         help="How to assign layers to derived variables. 'min' attempts to put as "
         "many variables into the same layer as possible, while 'max' puts each variable "
         "into its own layer unless it is part of a cycle.")
+    argparser.add_argument(
+        "--axiom-negation-budget", default=None, type=int,
+        help="max number of negated axioms created for a single derived "
+        "variable. If negating the axioms of a variable exceeds this "
+        "number, the negation is overapproximated by assuming that the "
+        "variable can be false unconditionally (default: no limit)")
     return argparser.parse_args()
 
 
@@ -0,0 +1,177 @@
+#! /usr/bin/env python3
+
+"""
+Simulate and validate plans for SAS+ tasks.
+
+The simulator applies the operators of a plan (given by name) to a state
+array, checks their preconditions and the goal, and returns the visited
+states. Unlike VAL, it works on the SAS+ task that the planner solves, so
+it can check plans for the translated task or for tasks that were
+modified after the translation (e.g. the windows of action elimination).
+
+States are stored as byte arrays (or integer arrays for variables with
+more than 256 values), so copying a state is cheap. Operators are
+compiled to lists of (variable, value) pairs when they are first used.
+Derived variables are reset to their initial values and recomputed with
+the axioms layer by layer after each step, like in the search component.
+
+Usage:
+    ./plan_simulator.py <output.sas> <sas_plan> [<sas_plan> ...]
+"""
+
+import sys
+from array import array
+
+from plan_parser import parse_plan
+from sas_parser import parse_task
+
+
+class InvalidPlan(Exception):
+    def __init__(self, step, message):
+        super().__init__(f"step {step}: {message}")
+        self.step = step
+
+
+class CompiledOperator:
+    def __init__(self, op, use_costs):
+        self.name = op.name
+        self.preconditions = list(op.prevail) + [
+            (var, pre) for var, pre, _, _ in op.pre_post if pre != -1]
+        self.effects = [(var, post) for var, _, post, cond in op.pre_post if not cond]
+        self.conditional_effects = [
+            (var, post, cond) for var, _, post, cond in op.pre_post if cond]
+        self.cost = op.cost if use_costs else 1
+
+    def is_applicable(self, state):
+        return all(state[var] == val for var, val in self.preconditions)
+
+    def apply(self, state):
+        """Apply the operator to *state* in place."""
+        # Effect conditions refer to the state before the operator.
+        triggered = [
+            (var, val) for var, val, cond in self.conditional_effects
+            if all(state[cond_var] == cond_val for cond_var, cond_val in cond)]
+        for var, val in self.effects:
+            state[var] = val
+        for var, val in triggered:
+            state[var] = val
+
+
+def create_state(values, ranges):
+    typecode = "B" if max(ranges, default=0) <= 256 else "i"
+    return array(typecode, values)
+
+
+class PlanSimulator:
+    def __init__(self, sas_task, operator_name_to_index):
+        self.task = sas_task
+        self.operator_name_to_index = operator_name_to_index
+        self.operators = {}
+        self.goal = sas_task.goal.pairs
+        self.derived_variables = [
+            var for var, layer in enumerate(sas_task.variables.axiom_layers)
+            if layer != -1]
+        axioms_by_layer = {}
+        for axiom in sas_task.axioms:
+            var, val = axiom.effect
+            layer = sas_task.variables.axiom_layers[var]
+            axioms_by_layer.setdefault(layer, []).append((axiom.condition, var, val))
+        self.axiom_layers = [axioms_by_layer[layer] for layer in sorted(axioms_by_layer)]
+        self.init = create_state(sas_task.init.values, sas_task.variables.ranges)
+        self.evaluate_axioms(self.init)
+
+    def get_operator(self, name, step=None):
+        """Return the compiled operator called *name*. Raise InvalidPlan
+        if the task has no such operator."""
+        op = self.operators.get(name)
+        if op is None:
+            index = self.operator_name_to_index.get(name)
+            if index is None:
+                raise InvalidPlan(step, f"unknown operator {name}")
+            op = self.operators[name] = CompiledOperator(
+                self.task.operators[index], self.task.metric)
+        return op
+
+    def get_initial_state(self):
+        return self.init[:]
+
+    def evaluate_axioms(self, state):
+        """Recompute the derived variables of *state* in place."""
+        if not self.axiom_layers:
+            return
+        for var in self.derived_variables:
+            state[var] = self.task.init.values[var]
+        for axioms in self.axiom_layers:
+            changed = True
+            while changed:
+                changed = False
+                for condition, var, val in axioms:
+                    if state[var] != val and all(
+                            state[cond_var] == cond_val for cond_var, cond_val in condition):
+                        state[var] = val
+                        changed = True
+
+    def apply(self, state, name, step=None):
+        """Apply the operator called *name* to *state* in place. Raise
+        InvalidPlan if it is not applicable."""
+        op = self.get_operator(name, step)
+        if not op.is_applicable(state):
+            violated = [(var, val) for var, val in op.preconditions if state[var] != val]
+            raise InvalidPlan(step, f"{name} is not applicable, violated preconditions {violated}")
+        op.apply(state)
+        self.evaluate_axioms(state)
+
+    def is_goal(self, state):
+        return all(state[var] == val for var, val in self.goal)
+
+    def get_cost(self, plan):
+        return sum(self.get_operator(name, step).cost for step, name in enumerate(plan))
+
+    def simulate(self, plan, state=None):
+        """Apply *plan* to *state* (default: the initial state) and return
+        the list of visited states, starting with *state*. Raise
+        InvalidPlan if an operator is not applicable."""
+        state = self.get_initial_state() if state is None else state[:]
+        trajectory = [state]
+        for step, name in enumerate(plan):
+            state = state[:]
+            self.apply(state, name, step)
+            trajectory.append(state)
+        return trajectory
+
+    def validate(self, plan):
+        """Return the cost of *plan*. Raise InvalidPlan if the plan is
+        not applicable or does not reach the goal."""
+        state = self.get_initial_state()
+        for step, name in enumerate(plan):
+            self.apply(state, name, step)
+        if not self.is_goal(state):
+            unreached = [(var, val) for var, val in self.goal if state[var] != val]
+            raise InvalidPlan(len(plan), f"goals {unreached} not reached")
+        return self.get_cost(plan)
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    task, operator_name_to_index = parse_task(sys.argv[1], allow_axioms=True)
+    simulator = PlanSimulator(task, operator_name_to_index)
+    all_valid = True
+    for plan_file in sys.argv[2:]:
+        plan, plan_cost = parse_plan(plan_file)
+        try:
+            cost = simulator.validate(plan)
+        except InvalidPlan as err:
+            print(f"Plan {plan_file} is invalid: {err}")
+            all_valid = False
+            continue
+        if cost != plan_cost:
+            print(f"Plan {plan_file} is valid, but has cost {cost} instead of {plan_cost}")
+            all_valid = False
+        else:
+            print(f"Plan {plan_file} is valid with cost {cost}")
+    sys.exit(0 if all_valid else 1)
+
+
+if __name__ == '__main__':
+    main()
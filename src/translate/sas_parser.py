@@ -11,11 +11,15 @@
 #######################################################################
 
 import sys, os
+import compressed_files
 from sas_tasks import SASTask, SASVariables, SASOperator, SASInit, SASGoal, SASAxiom, SASMutexGroup
 import subprocess
 
 
-def parse_task(task_file, verify_parsed_task=False):
+def parse_task(task_file, verify_parsed_task=False, allow_axioms=False):
+    """Parse the SAS+ task in *task_file*. Action elimination does not
+    support axioms, so we exit if the task has axioms unless
+    *allow_axioms* is set (e.g., for simulating plans)."""
     variables = []
     domains = []
     mutex_groups = []
@@ -38,7 +42,7 @@ def parse_task(task_file, verify_parsed_task=False):
         p1, p2 = get_next_line().split()
         return int(p1), int(p2)
 
-    with open(task_file, 'r') as sas_task:
+    with compressed_files.open_file(task_file, 'r') as sas_task:
         # Read version
         current_line = get_next_line()
         assert(current_line == 'begin_version')
@@ -170,7 +174,7 @@ def parse_task(task_file, verify_parsed_task=False):
 
         # Axioms...
         num_axioms = get_next_int()
-        if num_axioms > 0:
+        if num_axioms > 0 and not allow_axioms:
             sys.exit("Axioms not supported by action elimination module.")
         for _ in range(num_axioms):
             current_line = get_next_line()
@@ -182,13 +186,17 @@ def parse_task(task_file, verify_parsed_task=False):
                 var, val = get_next_int_pair()
                 conditions.append((var, val))
 
-            var, old_val, new_val = sas_task.readline().strip().split()
-            effect = (int(var), int(old_val), int(new_val))
+            # Like SASAxiom, we only store the new value of the effect.
+            var, _, new_val = sas_task.readline().strip().split()
+            effect = (int(var), int(new_val))
 
             current_line = get_next_line()
             assert(current_line == 'end_rule')
 
-            axioms.append(SASAxiom(condition=conditions, effect=effect))
+            # As for the operators, we add the conditions after creating
+            # the axiom to keep their order.
+            axioms.append(SASAxiom(condition=[], effect=effect))
+            axioms[-1].condition = conditions
 
 
     # Verify that the read task is equal to original file
@@ -76,6 +76,9 @@ class SASTask:
         print("metric: %s" % self.metric)
 
     def output(self, stream):
+        # We flush the stream after each section, so that a search
+        # reading from a pipe can parse a section while we write the
+        # next one.
         print("begin_version", file=stream)
         print(SAS_FILE_VERSION, file=stream)
         print("end_version", file=stream)
@@ -83,14 +86,17 @@ class SASTask:
         print(int(self.metric), file=stream)
         print("end_metric", file=stream)
         self.variables.output(stream)
+        stream.flush()
         print(len(self.mutexes), file=stream)
         for mutex in self.mutexes:
             mutex.output(stream)
         self.init.output(stream)
         self.goal.output(stream)
+        stream.flush()
         print(len(self.operators), file=stream)
         for op in self.operators:
             op.output(stream)
+        stream.flush()
         print(len(self.axioms), file=stream)
         for axiom in self.axioms:
             axiom.output(stream)
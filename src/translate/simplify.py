@@ -21,12 +21,19 @@ Despite the name, the method touches more than the set of facts. For
 example, operators that have preconditions on pruned facts are
 removed, too. (See also the docstring of
 filter_unreachable_propositions.)
+
+Removing operators can in turn make more facts unreachable. Calling
+
+    simplify.filter_unreachable_propositions(sas_task, iterate=True)
+
+repeats the simplification until a fixpoint is reached.
 """
 
-from collections import defaultdict
+from array import array
 from itertools import count
 
 import sas_tasks
+import stats
 
 DEBUG = False
 
@@ -43,48 +50,94 @@ class DomainTransitionGraph:
     Attributes:
     - init (int): the initial state value of the DTG variable
     - size (int): the number of values in the domain
-    - arcs (defaultdict: int -> set(int)): the DTG arcs (unlabeled)
+    - offsets (array of int): the arcs leaving value u end in the
+      values targets[offsets[u]:offsets[u + 1]]
+    - targets (array of int): the DTG arcs (unlabeled) in compressed
+      sparse row format, sorted by source and target
+    - any_targets (set(int)): values v that have an arc from every
+      other value, e.g., because an operator sets v without a
+      precondition on the variable. We store these arcs as a flag on
+      the target instead of expanding them, which would be quadratic
+      in the domain size.
 
     There are no transition labels or goal values.
 
-    The intention is that nodes are represented as ints in {1, ...,
-    domain_size}, but this is not enforced.
+    Nodes are represented as ints in {0, ..., domain_size - 1}.
 
     For derived variables, the "fallback value" that is produced by
     negation by failure should be used for `init`, so that it is
     always considered reachable.
+
+    Arcs are collected with add_arc() and add_arc_from_any_value() and
+    converted to the compressed format by finalize(), which has to be
+    called before querying the graph.
     """
 
     def __init__(self, init, size):
         """Create a DTG with no arcs."""
         self.init = init
         self.size = size
-        self.arcs = defaultdict(set)
+        self.offsets = array("i", [0] * (size + 1))
+        self.targets = array("i")
+        self.any_targets = set()
+        # Arcs are encoded as source * size + target until finalize().
+        self._arc_codes = set()
 
     def add_arc(self, u, v):
         """Add an arc from u to v."""
-        self.arcs[u].add(v)
+        self._arc_codes.add(u * self.size + v)
+
+    def add_arc_from_any_value(self, v):
+        """Add arcs from all values other than v to v."""
+        self.any_targets.add(v)
+
+    def finalize(self):
+        """Store the collected arcs in compressed sparse row format."""
+        size = self.size
+        offsets = self.offsets
+        targets = self.targets
+        for code in sorted(self._arc_codes):
+            source, target = divmod(code, size)
+            offsets[source + 1] += 1
+            targets.append(target)
+        for value in range(size):
+            offsets[value + 1] += offsets[value]
+        self._arc_codes = set()
 
     def reachable(self):
         """Return the values reachable from the initial value.
-        Represented as a set(int)."""
+        Represented as a bytearray mask over the domain."""
+        offsets = self.offsets
+        targets = self.targets
+        reached = bytearray(self.size)
+        reached[self.init] = 1
         queue = [self.init]
-        reachable = set(queue)
+        # A value with arcs from every other value is always reachable:
+        # either it is the initial value or there is an arc from the
+        # initial value to it.
+        for value in self.any_targets:
+            if not reached[value]:
+                reached[value] = 1
+                queue.append(value)
         while queue:
             node = queue.pop()
-            new_neighbors = self.arcs.get(node, set()) - reachable
-            reachable |= new_neighbors
-            queue.extend(new_neighbors)
-        return reachable
+            for index in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[index]
+                if not reached[neighbor]:
+                    reached[neighbor] = 1
+                    queue.append(neighbor)
+        return reached
 
     def dump(self):
         """Dump the DTG."""
         print("DTG size:", self.size)
         print("DTG init value:", self.init)
         print("DTG arcs:")
-        for source, destinations in sorted(self.arcs.items()):
-            for destination in sorted(destinations):
-                print("  %d => %d" % (source, destination))
+        for source in range(self.size):
+            for index in range(self.offsets[source], self.offsets[source + 1]):
+                print("  %d => %d" % (source, self.targets[index]))
+        for destination in sorted(self.any_targets):
+            print("  * => %d" % destination)
 
 
 def build_dtgs(task):
@@ -109,11 +162,9 @@ def build_dtgs(task):
         pre_spec may be -1, in which case arcs from every value
         other than post are added."""
         if pre_spec == -1:
-            pre_values = set(range(sizes[var_no])).difference([post])
-        else:
-            pre_values = [pre_spec]
-        for pre in pre_values:
-            dtgs[var_no].add_arc(pre, post)
+            dtgs[var_no].add_arc_from_any_value(post)
+        elif pre_spec != post:
+            dtgs[var_no].add_arc(pre_spec, post)
 
     def get_effective_pre(var_no, conditions, effect_conditions):
         """Return combined information on the conditions on `var_no`
@@ -150,11 +201,16 @@ def build_dtgs(task):
         var_no, val = axiom.effect
         add_arc(var_no, -1, val)
 
+    for dtg in dtgs:
+        dtg.finalize()
     return dtgs
 
 
-always_false = object()
-always_true = object()
+# Sentinel values in VarValueRenaming.new_values. They are negative so
+# that they can never be confused with proper values, and different
+# from -1, which denotes "no precondition" in pre_post entries.
+always_false = -2
+always_true = -3
 
 class Impossible(Exception):
     pass
@@ -167,11 +223,22 @@ class DoesNothing(Exception):
 
 class VarValueRenaming:
     def __init__(self):
-        self.new_var_nos = []   # indexed by old var_no
-        self.new_values = []    # indexed by old var_no and old value
+        # indexed by old var_no; -1 for removed variables
+        self.new_var_nos = array("i")
+        # indexed by value_offsets[old var_no] + old value
+        self.new_values = array("i")
+        # indexed by old var_no, with an additional end marker
+        self.value_offsets = array("i", [0])
         self.new_sizes = []     # indexed by new var_no
         self.new_var_count = 0
         self.num_removed_values = 0
+        self.num_removed_operators = 0
+        self.num_removed_axioms = 0
+
+    def get_new_values(self, var_no):
+        """Return the new values of all old values of var_no."""
+        return self.new_values[
+            self.value_offsets[var_no]:self.value_offsets[var_no + 1]]
 
     def dump(self):
         old_var_count = len(self.new_var_nos)
@@ -179,10 +246,10 @@ class VarValueRenaming:
             old_var_count, self.new_var_count))
         print("number of removed values: %d" % self.num_removed_values)
         print("variable conversions:")
-        for old_var_no, (new_var_no, new_values) in enumerate(
-                zip(self.new_var_nos, self.new_values)):
+        for old_var_no, new_var_no in enumerate(self.new_var_nos):
+            new_values = self.get_new_values(old_var_no)
             old_size = len(new_values)
-            if new_var_no is None:
+            if new_var_no == -1:
                 print("variable %d [size %d] => removed" % (
                     old_var_no, old_size))
             else:
@@ -190,38 +257,40 @@ class VarValueRenaming:
                 print("variable %d [size %d] => %d [size %d]" % (
                     old_var_no, old_size, new_var_no, new_size))
             for old_value, new_value in enumerate(new_values):
-                if new_value is always_false:
+                if new_value == always_false:
                     new_value = "always false"
-                elif new_value is always_true:
+                elif new_value == always_true:
                     new_value = "always true"
                 print("    value %d => %s" % (old_value, new_value))
 
     def register_variable(self, old_domain_size, init_value, new_domain):
-        assert 1 <= len(new_domain) <= old_domain_size
-        assert init_value in new_domain
-        if len(new_domain) == 1:
+        """Register the next variable. new_domain is a mask over the
+        old domain (e.g., a bytearray) that is true for the values
+        that are kept."""
+        new_size = sum(1 for is_kept in new_domain if is_kept)
+        assert len(new_domain) == old_domain_size
+        assert 1 <= new_size <= old_domain_size
+        assert new_domain[init_value]
+        if new_size == 1:
             # Remove this variable completely.
-            new_values_for_var = [always_false] * old_domain_size
-            new_values_for_var[init_value] = always_true
-            self.new_var_nos.append(None)
-            self.new_values.append(new_values_for_var)
+            self.new_var_nos.append(-1)
+            self.new_values.extend([always_false] * old_domain_size)
+            self.new_values[self.value_offsets[-1] + init_value] = always_true
             self.num_removed_values += old_domain_size
         else:
-            new_value_counter = count()
-            new_values_for_var = []
-            for value in range(old_domain_size):
-                if value in new_domain:
-                    new_values_for_var.append(next(new_value_counter))
+            next_value = 0
+            for is_kept in new_domain:
+                if is_kept:
+                    self.new_values.append(next_value)
+                    next_value += 1
                 else:
-                    self.num_removed_values += 1
-                    new_values_for_var.append(always_false)
-            new_size = next(new_value_counter)
-            assert new_size == len(new_domain)
+                    self.new_values.append(always_false)
+            self.num_removed_values += old_domain_size - new_size
 
             self.new_var_nos.append(self.new_var_count)
-            self.new_values.append(new_values_for_var)
             self.new_sizes.append(new_size)
             self.new_var_count += 1
+        self.value_offsets.append(len(self.new_values))
 
     def apply_to_task(self, task):
         if DEBUG:
@@ -237,7 +306,7 @@ class VarValueRenaming:
         variables.ranges = self.new_sizes
         new_axiom_layers = [None] * self.new_var_count
         for old_no, new_no in enumerate(self.new_var_nos):
-            if new_no is not None:
+            if new_no != -1:
                 new_axiom_layers[new_no] = variables.axiom_layers[old_no]
         assert None not in new_axiom_layers
         variables.axiom_layers = new_axiom_layers
@@ -248,10 +317,10 @@ class VarValueRenaming:
         for var_no, values in enumerate(value_names):
             for value, value_name in enumerate(values):
                 new_var_no, new_value = self.translate_pair((var_no, value))
-                if new_value is always_true:
+                if new_value == always_true:
                     if DEBUG:
                         print("Removed true proposition: %s" % value_name)
-                elif new_value is always_false:
+                elif new_value == always_false:
                     if DEBUG:
                         print("Removed false proposition: %s" % value_name)
                 else:
@@ -265,8 +334,8 @@ class VarValueRenaming:
             new_facts = []
             for var, val in mutex.facts:
                 new_var_no, new_value = self.translate_pair((var, val))
-                if (new_value is not always_true and
-                    new_value is not always_false):
+                if (new_value != always_true and
+                    new_value != always_false):
                     new_facts.append((new_var_no, new_value))
             if len(new_facts) >= 2:
                 mutex.facts = new_facts
@@ -307,6 +376,8 @@ class VarValueRenaming:
             else:
                 new_operators.append(new_op)
         print("%d operators removed" % num_removed)
+        stats.increment("translator_operators_removed", num_removed)
+        self.num_removed_operators = num_removed
         operators[:] = new_operators
 
     def apply_to_axioms(self, axioms):
@@ -323,6 +394,8 @@ class VarValueRenaming:
             else:
                 new_axioms.append(axiom)
         print("%d axioms removed" % num_removed)
+        stats.increment("translator_axioms_removed", num_removed)
+        self.num_removed_axioms = num_removed
         axioms[:] = new_axioms
 
     def translate_operator(self, op):
@@ -387,8 +460,8 @@ class VarValueRenaming:
         new_var, new_value = self.translate_pair(axiom.effect)
         # If the new_value is always false, then the condition must
         # have been impossible.
-        assert new_value is not always_false
-        if new_value is always_true:
+        assert new_value != always_false
+        if new_value == always_true:
             raise DoesNothing
         axiom.effect = new_var, new_value
 
@@ -419,14 +492,14 @@ class VarValueRenaming:
         var_no, pre, post, cond = pre_post_entry
         new_var_no, new_post = self.translate_pair((var_no, post))
 
-        if new_post is always_true:
+        if new_post == always_true:
             return None
 
         if pre == -1:
             new_pre = -1
         else:
             _, new_pre = self.translate_pair((var_no, pre))
-        assert new_pre is not always_false, (
+        assert new_pre != always_false, (
             "This function should only be called for operators "
             "whose applicability conditions are deemed possible.")
 
@@ -447,12 +520,12 @@ class VarValueRenaming:
                 # the applicability conditions.
                 return None
 
-        assert new_post is not always_false, (
+        assert new_post != always_false, (
             "if we survived so far, this effect can trigger "
             "(as far as our analysis can determine this), "
             "and then new_post cannot be always_false")
 
-        assert new_pre is not always_true, (
+        assert new_pre != always_true, (
             "if this pre_post changes the value and can fire, "
             "new_pre cannot be always_true")
 
@@ -461,7 +534,7 @@ class VarValueRenaming:
     def translate_pair(self, fact_pair):
         (var_no, value) = fact_pair
         new_var_no = self.new_var_nos[var_no]
-        new_value = self.new_values[var_no][value]
+        new_value = self.new_values[self.value_offsets[var_no] + value]
         return new_var_no, new_value
 
     def convert_pairs(self, pairs):
@@ -469,10 +542,10 @@ class VarValueRenaming:
         new_pairs = []
         for pair in pairs:
             new_var_no, new_value = self.translate_pair(pair)
-            if new_value is always_false:
+            if new_value == always_false:
                 raise Impossible
-            elif new_value is not always_true:
-                assert new_var_no is not None
+            elif new_value != always_true:
+                assert new_var_no != -1
                 new_pairs.append((new_var_no, new_value))
         pairs[:] = new_pairs
 
@@ -483,7 +556,7 @@ def build_renaming(dtgs):
     return renaming
 
 
-def filter_unreachable_propositions(sas_task):
+def filter_unreachable_propositions(sas_task, iterate=False):
     """We remove unreachable propositions and then prune variables
     with only one value.
 
@@ -505,16 +578,38 @@ def filter_unreachable_propositions(sas_task):
       that set them have inconsistent preconditions.
 
       Example: on(crate0, crate0) in depots-01.
+
+    If `iterate` is true, we repeat the simplification as long as it
+    removes propositions: operators that are pruned because their
+    preconditions are unreachable, or effects that are pruned because
+    their conditions are unreachable, may make further propositions
+    unreachable.
     """
 
     if DEBUG:
         sas_task.validate()
-    dtgs = build_dtgs(sas_task)
-    renaming = build_renaming(dtgs)
-    # apply_to_task may raise Impossible if the goal is detected as
-    # unreachable or TriviallySolvable if it has no goal. We let the
-    # exceptions propagate to the caller.
-    renaming.apply_to_task(sas_task)
-    print("%d propositions removed" % renaming.num_removed_values)
-    if DEBUG:
-        sas_task.validate()
+    for round_no in count(1):
+        dtgs = build_dtgs(sas_task)
+        renaming = build_renaming(dtgs)
+        if round_no > 1 and renaming.num_removed_values == 0:
+            # The previous round already removed all operators and
+            # effects that became useless, so we reached a fixpoint.
+            break
+        # apply_to_task may raise Impossible if the goal is detected as
+        # unreachable or TriviallySolvable if it has no goal. We let the
+        # exceptions propagate to the caller.
+        renaming.apply_to_task(sas_task)
+        stats.increment("translator_propositions_removed",
+                        renaming.num_removed_values)
+        stats.set_value("translator_simplification_rounds", round_no)
+        if iterate:
+            print("Simplification round %d: %d propositions and "
+                  "%d operators removed" % (
+                      round_no, renaming.num_removed_values,
+                      renaming.num_removed_operators))
+        else:
+            print("%d propositions removed" % renaming.num_removed_values)
+        if DEBUG:
+            sas_task.validate()
+        if not iterate:
+            break
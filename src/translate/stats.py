@@ -0,0 +1,55 @@
+"""Registry for machine-readable translator statistics. Usage:
+
+    stats.set_value("translator_variables", 42)
+    stats.increment("translator_operators_removed", num_removed)
+    stats.add_time("Parsing", cpu_time, wall_clock_time)
+
+All phases of the translator write into a single module-level
+registry, which the translator dumps as one JSON document if
+--statistics-file is given. The registry complements the
+human-readable log and does not replace it.
+"""
+
+import json
+
+
+_values = {}
+_timings = {}
+
+
+def set_value(key, value):
+    _values[key] = value
+
+
+def increment(key, amount=1):
+    _values[key] = _values.get(key, 0) + amount
+
+
+def get_value(key, default=None):
+    return _values.get(key, default)
+
+
+def add_time(phase, cpu_time, wall_clock_time):
+    """Accumulate the time spent in *phase*. Phases that are entered
+    several times (e.g. while simplifying the task repeatedly) sum up
+    their times."""
+    timing = _timings.setdefault(phase, {"cpu_time": 0.0, "wall_clock_time": 0.0})
+    timing["cpu_time"] += cpu_time
+    timing["wall_clock_time"] += wall_clock_time
+
+
+def clear():
+    _values.clear()
+    _timings.clear()
+
+
+def as_dict():
+    result = dict(_values)
+    result["timings"] = {phase: dict(timing) for phase, timing in _timings.items()}
+    return result
+
+
+def dump_json(path):
+    with open(path, "w") as stats_file:
+        json.dump(as_dict(), stats_file, indent=2, sort_keys=True)
+        stats_file.write("\n")
@@ -0,0 +1,212 @@
+#! /usr/bin/env python3
+
+"""
+Deorder the steps of SAS+ plans into partial-order plans.
+
+Most plans contain steps that could be executed in any order or in
+parallel. Step deordering keeps only the orderings between single steps
+that are needed for the plan to stay valid:
+
+- producer-consumer: a step that reads a variable comes after the step
+  that last changed the value of the variable before it,
+- consumer-threat: a step that writes a variable comes after all steps
+  that read the previous value of the variable, and
+- producer-threat: a step that changes the value of a variable comes
+  after the steps that wrote the previous value.
+
+Steps that write the value that the variable already has (e.g., two
+steps that both set it to the same value) do not change the value, so
+they need no order among each other. They only come after the steps
+that the change to this value comes after.
+
+Together, these orderings preserve the sequence of values that each step
+reads, so every linearization of the partial order is a valid plan with
+the same cost. Preconditions, prevail conditions and effect conditions
+are reads; all effects are writes. A conditional effect that writes a
+different value makes the value unknown, so the next write always
+changes it. Reading a derived variable reads all variables that its
+axioms depend on.
+
+We only deorder plans and do not reorder them. Orderings are only
+dropped between single steps, not between blocks of steps.
+
+The makespan of the partial-order plan is the length of its critical
+path, where each step takes as long as it costs (1 for tasks without
+action costs). The slack of a step is how much later than its earliest
+start time it can start without increasing the makespan. Steps with
+slack 0 lie on a critical path. Windowed action elimination solves the
+windows with the most steps off the critical path first (see
+create_window_tasks() in action_elim.py).
+
+Usage:
+    ./step_deordering.py <output.sas> <sas_plan>
+"""
+
+import sys
+
+from plan_parser import parse_plan
+from sas_parser import parse_task
+
+
+class PartialOrderPlan:
+    def __init__(self, plan, durations, predecessors):
+        """*predecessors[i]* holds the steps that step *i* must directly
+        follow (the transitive reduction of the ordering constraints)."""
+        self.plan = plan
+        self.durations = durations
+        self.predecessors = predecessors
+
+    def get_num_orderings(self):
+        return sum(len(preds) for preds in self.predecessors)
+
+    def get_earliest_start_times(self):
+        # Predecessors always have lower indices than their successors.
+        starts = []
+        for step, preds in enumerate(self.predecessors):
+            starts.append(max((starts[pred] + self.durations[pred] for pred in preds), default=0))
+        return starts
+
+    def get_makespan(self):
+        starts = self.get_earliest_start_times()
+        return max((start + duration for start, duration in zip(starts, self.durations)), default=0)
+
+    def get_slack(self):
+        """Return the slack of each step."""
+        starts = self.get_earliest_start_times()
+        makespan = self.get_makespan()
+        latest_ends = [makespan] * len(self.plan)
+        for step in range(len(self.plan) - 1, -1, -1):
+            latest_start = latest_ends[step] - self.durations[step]
+            for pred in self.predecessors[step]:
+                latest_ends[pred] = min(latest_ends[pred], latest_start)
+        return [latest_end - duration - start for latest_end, duration, start in zip(
+            latest_ends, self.durations, starts)]
+
+
+def get_derived_variable_dependencies(sas_task):
+    """Map each derived variable to the non-derived variables that its
+    value depends on."""
+    axiom_layers = sas_task.variables.axiom_layers
+    direct = {}
+    for axiom in sas_task.axioms:
+        var, _ = axiom.effect
+        direct.setdefault(var, set()).update(cond_var for cond_var, _ in axiom.condition)
+    dependencies = {}
+
+    def collect(var, visited):
+        for cond_var in direct.get(var, ()):
+            if cond_var in visited:
+                continue
+            visited.add(cond_var)
+            if axiom_layers[cond_var] == -1:
+                dependencies[var].add(cond_var)
+            else:
+                collect(cond_var, visited)
+
+    for var, layer in enumerate(axiom_layers):
+        if layer != -1:
+            dependencies[var] = set()
+            collect(var, {var})
+    return dependencies
+
+
+def get_read_and_written_variables(op, derived_dependencies):
+    """Return the variables that *op* reads and a dictionary that maps
+    the variables that it writes to the written value and whether the
+    effect is conditional."""
+    reads = {var for var, _ in op.prevail}
+    writes = {}
+    for var, pre, post, cond in op.pre_post:
+        if pre != -1:
+            reads.add(var)
+        reads.update(cond_var for cond_var, _ in cond)
+        writes[var] = (post, bool(cond))
+    for var in list(reads):
+        if var in derived_dependencies:
+            reads.discard(var)
+            reads.update(derived_dependencies[var])
+    return reads, writes
+
+
+def _transitive_reduction(orderings):
+    """Return the transitive reduction of the ordering constraints
+    *orderings* (the sets of predecessors of each step, which all have
+    lower indices)."""
+    # ancestors[i] is a bit set of all steps that step i must follow.
+    ancestors = []
+    reduced = []
+    for step, preds in enumerate(orderings):
+        step_ancestors = 0
+        direct = []
+        # A predecessor is redundant if a later predecessor follows it.
+        for pred in sorted(preds, reverse=True):
+            if not (step_ancestors >> pred) & 1:
+                direct.append(pred)
+                step_ancestors |= ancestors[pred] | (1 << pred)
+        ancestors.append(step_ancestors)
+        reduced.append(sorted(direct))
+    return reduced
+
+
+def deorder_plan(sas_task, plan, operator_name_to_index):
+    """Return the partial-order plan for *plan* (a list of operator
+    names)."""
+    derived_dependencies = get_derived_variable_dependencies(sas_task)
+    # For each variable, we store the step that changed it to its
+    # current value (if any) and the value (None if it is unknown), the
+    # steps that wrote and read the current value, and the steps that
+    # the change to the current value comes after.
+    changer = {}
+    value = dict(enumerate(sas_task.init.values))
+    writers = {var: [] for var in value}
+    readers = {}
+    changer_preds = {}
+    orderings = []
+    durations = []
+    for step, name in enumerate(plan):
+        op = sas_task.operators[operator_name_to_index[name]]
+        durations.append(op.cost if sas_task.metric else 1)
+        reads, writes = get_read_and_written_variables(op, derived_dependencies)
+        preds = set()
+        for var in reads:
+            if var in changer:
+                preds.add(changer[var])
+        for var, (new_value, _) in writes.items():
+            if new_value == value[var]:
+                preds.update(changer_preds.get(var, ()))
+            else:
+                preds.update(writers.get(var, ()))
+                preds.update(readers.get(var, ()))
+        preds.discard(step)
+        orderings.append(preds)
+        for var, (new_value, conditional) in writes.items():
+            if new_value == value[var]:
+                writers[var].append(step)
+            else:
+                changer_preds[var] = writers[var] + readers.get(var, [])
+                changer[var] = step
+                value[var] = None if conditional else new_value
+                writers[var] = [step]
+                readers[var] = []
+        for var in reads:
+            readers.setdefault(var, []).append(step)
+    return PartialOrderPlan(plan, durations, _transitive_reduction(orderings))
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    task, operator_name_to_index = parse_task(sys.argv[1], allow_axioms=True)
+    plan, _ = parse_plan(sys.argv[2])
+    po_plan = deorder_plan(task, plan, operator_name_to_index)
+    starts = po_plan.get_earliest_start_times()
+    for step, (name, start, slack, preds) in enumerate(zip(
+            plan, starts, po_plan.get_slack(), po_plan.predecessors)):
+        print(f"{step}: {name} start {start} slack {slack} after {preds}")
+    print(f"Ordering constraints: {po_plan.get_num_orderings()} "
+          f"(total order: {max(len(plan) - 1, 0)})")
+    print(f"Makespan: {po_plan.get_makespan()} (plan cost {sum(po_plan.durations)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+
+import pytest
+
+from action_elim import (
+    MACRO_OP_STRING, MacroOperatorBuilder, SEARCH_UNSOLVED_INCOMPLETE, WINDOWS_FILE,
+    create_action_elim_task, create_window_tasks, find_relevant_facts, get_multi_plan_sequence,
+    get_windows, iterate_action_elimination, parse_action_elim_plan, process_axioms,
+    prune_irrelevant_domain_values, select_planner_configuration)
+from greedy_action_elim import greedy_action_elimination
+from plan_simulator import CompiledOperator
+from sas_tasks import SASAxiom, SASGoal, SASInit, SASOperator, SASTask, SASVariables
+
+
+def test_windows():
+    assert get_windows(10, 4, 0) == [(0, 4), (4, 8), (8, 10)]
+    assert get_windows(10, 4, 2) == [(0, 2), (2, 6), (6, 10)]
+    assert get_windows(3, 4, 0) == [(0, 3)]
+
+
+def _get_move_task():
+    variables = SASVariables(
+        ranges=[2, 2], axiom_layers=[-1, -1],
+        value_names=[["Atom at(a)", "Atom at(b)"],
+                     ["Atom done()", "NegatedAtom done()"]])
+    operators = [
+        SASOperator("(move a b)", [], [(0, 0, 1, [])], 1),
+        SASOperator("(move b a)", [], [(0, 1, 0, [])], 1),
+        SASOperator("(finish)", [(0, 1)], [(1, 1, 0, [])], 1),
+    ]
+    task = SASTask(variables, [], SASInit([0, 1]), SASGoal([(1, 0)]),
+                   operators, [], True)
+    operator_name_to_index = {op.name: index for index, op in enumerate(task.operators)}
+    return task, operator_name_to_index
+
+
+def test_multi_plan_sequence():
+    plans = [["(move a b)", "(move b a)", "(move a b)", "(finish)"],
+             ["(move a b)", "(finish)"],
+             ["(move a b)", "(finish)"]]
+    assert get_multi_plan_sequence(plans, [4, 2, 2]) == [
+        "(move a b)", "(finish)", "(move a b)", "(move b a)", "(move a b)", "(finish)"]
+
+
+def test_greedy_action_elimination():
+    task, operator_name_to_index = _get_move_task()
+    plan = ["(move a b)", "(move b a)", "(move a b)", "(finish)"]
+    assert greedy_action_elimination(task, plan, operator_name_to_index) == (
+        ["(move a b)", "(finish)"], 2)
+
+
+def test_task_info(tmp_path):
+    task, operator_name_to_index = _get_move_task()
+    plan = ["(move a b)", "(move b a)", "(move a b)", "(finish)"]
+    task_info = {}
+    create_action_elim_task(
+        task, plan, operator_name_to_index, True, True, "MR", False, False, False,
+        False, False, directory=str(tmp_path), task_info=task_info)
+    # Only (finish) is trivially necessary, so the other steps can be skipped.
+    assert task_info == {
+        "operators": 7, "variables": 3, "plan_length": 4, "triv_nec": 1,
+        "skip_actions": 3, "plan_cost": 4, "conditional_effects": False,
+        "axioms": False, "configuration": "optimal",
+        "search_options": ["--search", "astar(lmcut())"]}
+
+
+@pytest.mark.parametrize("open_steps, operators, conditional_effects, expected", [
+    (10, 100, False, ("optimal", ["--search", "astar(lmcut())"])),
+    (10, 100, True, ("optimal", ["--search", "astar(hmax())"])),
+    (500, 100, False, ("bounded-suboptimal", ["--search", "eager_wastar([lmcut()], w=2)"])),
+    (10, 10000, True, ("bounded-suboptimal", ["--search", "eager_wastar([hmax()], w=2)"])),
+    (5000, 100, False, ("greedy", ["--search", "eager_greedy([ff()])"])),
+])
+def test_select_planner_configuration(open_steps, operators, conditional_effects, expected):
+    task_info = {
+        "operators": operators, "variables": 10, "plan_length": open_steps + 5,
+        "triv_nec": 5, "conditional_effects": conditional_effects, "axioms": False}
+    assert select_planner_configuration(task_info) == expected
+
+
+def test_multi_plan_task_is_bounded_by_cheapest_plan(tmp_path):
+    task, operator_name_to_index = _get_move_task()
+    plans = [["(move a b)", "(move b a)", "(move a b)", "(finish)"],
+             ["(move a b)", "(finish)"]]
+    plan = get_multi_plan_sequence(plans, [4, 2])
+    task_info = {}
+    create_action_elim_task(
+        task, plan, operator_name_to_index, True, False, "MR", False, False, False,
+        False, False, directory=str(tmp_path), task_info=task_info, bound_plan_length=2)
+    # The sequence has cost 6, but only plans cheaper than 2 are useful.
+    assert task_info["plan_length"] == 6
+    assert task_info["plan_cost"] == 2
+
+
+def test_prune_irrelevant_domain_values():
+    task, operator_name_to_index = _get_move_task()
+    # Nothing reads the light, so its variable is dropped.
+    task.variables.ranges.append(2)
+    task.variables.axiom_layers.append(-1)
+    task.variables.value_names.append(["Atom lit()", "NegatedAtom lit()"])
+    task.init.values.append(1)
+    task.operators.append(SASOperator("(switch)", [], [(2, -1, 0, [])], 1))
+    operator_name_to_index["(switch)"] = len(task.operators) - 1
+    plan = ["(move a b)", "(switch)", "(finish)"]
+    operators = [task.operators[operator_name_to_index[name]] for name in plan]
+    relevant_facts = find_relevant_facts(task, operators, operator_name_to_index)
+    assert relevant_facts == {0: {0, 1}, 1: {0, 1}}
+    variables, vars_vals_map = prune_irrelevant_domain_values(
+        task.variables, relevant_facts, operators, True)
+    assert variables.ranges == [3, 3, 4]
+    assert variables.value_names[0] == ["Atom at(a)", "Atom at(b)", "Atom irrelevant-fact()"]
+    assert vars_vals_map == {0: (0, {0: 0, 1: 1}), 1: (1, {0: 0, 1: 1})}
+
+
+def test_process_axioms():
+    # The derived variable 1 holds at c. Nothing reads at(b).
+    variables = SASVariables(
+        ranges=[3, 2], axiom_layers=[-1, 0],
+        value_names=[["Atom at(a)", "Atom at(b)", "Atom at(c)"],
+                     ["NegatedAtom arrived()", "Atom arrived()"]])
+    operators = [SASOperator("(move a c)", [], [(0, 0, 2, [])], 1)]
+    axioms = [SASAxiom([(0, 2)], (1, 1))]
+    task = SASTask(variables, [], SASInit([0, 0]), SASGoal([(1, 1)]), operators, axioms, True)
+    relevant_facts = find_relevant_facts(task, operators, {"(move a c)": 0})
+    assert relevant_facts == {0: {0, 2}, 1: {0, 1}}
+    new_variables, vars_vals_map = prune_irrelevant_domain_values(
+        variables, relevant_facts, operators, False)
+    new_axioms = process_axioms(axioms, new_variables, vars_vals_map)
+    assert [(axiom.condition, axiom.effect) for axiom in new_axioms] == [([(0, 1)], (1, 1))]
+
+
+def test_window_tasks(tmp_path):
+    task, operator_name_to_index = _get_move_task()
+    plan = ["(move a b)", "(move b a)", "(move a b)", "(finish)"]
+    options = argparse.Namespace(
+        subsequence=True, enhanced=False, reduction="MR", add_pos_to_goal=False,
+        enhanced_fix_point=False, enhanced_unnecessary=False,
+        macro_operators=False, scale_costs=False)
+    create_window_tasks(task, plan, operator_name_to_index, 2, 0, str(tmp_path), options)
+
+    with open(os.path.join(tmp_path, WINDOWS_FILE)) as windows_file:
+        info = json.load(windows_file)
+    assert info["plan"] == plan
+    assert info["costs"] == [1, 1, 1, 1]
+    assert [(window["start"], window["end"]) for window in info["windows"]] == [(0, 2), (2, 4)]
+    # The first window ends in its initial state, so it can be dropped.
+    assert info["windows"][0]["task"] is None
+    assert os.path.exists(info["windows"][1]["task"])
+    assert info["windows"][0]["task_info"] is None
+    assert info["windows"][1]["task_info"]["plan_cost"] == 2
+    assert info["windows"][1]["task_info"]["configuration"] == "optimal"
+
+
+def test_fixpoint_searches_are_bounded(tmp_path):
+    # The search stores its bound and options and finds no cheaper plan.
+    search = tmp_path / "search"
+    search.write_text(
+        "#! %s\n"
+        "import shutil, sys\n"
+        "shutil.copy(sys.argv[sys.argv.index('--internal-bound-file') + 1], %r)\n"
+        "open(%r, 'w').write(sys.argv[-1])\n"
+        "sys.exit(%d)\n" % (sys.executable, str(tmp_path / "bound"), str(tmp_path / "options"),
+                             SEARCH_UNSOLVED_INCOMPLETE))
+    search.chmod(0o755)
+    task, operator_name_to_index = _get_move_task()
+    plan = ["(move a b)", "(move b a)", "(move a b)", "(finish)"]
+    options = argparse.Namespace(
+        subsequence=True, enhanced=False, reduction="MR", add_pos_to_goal=False,
+        enhanced_fix_point=False, enhanced_unnecessary=False,
+        macro_operators=False, scale_costs=False, directory=str(tmp_path),
+        file="reformulation.sas")
+    assert iterate_action_elimination(
+        task, plan, operator_name_to_index, options,
+        [str(search), "--search", "astar(hmax())"], None) == (plan, 4)
+    assert (tmp_path / "bound").read_text().split()[0] == "4"
+    assert (tmp_path / "options").read_text() == "astar(hmax())"
+    # Without search options, each round chooses them by the task size.
+    assert iterate_action_elimination(
+        task, plan, operator_name_to_index, options, [str(search)], None,
+        auto_configuration=True) == (plan, 4)
+    assert (tmp_path / "options").read_text() == "astar(lmcut())"
+
+
+def test_window_tasks_count_non_critical_steps(tmp_path):
+    # Waiting in room a does not lie on the critical path, which
+    # switches on the light in room b (cost 2) before leaving.
+    variables = SASVariables(
+        ranges=[2, 2, 2], axiom_layers=[-1, -1, -1],
+        value_names=[["Atom on(a)", "NegatedAtom on(a)"],
+                     ["Atom on(b)", "NegatedAtom on(b)"],
+                     ["Atom left()", "NegatedAtom left()"]])
+    operators = [
+        SASOperator("(switch a)", [], [(0, 1, 0, [])], 1),
+        SASOperator("(wait a)", [(0, 0)], [], 1),
+        SASOperator("(switch b)", [], [(1, 1, 0, [])], 2),
+        SASOperator("(leave)", [(0, 0), (1, 0)], [(2, 1, 0, [])], 1),
+    ]
+    task = SASTask(variables, [], SASInit([1, 1, 1]), SASGoal([(2, 0)]),
+                   operators, [], True)
+    operator_name_to_index = {op.name: index for index, op in enumerate(task.operators)}
+    plan = [op.name for op in operators]
+    options = argparse.Namespace(
+        subsequence=True, enhanced=False, reduction="MR", add_pos_to_goal=False,
+        enhanced_fix_point=False, enhanced_unnecessary=False,
+        macro_operators=False, scale_costs=False)
+    create_window_tasks(task, plan, operator_name_to_index, 2, 0, str(tmp_path), options)
+
+    with open(os.path.join(tmp_path, WINDOWS_FILE)) as windows_file:
+        info = json.load(windows_file)
+    assert [window["non_critical_steps"] for window in info["windows"]] == [2, 0]
+
+
+def test_parse_action_elim_plan(tmp_path):
+    plan_file = tmp_path / "plan"
+    plan_file.write_text(
+        "(move a b)\n"
+        "(skip-action plan-pos-1)\n"
+        f"({MACRO_OP_STRING}move b a{MACRO_OP_STRING}finish)\n"
+        "; cost = 3 (unit cost)\n")
+    assert parse_action_elim_plan(str(plan_file)) == [
+        "(move a b)", "(move b a)", "(finish)"]
+
+
+def _compose(operators):
+    builder = MacroOperatorBuilder(use_op_cost=True)
+    for op in operators:
+        if not builder.add(op):
+            return None
+    return builder.get_operator()
+
+
+def test_macro_operators_with_conditional_effects():
+    operators = [
+        SASOperator("(a)", [], [(0, 0, 1, [])], 1),
+        SASOperator("(b)", [(3, 1)], [(1, -1, 1, [(0, 1), (2, 0)]), (2, -1, 1, [(0, 0)])], 2),
+        SASOperator("(c)", [], [(2, -1, 0, [(3, 1)]), (3, 1, 0, [])], 3),
+    ]
+    macro = _compose(operators)
+    assert macro.name == f"({MACRO_OP_STRING}a{MACRO_OP_STRING}b{MACRO_OP_STRING}c)"
+    assert macro.cost == 6
+    # The effect on variable 2 of (b) never fires, the one of (c) always does.
+    assert macro.prevail == []
+    assert macro.pre_post == [
+        (0, 0, 1, []), (1, -1, 1, [(2, 0)]), (2, -1, 0, []), (3, 1, 0, [])]
+
+    _assert_equivalent(macro, operators)
+
+
+def _assert_equivalent(macro, operators):
+    # The macro is applicable exactly in the states where the operator
+    # sequence is and has the same result there.
+    compiled_macro = CompiledOperator(macro, True)
+    compiled_operators = [CompiledOperator(op, True) for op in operators]
+    for values in itertools.product([0, 1], repeat=4):
+        state = list(values)
+        expected = state[:]
+        sequence_applicable = True
+        for op in compiled_operators:
+            if not op.is_applicable(expected):
+                sequence_applicable = False
+                break
+            op.apply(expected)
+        assert compiled_macro.is_applicable(state) == sequence_applicable
+        if sequence_applicable:
+            compiled_macro.apply(state)
+            assert state == expected
+
+
+def test_macro_operators_keep_preconditions_of_dropped_effects():
+    # The conditional effect of (a) never fires because (b) requires
+    # that its condition is false, but (a) still requires variable 0 = 0.
+    operators = [
+        SASOperator("(a)", [], [(0, 0, 1, [(1, 1)])], 1),
+        SASOperator("(b)", [(1, 0)], [(2, -1, 1, [])], 1),
+    ]
+    macro = _compose(operators)
+    assert macro.prevail == [(0, 0), (1, 0)]
+    assert macro.pre_post == [(2, -1, 1, [])]
+    _assert_equivalent(macro, operators)
+
+
+def test_macro_operators_reject_uncertain_values():
+    conditional = SASOperator("(a)", [], [(0, -1, 1, [(1, 0)])], 1)
+    # Reads variable 0, which the conditional effect may have changed.
+    reader = SASOperator("(b)", [(0, 1)], [(2, 0, 1, [])], 1)
+    assert _compose([conditional, reader]) is None
+    # Overwrites it only under a condition.
+    overwriter = SASOperator("(c)", [], [(0, -1, 0, [(2, 1)])], 1)
+    assert _compose([SASOperator("(d)", [], [(0, -1, 1, [])], 1), overwriter]) is None
+    # Unconditional overwrites are fine.
+    macro = _compose([conditional, SASOperator("(e)", [], [(0, -1, 0, [])], 1)])
+    assert macro.pre_post == [(0, -1, 0, [])]
@@ -0,0 +1,69 @@
+import itertools
+
+import pddl
+from axiom_rules import SubsetTrie, compute_simplified_axioms, negate
+
+
+def atom(name):
+    return pddl.Atom(name, [])
+
+
+def axiom(condition, effect="z"):
+    return pddl.PropositionalAxiom("ax", [atom(c) for c in condition], atom(effect))
+
+
+def conditions(axioms):
+    return [[literal.predicate for literal in axiom.condition] for axiom in axioms]
+
+
+def test_subset_trie():
+    trie = SubsetTrie()
+    trie.insert([atom("a"), atom("c")])
+    assert trie.contains_subset_of([atom("a"), atom("b"), atom("c")])
+    assert not trie.contains_subset_of([atom("a"), atom("b")])
+    assert not trie.contains_subset_of([])
+    trie.insert([])
+    assert trie.contains_subset_of([])
+
+
+def test_simplify_removes_dominated_and_duplicate_axioms():
+    axioms = [axiom("abc"), axiom("ba"), axiom("ab"), axiom("cd"),
+              axiom("de"), axiom("c")]
+    assert conditions(compute_simplified_axioms(axioms)) == [
+        ["a", "b"], ["d", "e"], ["c"]]
+
+
+def test_simplify_removes_axioms_implying_their_own_effect():
+    axioms = [axiom("az"), axiom("b")]
+    assert conditions(compute_simplified_axioms(axioms)) == [["b"]]
+
+
+def test_simplify_empty_condition_dominates_everything():
+    axioms = [axiom("ab"), axiom(""), axiom("c")]
+    assert conditions(compute_simplified_axioms(axioms)) == [[]]
+
+
+def brute_force_negation(axioms):
+    """Return the minimal sets of negated literals that falsify all
+    conditions."""
+    choices = [axiom.condition for axiom in axioms]
+    candidates = set()
+    for selection in itertools.product(*choices):
+        candidates.add(frozenset(literal.negate() for literal in selection))
+    return {candidate for candidate in candidates
+            if not any(other < candidate for other in candidates)}
+
+
+def test_negate_matches_brute_force():
+    axioms = [axiom("ab"), axiom("bc"), axiom("cfe"), axiom("ae")]
+    expected = brute_force_negation(axioms)
+    result = negate([a.clone() for a in axioms])
+    assert {frozenset(a.condition) for a in result} == expected
+    assert len(result) == len(expected)
+    assert all(a.effect == atom("z").negate() for a in result)
+
+
+def test_negate_exceeding_budget():
+    axioms = [axiom("ab"), axiom("bc"), axiom("ce"), axiom("ae")]
+    assert negate([a.clone() for a in axioms], budget=2) is None
+    assert negate([a.clone() for a in axioms], budget=100) is not None
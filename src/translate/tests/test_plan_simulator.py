@@ -0,0 +1,70 @@
+import pytest
+
+from plan_simulator import InvalidPlan, PlanSimulator
+from sas_parser import parse_task
+from sas_tasks import SASAxiom, SASGoal, SASInit, SASOperator, SASTask, SASVariables
+
+
+def _get_task():
+    # Moving from a to b switches on the light. The derived variable 2
+    # holds if the light is on at b, which finishing requires.
+    variables = SASVariables(
+        ranges=[2, 2, 2, 2], axiom_layers=[-1, -1, 0, -1],
+        value_names=[["Atom at(a)", "Atom at(b)"],
+                     ["Atom on()", "NegatedAtom on()"],
+                     ["NegatedAtom lit()", "Atom lit()"],
+                     ["Atom done()", "NegatedAtom done()"]])
+    operators = [
+        SASOperator("(move a b)", [], [(0, 0, 1, []), (1, -1, 0, [(0, 0)])], 1),
+        SASOperator("(move b a)", [], [(0, 1, 0, [])], 1),
+        SASOperator("(finish)", [(2, 1)], [(3, 1, 0, [])], 3),
+    ]
+    axioms = [SASAxiom([(0, 1), (1, 0)], (2, 1))]
+    task = SASTask(variables, [], SASInit([0, 1, 0, 1]), SASGoal([(3, 0)]),
+                   operators, axioms, True)
+    operator_name_to_index = {op.name: index for index, op in enumerate(task.operators)}
+    return task, operator_name_to_index
+
+
+def _get_simulator():
+    return PlanSimulator(*_get_task())
+
+
+def test_trajectory():
+    simulator = _get_simulator()
+    trajectory = simulator.simulate(["(move a b)", "(move b a)"])
+    assert [list(state) for state in trajectory] == [
+        [0, 1, 0, 1], [1, 0, 1, 1], [0, 0, 0, 1]]
+
+
+def test_validate():
+    simulator = _get_simulator()
+    assert simulator.validate(["(move a b)", "(finish)"]) == 4
+    assert simulator.validate(["(move a b)", "(move b a)", "(move a b)", "(finish)"]) == 6
+
+
+@pytest.mark.parametrize("plan, step", [
+    (["(finish)"], 0),
+    (["(move a b)", "(move b a)", "(finish)"], 2),
+    (["(move a b)"], 1),
+    (["(move a b)", "(jump)"], 1),
+])
+def test_invalid_plans(plan, step):
+    with pytest.raises(InvalidPlan) as excinfo:
+        _get_simulator().validate(plan)
+    assert excinfo.value.step == step
+
+
+def test_parse_task_with_axioms(tmp_path):
+    task, _ = _get_task()
+    task_file = str(tmp_path / "output.sas")
+    with open(task_file, "w") as output_file:
+        task.output(output_file)
+    with pytest.raises(SystemExit):
+        parse_task(task_file)
+    parsed_task, operator_name_to_index = parse_task(
+        task_file, verify_parsed_task=True, allow_axioms=True)
+    assert [(axiom.condition, axiom.effect) for axiom in parsed_task.axioms] == [
+        ([(0, 1), (1, 0)], (2, 1))]
+    simulator = PlanSimulator(parsed_task, operator_name_to_index)
+    assert simulator.validate(["(move a b)", "(finish)"]) == 4
@@ -0,0 +1,64 @@
+from sas_tasks import SASGoal, SASInit, SASOperator, SASTask, SASVariables
+from simplify import (DomainTransitionGraph, VarValueRenaming, always_false,
+                      always_true, filter_unreachable_propositions)
+
+
+def test_dtg_reachability():
+    dtg = DomainTransitionGraph(init=0, size=5)
+    dtg.add_arc(0, 1)
+    dtg.add_arc(1, 2)
+    dtg.add_arc(3, 4)
+    dtg.add_arc_from_any_value(3)
+    dtg.finalize()
+    assert list(dtg.reachable()) == [1, 1, 1, 1, 1]
+
+
+def test_dtg_unreachable_values():
+    dtg = DomainTransitionGraph(init=2, size=4)
+    dtg.add_arc(0, 1)
+    dtg.add_arc(2, 1)
+    dtg.finalize()
+    assert list(dtg.reachable()) == [0, 1, 1, 0]
+
+
+def test_renaming():
+    renaming = VarValueRenaming()
+    renaming.register_variable(3, 0, bytearray([1, 0, 1]))
+    renaming.register_variable(2, 1, bytearray([0, 1]))
+    renaming.register_variable(2, 0, bytearray([1, 1]))
+    assert renaming.translate_pair((0, 2)) == (0, 1)
+    assert renaming.translate_pair((0, 1)) == (0, always_false)
+    assert renaming.translate_pair((1, 1))[1] == always_true
+    assert renaming.translate_pair((2, 1)) == (1, 1)
+    assert renaming.new_sizes == [2, 2]
+    assert renaming.num_removed_values == 3
+
+
+def _get_task_with_chained_unreachability():
+    # v0=2 is unreachable, so operator "b" is never applicable. Only
+    # after removing "b", v1=1 and hence operator "c" become unreachable.
+    variables = SASVariables(
+        [3, 2, 2], [-1, -1, -1],
+        [["a0", "a1", "a2"], ["b0", "b1"], ["c0", "c1"]])
+    operators = [
+        SASOperator("(a)", [], [(0, 0, 1, [])], 1),
+        SASOperator("(b)", [(0, 2)], [(1, 0, 1, [])], 1),
+        SASOperator("(c)", [(1, 1)], [(2, 0, 1, [])], 1),
+        SASOperator("(d)", [], [(2, 1, 0, [])], 1),
+    ]
+    return SASTask(variables, [], SASInit([0, 0, 0]), SASGoal([(0, 1), (2, 0)]),
+                   operators, [], True)
+
+
+def test_single_simplification_round():
+    task = _get_task_with_chained_unreachability()
+    filter_unreachable_propositions(task)
+    assert [op.name for op in task.operators] == ["(a)", "(c)", "(d)"]
+
+
+def test_iterated_simplification():
+    task = _get_task_with_chained_unreachability()
+    filter_unreachable_propositions(task, iterate=True)
+    assert [op.name for op in task.operators] == ["(a)"]
+    assert task.variables.ranges == [2]
+    assert task.goal.pairs == [(0, 1)]
@@ -0,0 +1,22 @@
+import json
+import os.path
+import subprocess
+import sys
+
+from .test_scripts import DOMAIN, PROBLEM, TRANSLATE_DIR
+
+
+def test_statistics_file(tmp_path):
+    statistics_file = tmp_path / "statistics.json"
+    subprocess.check_call(
+        [sys.executable, "translate.py", DOMAIN, PROBLEM,
+         "--sas-file", str(tmp_path / "output.sas"),
+         "--statistics-file", str(statistics_file)],
+        cwd=TRANSLATE_DIR)
+    with open(statistics_file) as f:
+        statistics = json.load(f)
+    for key in ["translator_variables", "translator_operators",
+                "translator_task_size", "translator_relevant_atoms",
+                "translator_propositions_removed", "translator_time"]:
+        assert key in statistics, key
+    assert "Instantiating" in statistics["timings"]
@@ -0,0 +1,70 @@
+import itertools
+
+from step_deordering import deorder_plan
+from plan_simulator import PlanSimulator
+from sas_tasks import SASGoal, SASInit, SASOperator, SASTask, SASVariables
+
+
+def _get_task():
+    # Switching the lights on is independent, but leaving requires that
+    # both lights are on and waiting only reads the light in room a.
+    variables = SASVariables(
+        ranges=[2, 2, 2], axiom_layers=[-1, -1, -1],
+        value_names=[["Atom on(a)", "NegatedAtom on(a)"],
+                     ["Atom on(b)", "NegatedAtom on(b)"],
+                     ["Atom left()", "NegatedAtom left()"]])
+    operators = [
+        SASOperator("(switch a)", [], [(0, 1, 0, [])], 1),
+        SASOperator("(switch b)", [], [(1, 1, 0, [])], 2),
+        SASOperator("(wait a)", [(0, 0)], [], 1),
+        SASOperator("(leave)", [(0, 0), (1, 0)], [(2, 1, 0, [])], 1),
+        SASOperator("(press a)", [], [(0, -1, 0, [])], 1),
+        SASOperator("(reset a)", [], [(0, -1, 1, [])], 1),
+    ]
+    task = SASTask(variables, [], SASInit([1, 1, 1]), SASGoal([(2, 0)]),
+                   operators, [], True)
+    operator_name_to_index = {op.name: index for index, op in enumerate(task.operators)}
+    return task, operator_name_to_index
+
+
+def test_deorder_plan():
+    task, operator_name_to_index = _get_task()
+    plan = ["(switch a)", "(wait a)", "(switch b)", "(leave)"]
+    po_plan = deorder_plan(task, plan, operator_name_to_index)
+    assert po_plan.predecessors == [[], [0], [], [0, 2]]
+    assert po_plan.get_earliest_start_times() == [0, 1, 0, 2]
+    assert po_plan.get_makespan() == 3
+    assert po_plan.get_slack() == [1, 1, 0, 0]
+
+
+def test_writes_of_the_same_value_are_not_ordered():
+    task, operator_name_to_index = _get_task()
+    # Pressing the switch in room a again does not change the light, so
+    # the second press only comes after the reset.
+    plan = ["(switch a)", "(wait a)", "(reset a)", "(press a)", "(wait a)",
+            "(press a)", "(switch b)", "(leave)"]
+    po_plan = deorder_plan(task, plan, operator_name_to_index)
+    assert po_plan.predecessors == [[], [0], [1], [2], [3], [2], [], [3, 6]]
+
+
+def _count_valid_linearizations(plan):
+    task, operator_name_to_index = _get_task()
+    po_plan = deorder_plan(task, plan, operator_name_to_index)
+    simulator = PlanSimulator(task, operator_name_to_index)
+    cost = simulator.validate(plan)
+    num_linearizations = 0
+    for order in itertools.permutations(range(len(plan))):
+        position = {step: index for index, step in enumerate(order)}
+        if all(position[pred] < position[step]
+               for step, preds in enumerate(po_plan.predecessors) for pred in preds):
+            assert simulator.validate([plan[step] for step in order]) == cost
+            num_linearizations += 1
+    return num_linearizations
+
+
+def test_linearizations_are_valid():
+    assert _count_valid_linearizations(
+        ["(switch a)", "(wait a)", "(switch b)", "(leave)"]) == 5
+    assert _count_valid_linearizations(
+        ["(switch a)", "(wait a)", "(reset a)", "(press a)", "(wait a)",
+         "(press a)", "(switch b)", "(leave)"]) == 49
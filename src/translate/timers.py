@@ -3,6 +3,8 @@ import os
 import sys
 import time
 
+import stats
+
 
 class Timer:
     def __init__(self):
@@ -13,10 +15,15 @@ class Timer:
         times = os.times()
         return times[0] + times[1]
 
+    def elapsed_cpu_time(self):
+        return self._clock() - self.start_clock
+
+    def elapsed_wall_clock_time(self):
+        return time.time() - self.start_time
+
     def __str__(self):
         return "[%.3fs CPU, %.3fs wall-clock]" % (
-            self._clock() - self.start_clock,
-            time.time() - self.start_time)
+            self.elapsed_cpu_time(), self.elapsed_wall_clock_time())
 
 
 @contextlib.contextmanager
@@ -28,6 +35,8 @@ def timing(text, block=False):
         print("%s..." % text, end=' ')
     sys.stdout.flush()
     yield
+    stats.add_time(text, timer.elapsed_cpu_time(),
+                   timer.elapsed_wall_clock_time())
     if block:
         print("%s: %s" % (text, timer))
     else:
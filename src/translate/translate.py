@@ -17,6 +17,7 @@ from copy import deepcopy
 from itertools import product
 
 import axiom_rules
+import compressed_files
 import fact_groups
 import instantiate
 import normalize
@@ -26,6 +27,7 @@ import pddl_parser
 import sas_tasks
 import signal
 import simplify
+import stats
 import timers
 import tools
 import variable_order
@@ -42,6 +44,9 @@ import variable_order
 
 DEBUG = False
 
+# Buffer size in bytes for writing the output file.
+OUTPUT_BUFFER_SIZE = 1 << 20
+
 
 ## For a full list of exit codes, please see driver/returncodes.py. Here,
 ## we only list codes that are used by the translator component of the planner.
@@ -436,8 +441,9 @@ def translate_task(strips_to_sas, ranges, translation_key,
                    init, goals,
                    actions, axioms, metric, implied_facts):
     with timers.timing("Processing axioms", block=True):
-        axioms, axiom_layer_dict = axiom_rules.handle_axioms(actions, axioms, goals,
-                                                             options.layer_strategy)
+        axioms, axiom_layer_dict = axiom_rules.handle_axioms(
+            actions, axioms, goals, options.layer_strategy,
+            options.axiom_negation_budget)
 
     if options.dump_task:
         # Remove init facts that don't occur in strips_to_sas: they're constant.
@@ -554,6 +560,10 @@ def pddl_to_sas(task):
         (relaxed_reachable, atoms, actions, goal_list, axioms,
          reachable_action_params) = instantiate.explore(task)
 
+    stats.set_value("translator_instantiated_atoms", len(atoms))
+    stats.set_value("translator_instantiated_actions", len(actions))
+    stats.set_value("translator_instantiated_axioms", len(axioms))
+
     if not relaxed_reachable:
         return unsolvable_sas_task("No relaxed solution")
     elif goal_list is None:
@@ -603,11 +613,16 @@ def pddl_to_sas(task):
           simplified_effect_condition_counter)
     print("%d implied preconditions added" %
           added_implied_precondition_counter)
+    stats.set_value("translator_simplified_effect_conditions",
+                    simplified_effect_condition_counter)
+    stats.set_value("translator_added_implied_preconditions",
+                    added_implied_precondition_counter)
 
     if options.filter_unreachable_facts:
         with timers.timing("Detecting unreachable propositions", block=True):
             try:
-                simplify.filter_unreachable_propositions(sas_task)
+                simplify.filter_unreachable_propositions(
+                    sas_task, iterate=options.iterated_simplification)
             except simplify.Impossible:
                 return unsolvable_sas_task("Simplified to trivially false goal")
             except simplify.TriviallySolvable:
@@ -687,24 +702,30 @@ def build_implied_facts(strips_to_sas, groups, mutex_groups):
 
 
 def dump_statistics(sas_task):
-    print("Translator variables: %d" % len(sas_task.variables.ranges))
-    print("Translator derived variables: %d" %
-          len([layer for layer in sas_task.variables.axiom_layers
-               if layer >= 0]))
-    print("Translator facts: %d" % sum(sas_task.variables.ranges))
-    print("Translator goal facts: %d" % len(sas_task.goal.pairs))
-    print("Translator mutex groups: %d" % len(sas_task.mutexes))
-    print("Translator total mutex groups size: %d" %
-          sum(mutex.get_encoding_size() for mutex in sas_task.mutexes))
-    print("Translator operators: %d" % len(sas_task.operators))
-    print("Translator axioms: %d" % len(sas_task.axioms))
-    print("Translator task size: %d" % sas_task.get_encoding_size())
+    task_statistics = [
+        ("variables", len(sas_task.variables.ranges)),
+        ("derived variables",
+         len([layer for layer in sas_task.variables.axiom_layers
+              if layer >= 0])),
+        ("facts", sum(sas_task.variables.ranges)),
+        ("goal facts", len(sas_task.goal.pairs)),
+        ("mutex groups", len(sas_task.mutexes)),
+        ("total mutex groups size",
+         sum(mutex.get_encoding_size() for mutex in sas_task.mutexes)),
+        ("operators", len(sas_task.operators)),
+        ("axioms", len(sas_task.axioms)),
+        ("task size", sas_task.get_encoding_size()),
+    ]
+    for name, value in task_statistics:
+        print("Translator %s: %d" % (name, value))
+        stats.set_value("translator_" + name.replace(" ", "_"), value)
     try:
         peak_memory = tools.get_peak_memory_in_kb()
     except Warning as warning:
         print(warning)
     else:
         print("Translator peak memory: %d KB" % peak_memory)
+        stats.set_value("translator_peak_memory", peak_memory)
 
 
 def dump_predicates(task, path):
@@ -742,9 +763,17 @@ def main():
     dump_statistics(sas_task)
 
     with timers.timing("Writing output"):
-        with open(options.sas_file, "w") as output_file:
+        # The output file may be a pipe to the search component (see
+        # the driver), so we write it in large chunks.
+        with compressed_files.open_file(
+                options.sas_file, "w", buffering=OUTPUT_BUFFER_SIZE) as output_file:
             sas_task.output(output_file)
     print("Done! %s" % timer)
+    if options.statistics_file:
+        stats.set_value("translator_time", timer.elapsed_cpu_time())
+        stats.set_value("translator_wall_clock_time",
+                        timer.elapsed_wall_clock_time())
+        stats.dump_json(options.statistics_file)
 
 
 def handle_sigxcpu(signum, stackframe):
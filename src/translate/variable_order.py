@@ -1,11 +1,15 @@
-from collections import defaultdict, deque
-from itertools import chain
-import heapq
+from collections import Counter, defaultdict
 
 import sccs
+import stats
 
 DEBUG = False
 
+# Weight added to arcs whose target is a goal variable (see
+# CausalGraph.calculate_topological_pseudo_sort).
+GOAL_ARC_WEIGHT = 100000
+
+
 class CausalGraph:
     """Weighted causal graph used for defining a variable order.
 
@@ -21,19 +25,34 @@ class CausalGraph:
     description in the JAIR paper to reproduce the behaviour of the
     original implementation in the preprocessor component of the
     planner.
+
+    While weighting the graph, arcs are stored in a flat dictionary
+    mapping the arc code source * num_variables + target to its
+    weight. Afterwards, the successors (with weights) and predecessors
+    of each variable are stored in lists indexed by variable.
     """
 
     def __init__(self, sas_task):
-        self.weighted_graph = defaultdict(lambda: defaultdict(int))
-        ## var_no -> (var_no -> number)
-        self.predecessor_graph = defaultdict(set)
+        self.num_variables = len(sas_task.variables.ranges)
+        self.goal_map = dict(sas_task.goal.pairs)
         self.ordering = []
 
+        ## arc code -> weight
+        self._arc_weights = defaultdict(int)
         self.weight_graph_from_ops(sas_task.operators)
         self.weight_graph_from_axioms(sas_task.axioms)
 
-        self.num_variables = len(sas_task.variables.ranges)
-        self.goal_map = dict(sas_task.goal.pairs)
+        ## var_no -> sorted list of (target var_no, weight)
+        self.weighted_successors = [[] for _ in range(self.num_variables)]
+        ## var_no -> list of source var_nos
+        self.predecessors = [[] for _ in range(self.num_variables)]
+        for code in sorted(self._arc_weights):
+            source, target = divmod(code, self.num_variables)
+            self.weighted_successors[source].append(
+                (target, self._arc_weights[code]))
+            self.predecessors[target].append(source)
+        stats.set_value("translator_causal_graph_arcs", len(self._arc_weights))
+        del self._arc_weights
 
     def get_ordering(self):
         if not self.ordering:
@@ -47,31 +66,43 @@ class CausalGraph:
         ### issue26) it performed better than the (clearer) weighting
         ### described in the Fast Downward paper (which would require
         ### a more complicated implementation).
+        ### Conceptually, every effect adds 1 to the arcs from all
+        ### prevail and precondition variables and from its effect
+        ### condition variables to the effect variable. We count how
+        ### often each source and each target occurs in the operator
+        ### and add the products, which visits each arc of an
+        ### operator only once.
+        num_variables = self.num_variables
+        arc_weights = self._arc_weights
         for op in operators:
-            source_vars = [var for (var, value) in op.prevail]
-            for var, pre, _, _ in op.pre_post:
+            source_counts = Counter(var for (var, value) in op.prevail)
+            target_counts = Counter()
+            for var, pre, _, cond in op.pre_post:
                 if pre != -1:
-                    source_vars.append(var)
-
-            for target, _, _, cond in op.pre_post:
-                for source in chain(source_vars, (var for var, _ in cond)):
+                    source_counts[var] += 1
+                target_counts[var] += 1
+                for source, _ in cond:
+                    if source != var:
+                        arc_weights[source * num_variables + var] += 1
+
+            for target, target_count in target_counts.items():
+                for source, source_count in source_counts.items():
                     if source != target:
-                        self.weighted_graph[source][target] += 1
-                        self.predecessor_graph[target].add(source)
+                        arc_weights[source * num_variables + target] += (
+                            source_count * target_count)
 
     def weight_graph_from_axioms(self, axioms):
+        num_variables = self.num_variables
+        arc_weights = self._arc_weights
         for ax in axioms:
             target = ax.effect[0]
             for source, _ in ax.condition:
                 if source != target:
-                    self.weighted_graph[source][target] += 1
-                    self.predecessor_graph[target].add(source)
+                    arc_weights[source * num_variables + target] += 1
 
     def get_strongly_connected_components(self):
-        unweighted_graph = [[] for _ in range(self.num_variables)]
-        assert len(self.weighted_graph) <= self.num_variables
-        for source, target_weights in self.weighted_graph.items():
-            unweighted_graph[source] = sorted(target_weights.keys())
+        unweighted_graph = [[target for target, _ in successors]
+                            for successors in self.weighted_successors]
         return sccs.get_sccs_adjacency_list(unweighted_graph)
 
     def calculate_topological_pseudo_sort(self, sccs):
@@ -80,38 +111,121 @@ class CausalGraph:
                 # component needs to be turned into acyclic subgraph
 
                 # Compute subgraph induced by scc
-                subgraph = defaultdict(list)
+                in_scc = set(scc)
+                subgraph = {}
                 for var in scc:
                     # for each variable in component only list edges inside
                     # component.
-                    subgraph_edges = subgraph[var]
-                    for target, cost in sorted(self.weighted_graph[var].items()):
-                        if target in scc:
+                    subgraph_edges = []
+                    for target, cost in self.weighted_successors[var]:
+                        if target in in_scc:
                             if target in self.goal_map:
-                                subgraph_edges.append((target, 100000 + cost))
+                                subgraph_edges.append(
+                                    (target, GOAL_ARC_WEIGHT + cost))
                             subgraph_edges.append((target, cost))
+                    subgraph[var] = subgraph_edges
 
                 self.ordering.extend(MaxDAG(subgraph, scc).get_result())
             else:
                 self.ordering.append(scc[0])
 
     def calculate_important_vars(self, goal):
-        # Note for future refactoring: it is perhaps more idiomatic
-        # and efficient to use a set rather than a defaultdict(bool).
-        necessary = defaultdict(bool)
+        """Return a bytearray that is 1 for all variables that are
+        ancestors of a goal variable in the causal graph."""
+        necessary = bytearray(self.num_variables)
+        stack = []
         for var, _ in goal.pairs:
             if not necessary[var]:
-                necessary[var] = True
-                self.dfs(var, necessary)
+                necessary[var] = 1
+                stack.append(var)
+        while stack:
+            node = stack.pop()
+            for pred in self.predecessors[node]:
+                if not necessary[pred]:
+                    necessary[pred] = 1
+                    stack.append(pred)
         return necessary
 
-    def dfs(self, node, necessary):
-        stack = [pred for pred in self.predecessor_graph[node]]
-        while stack:
-            n = stack.pop()
-            if not necessary[n]:
-                necessary[n] = True
-                stack.extend(pred for pred in self.predecessor_graph[n])
+
+class IndexedMinHeap:
+    """Binary min-heap over the nodes {0, ..., N-1} with one entry per
+    node that supports changing the key of a node in place.
+
+    The position of each node in the heap array is stored in
+    `positions` (-1 for nodes not in the heap)."""
+
+    def __init__(self, num_nodes):
+        self.keys = [None] * num_nodes
+        self.positions = [-1] * num_nodes
+        self.heap = []
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def push(self, node, key):
+        assert self.positions[node] == -1
+        self.keys[node] = key
+        self.positions[node] = len(self.heap)
+        self.heap.append(node)
+        self._sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        heap = self.heap
+        node = heap[0]
+        last = heap.pop()
+        self.positions[node] = -1
+        if heap:
+            heap[0] = last
+            self.positions[last] = 0
+            self._sift_down(0)
+        return node
+
+    def decrease_key(self, node, key):
+        assert key < self.keys[node]
+        self.keys[node] = key
+        self._sift_up(self.positions[node])
+
+    def _sift_up(self, pos):
+        heap = self.heap
+        keys = self.keys
+        positions = self.positions
+        node = heap[pos]
+        key = keys[node]
+        while pos > 0:
+            parent_pos = (pos - 1) >> 1
+            parent = heap[parent_pos]
+            if key < keys[parent]:
+                heap[pos] = parent
+                positions[parent] = pos
+                pos = parent_pos
+            else:
+                break
+        heap[pos] = node
+        positions[node] = pos
+
+    def _sift_down(self, pos):
+        heap = self.heap
+        keys = self.keys
+        positions = self.positions
+        size = len(heap)
+        node = heap[pos]
+        key = keys[node]
+        while True:
+            child_pos = 2 * pos + 1
+            if child_pos >= size:
+                break
+            right_pos = child_pos + 1
+            if right_pos < size and keys[heap[right_pos]] < keys[heap[child_pos]]:
+                child_pos = right_pos
+            child = heap[child_pos]
+            if keys[child] < key:
+                heap[pos] = child
+                positions[child] = pos
+                pos = child_pos
+            else:
+                break
+        heap[pos] = node
+        positions[node] = pos
 
 
 class MaxDAG:
@@ -123,6 +237,12 @@ class MaxDAG:
     incident edges from the graph until only a single node remains
     (cf. computation of total order of vertices when pruning the
     causal graph in the Fast Downward JAIR 2006 paper).
+
+    Ties are broken in favor of the node whose incoming weight reached
+    its current value first (and by the input order for nodes whose
+    weight never changed), which reproduces the tie-breaking of the
+    old preprocessor. We implement this with an indexed heap whose
+    keys are pairs (incoming weight, time of the last weight change).
     """
 
     def __init__(self, graph, input_order):
@@ -132,50 +252,40 @@ class MaxDAG:
         self.input_order = input_order
 
     def get_result(self):
-        incoming_weights = defaultdict(int)
-        for weighted_edges in self.weighted_graph.values():
-            for target, weight in weighted_edges:
-                incoming_weights[target] += weight
-
-        weight_to_nodes = defaultdict(deque)
-        for node in self.input_order:
-            weight = incoming_weights[node]
-            weight_to_nodes[weight].append(node)
-        weights = list(weight_to_nodes.keys())
-        heapq.heapify(weights)
-
-        done = set()
+        nodes = self.input_order
+        node_to_index = {node: index for index, node in enumerate(nodes)}
+        incoming_weights = [0] * len(nodes)
+        # Store the successors with node indices and the weights that
+        # are removed from the target when the source is picked.
+        successors = []
+        for node in nodes:
+            node_successors = []
+            for target, weight in self.weighted_graph.get(node, ()):
+                target_index = node_to_index[target]
+                incoming_weights[target_index] += weight
+                weight = weight % GOAL_ARC_WEIGHT
+                if weight != 0:
+                    node_successors.append((target_index, weight))
+            successors.append(node_successors)
+
+        heap = IndexedMinHeap(len(nodes))
+        for index in range(len(nodes)):
+            heap.push(index, (incoming_weights[index], index))
+        time_stamp = len(nodes)
+
+        done = [False] * len(nodes)
         result = []
-        while weights:
-            min_key = weights[0]
-            min_elem = None
-            entries = weight_to_nodes[min_key]
-            while entries and (min_elem is None or min_elem in done or
-                               min_key > incoming_weights[min_elem]):
-                min_elem = entries.popleft()
-            if not entries:
-                del weight_to_nodes[min_key]
-                heapq.heappop(weights) # remove min_key from heap
-            if min_elem is None or min_elem in done:
-                # since we use lazy deletion from the heap weights,
-                # there can be weights with a "done" entry in
-                # weight_to_nodes
-                continue
-            done.add(min_elem)
-            result.append(min_elem)
-            for target, weight in self.weighted_graph[min_elem]:
-                if target not in done:
-                    weight = weight % 100000
-                    if weight == 0:
-                        continue
-                    old_in_weight = incoming_weights[target]
-                    new_in_weight = old_in_weight - weight
-                    incoming_weights[target] = new_in_weight
-
-                    # add new entry to weight_to_nodes
-                    if new_in_weight not in weight_to_nodes:
-                        heapq.heappush(weights, new_in_weight)
-                    weight_to_nodes[new_in_weight].append(target)
+        while heap:
+            index = heap.pop()
+            done[index] = True
+            result.append(nodes[index])
+            for target_index, weight in successors[index]:
+                if not done[target_index]:
+                    incoming_weights[target_index] -= weight
+                    heap.decrease_key(
+                        target_index,
+                        (incoming_weights[target_index], time_stamp))
+                    time_stamp += 1
         return result
 
 
@@ -230,6 +340,7 @@ class VariableOrder:
                 new_mutexes.append(group)
         print("%s of %s mutex groups necessary." % (len(new_mutexes),
                                                     len(mutexes)))
+        stats.set_value("translator_necessary_mutex_groups", len(new_mutexes))
         mutexes[:] = new_mutexes
 
     def _apply_to_operators(self, operators):
@@ -251,6 +362,7 @@ class VariableOrder:
                 new_ops.append(op)
         print("%s of %s operators necessary." % (len(new_ops),
                                                  len(operators)))
+        stats.set_value("translator_necessary_operators", len(new_ops))
         operators[:] = new_ops
 
     def _apply_to_axioms(self, axioms):
@@ -265,6 +377,7 @@ class VariableOrder:
                 new_axioms.append(ax)
         print("%s of %s axiom rules necessary." % (len(new_axioms),
                                                    len(axioms)))
+        stats.set_value("translator_necessary_axiom_rules", len(new_axioms))
         axioms[:] = new_axioms
 
 
@@ -278,7 +391,9 @@ def find_and_apply_variable_order(sas_task, reorder_vars=True,
             order = list(range(len(sas_task.variables.ranges)))
         if filter_unimportant_vars:
             necessary = cg.calculate_important_vars(sas_task.goal)
-            print("%s of %s variables necessary." % (len(necessary),
+            num_necessary = sum(necessary)
+            print("%s of %s variables necessary." % (num_necessary,
                                                      len(order)))
+            stats.set_value("translator_necessary_variables", num_necessary)
             order = [var for var in order if necessary[var]]
         VariableOrder(order).apply_to_task(sas_task)